@@ -1,16 +1,27 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from import_export.admin import ImportExportModelAdmin # <-- Import this
-from import_export import resources 
 # Import all your models from the core app
 ########################
-import csv
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from django.utils.module_loading import import_string
+from django.utils import timezone
 ######################
-from .models import Event, UserProfile, Attendee, EventQuestion, AttendeeAnswer, Speaker, EventResource, Session
+from .exports import stream_attendees_csv, stream_attendees_ndjson
+from .forms import AttendeeImportForm, EventResourceInlineForm, invalidate_question_schema
+from .imports import queue_import
+from .report_jobs import queue_summary_report
+from .reports import build_question_summaries, summaries_csv_response
+from .models import Event, UserProfile, Attendee, EventQuestion, AttendeeAnswer, Speaker, EventResource, Session, OutboundEmail, ReportJob, ResourceUpload, ImportJob
 
 # ==============================================================================
 # 1. ADMIN SITE TEXT & TITLE CUSTOMIZATION
@@ -36,8 +47,14 @@ class SessionInline(admin.TabularInline):
 # ==============================================================================
 class EventResourceInline(admin.TabularInline):
     model = EventResource
+    form = EventResourceInlineForm
     extra = 1 # Allow adding one new resource at a time
-    fields = ('title', 'speaker', 'file', 'is_visible')
+    fields = ('title', 'speaker', 'file', 'is_visible', 'chunked_upload')
+
+    class Media:
+        # Uploads big files in resumable chunks before the form is submitted.
+        js = ('chunked_upload.js',)
+
     # Pre-populate the speaker choices based on speakers already assigned to the event
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "speaker":
@@ -51,13 +68,48 @@ class EventResourceInline(admin.TabularInline):
 
 
 
-# 1. Create a "Resource" to describe how the Attendee model maps to an export
-class AttendeeResource(resources.ModelResource):
-    class Meta:
-        model = Attendee
-        # Define which fields you want in the export
-        fields = ('id', 'user__first_name', 'user__last_name', 'user__email', 'event__name', 'registration_date')
-        export_order = fields
+class LazyImportMixin:
+    """
+    Adds django-import-export's import views to a ModelAdmin without importing
+    import_export (and tablib with its format libraries) when the admin loads.
+    The real ImportMixin admin is built the first time an import is opened.
+    Templates should include "admin/import_export/change_list_import_item.html"
+    for the changelist's "Import" button.
+    """
+    # Dotted path to the import_export Resource class.
+    import_resource_class = None
+
+    @cached_property
+    def import_admin(self):
+        from import_export.admin import ImportMixin
+
+        admin_class = type(
+            f'{type(self).__name__}Import',
+            (ImportMixin, type(self)),
+            {'resource_classes': [import_string(self.import_resource_class)]},
+        )
+        return admin_class(self.model, self.admin_site)
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        urls = [
+            path('process_import/', self.admin_site.admin_view(self.process_import), name='%s_%s_process_import' % info),
+            path('import/', self.admin_site.admin_view(self.import_action), name='%s_%s_import' % info),
+        ]
+        return urls + super().get_urls()
+
+    def has_import_permission(self, request):
+        return self.import_admin.has_import_permission(request)
+
+    def import_action(self, request, *args, **kwargs):
+        return self.import_admin.import_action(request, *args, **kwargs)
+
+    def process_import(self, request, *args, **kwargs):
+        return self.import_admin.process_import(request, *args, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'has_import_permission': self.has_import_permission(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
 
 # ==============================================================================
 # 2. USER AND USERPROFILE ADMIN (This section is already excellent)
@@ -109,16 +161,44 @@ class SpeakerAdmin(admin.ModelAdmin):
 
 
 
+def queue_summaries_pdf(model_admin, request, summaries, title):
+    """
+    Queues a PDF report job for question summaries (see core.report_jobs) and
+    redirects to its status page. Identical report data reuses an earlier job.
+    """
+    job = queue_summary_report(summaries, title, user=request.user)
+    if job.status == ReportJob.Status.DONE:
+        model_admin.message_user(request, "This report has already been generated and is ready to download.")
+    else:
+        model_admin.message_user(request, "The PDF report is being generated. This page shows when it is ready.")
+    return redirect('admin:core_reportjob_change', job.pk)
+
+
+class EventStatusFilter(admin.SimpleListFilter):
+    """Filters events by the status annotated in EventAdmin.get_queryset."""
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return Event.Status.choices
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(status=self.value())
+        return queryset
+
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     # --- IMPROVED ---
     list_display = ('name', 'start_datetime', 'end_datetime', 'is_active', 'event_status', 'attendee_count')
-    list_filter = ('is_active', 'start_datetime') # Filter by the new field
+    list_filter = ('is_active', EventStatusFilter, 'start_datetime') # Filter by the new field
     search_fields = ('name',)
     # --- NEW, IMPROVED WIDGET FOR SELECTING SPEAKERS ---
      # --- ADD THE NEW SESSION INLINE HERE ---
     inlines = [EventQuestionInline, EventResourceInline, SessionInline]
     filter_horizontal = ('speakers',) # This is for the main event speakers
+    actions = ['export_question_summaries_as_csv', 'export_question_summaries_as_pdf']
     
     # Automatically set the 'uploaded_by' field for resources added in the admin
     def save_formset(self, request, form, formset, change):
@@ -129,20 +209,56 @@ class EventAdmin(admin.ModelAdmin):
                     instance.uploaded_by = request.user
                 instance.save()
             formset.save_m2m()
+            # Link finished chunked uploads to the resources made from them.
+            for inline_form in formset.forms:
+                upload = inline_form.cleaned_data.get('chunked_upload') if inline_form.is_valid() else None
+                if upload is not None and inline_form.instance.pk:
+                    ResourceUpload.objects.filter(pk=upload.pk).update(resource=inline_form.instance)
         else:
             super().save_formset(request, form, formset, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Edits made through EventQuestionInline change the registration forms.
+        invalidate_question_schema(form.instance.pk)
     
     
-    # This makes the property sortable in the admin (optional but nice)
-    @admin.display(description='Status', ordering='start_datetime')
+    def get_queryset(self, request):
+        # Status is computed in SQL and the attendee count read from EventStats,
+        # so the columns can be sorted and filtered on without a query per row.
+        return super().get_queryset(request).with_status().annotate(
+            num_attendees=Coalesce(F('stats__attendee_count'), Value(0))
+        )
+
+    @admin.display(description='Status', ordering='status')
     def event_status(self, obj):
         return obj.event_status
 
 
+    @admin.display(description='Registered Attendees', ordering='num_attendees')
     def attendee_count(self, obj):
-        """Custom method to count attendees, using the new related_name."""
-        return obj.attendees.count()
-    attendee_count.short_description = 'Registered Attendees'
+        """The attendee count annotated in get_queryset."""
+        return obj.num_attendees
+
+    def _question_summaries(self, queryset):
+        questions = EventQuestion.objects.filter(event__in=queryset).select_related('event').order_by('event', 'order')
+        return build_question_summaries(questions)
+
+    def export_question_summaries_as_csv(self, request, queryset):
+        summaries = self._question_summaries(queryset)
+        if not summaries:
+            self.message_user(request, "The selected events have no questions to export.", level='warning')
+            return
+        return summaries_csv_response(summaries, "question_summaries")
+    export_question_summaries_as_csv.short_description = "Export all question summaries as CSV (ZIP)"
+
+    def export_question_summaries_as_pdf(self, request, queryset):
+        summaries = self._question_summaries(queryset)
+        if not summaries:
+            self.message_user(request, "The selected events have no questions to export.", level='warning')
+            return
+        return queue_summaries_pdf(self, request, summaries, "Question summaries")
+    export_question_summaries_as_pdf.short_description = "Export all question summaries as PDF"
 
 
 # ==============================================================================
@@ -157,8 +273,11 @@ class AttendeeAnswerInline(admin.TabularInline):
 
 
 @admin.register(Attendee)
-class AttendeeAdmin(ImportExportModelAdmin):
-    resource_class = AttendeeResource
+class AttendeeAdmin(LazyImportMixin, admin.ModelAdmin):
+    # Imports still go through django-import-export; exports are streamed
+    # by the actions below instead of being built in memory with tablib.
+    import_resource_class = 'core.resources.AttendeeResource'
+    actions = ['export_as_csv', 'export_as_ndjson']
     # --- IMPROVED ---
     list_display = ('user_email', 'event', 'registration_date')
     list_filter = ('event',)
@@ -166,12 +285,51 @@ class AttendeeAdmin(ImportExportModelAdmin):
     date_hierarchy = 'registration_date' # Adds a date drill-down navigation
     list_select_related = ('user', 'event') # Performance optimization
     inlines = [AttendeeAnswerInline]
+    # Adds the "Bulk import" and "Import" buttons.
+    change_list_template = 'admin/core/attendee/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('bulk-import/', self.admin_site.admin_view(self.bulk_import_view), name='core_attendee_bulk_import'),
+        ]
+        return urls + super().get_urls()
+
+    def bulk_import_view(self, request):
+        """
+        Queues a CSV of people to register for an event (core/imports.py) and
+        redirects to the job's status page; run_import_jobs does the import.
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = AttendeeImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            job = queue_import(form.cleaned_data['event'], form.cleaned_data['file'], user=request.user)
+            self.message_user(request, "The import has been queued. This page shows its result when it is done.")
+            return redirect('admin:core_importjob_change', job.pk)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Bulk import attendees",
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/core/attendee/bulk_import.html', context)
 
     def user_email(self, obj):
         """Helper method to display the user's email, which is more useful."""
         return obj.user.email
     user_email.short_description = 'User Email' # Sets the column header text
 
+    def export_as_csv(self, request, queryset):
+        filename = f"Attendee-{timezone.now():%Y-%m-%d}"
+        return stream_attendees_csv(queryset, filename)
+    export_as_csv.short_description = "Export selected attendees with answers (CSV)"
+
+    def export_as_ndjson(self, request, queryset):
+        filename = f"Attendee-{timezone.now():%Y-%m-%d}"
+        return stream_attendees_ndjson(queryset, filename)
+    export_as_ndjson.short_description = "Export selected attendees with answers (NDJSON)"
+
 
 # In core/admin.py
 
@@ -218,67 +376,132 @@ class EventQuestionAdmin(admin.ModelAdmin):
     # This is the key part: show the answers inline
     inlines = [AttendeeAnswerInlineForQuestion]
 
-
-    def _get_summary_data(self, question):
-        """Helper method to get the aggregated data."""
-        from django.db.models import Count
-        return AttendeeAnswer.objects.filter(
-            question=question
-        ).values(
-            'answer'
-        ).annotate(
-            count=Count('answer')
-        ).order_by(
-            '-count'
+    def get_queryset(self, request):
+        # Fetch the event and the response count (from QuestionStats) with the questions.
+        return super().get_queryset(request).select_related('event').annotate(
+            num_responses=Coalesce(F('stats__response_count'), Value(0))
         )
 
-    def export_summary_as_csv(self, request, queryset):
-        if queryset.count() != 1:
-            self.message_user(request, "Please select exactly one question to export.", level='warning')
-            return
-        
-        question = queryset.first()
-        summary_data = self._get_summary_data(question)
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{question.label}_summary.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Answer', 'Count']) # Header row
 
-        for item in summary_data:
-            writer.writerow([item['answer'], item['count']])
-
-        return response
+    def export_summary_as_csv(self, request, queryset):
+        """One CSV for a single question, or a ZIP with one CSV per selected question."""
+        summaries = build_question_summaries(queryset.order_by('event', 'order'))
+        if len(summaries) == 1:
+            filename = f"{summaries[0]['question'].label}_summary"
+        else:
+            filename = "question_summaries"
+        return summaries_csv_response(summaries, filename)
     export_summary_as_csv.short_description = "Export Summary as CSV (Excel)"
 
     def export_summary_as_pdf(self, request, queryset):
-        if queryset.count() != 1:
-            self.message_user(request, "Please select exactly one question to export.", level='warning')
-            return
-
-        question = queryset.first()
-        summary_data = self._get_summary_data(question)
-
-        context = {
-            'question': question,
-            'summary_data': summary_data,
-            'total_responses': sum(item['count'] for item in summary_data)
-        }
-        
-        # Render our HTML template
-        html_string = render_to_string('admin/question_summary_report.html', context)
-        html = HTML(string=html_string)
-        pdf_file = html.write_pdf()
-
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{question.label}_summary.pdf"'
-        return response
+        """Queues one combined PDF with a page per selected question."""
+        summaries = build_question_summaries(queryset.order_by('event', 'order'))
+        if len(summaries) == 1:
+            title = f"{summaries[0]['question'].label} summary"
+        else:
+            title = "Question summaries"
+        return queue_summaries_pdf(self, request, summaries, title)
     export_summary_as_pdf.short_description = "Export Summary as PDF"
 
     # ... (the rest of your EventQuestionAdmin code) ...
     
     # A helper method to quickly see how many responses a question has
+    @admin.display(description='No. of Responses', ordering='num_responses')
     def response_count(self, obj):
-        return obj.responses.count()
-    response_count.short_description = 'No. of Responses'
\ No newline at end of file
+        return obj.num_responses
+
+
+# ==============================================================================
+# 5. OUTBOUND EMAIL QUEUE STATUS
+# ==============================================================================
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'sent_at', 'locked_at', 'last_error')
+    actions = ['retry_now']
+
+    def recipients(self, obj):
+        return ", ".join(obj.to)
+    recipients.short_description = 'To'
+
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=OutboundEmail.Status.SENT).update(
+            status=OutboundEmail.Status.PENDING, attempts=0, next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f'{count} emails were queued for another attempt.')
+    retry_now.short_description = "Retry selected emails now"
+
+
+
+# ==============================================================================
+# 6. PDF REPORT JOBS
+# ==============================================================================
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('title', 'status', 'requested_by', 'created_at', 'finished_at', 'download')
+    list_filter = ('status',)
+    fields = ('title', 'status', 'download', 'error', 'attempts', 'requested_by', 'created_at', 'started_at', 'finished_at')
+    readonly_fields = fields
+    actions = ['rerun_jobs']
+
+    def has_add_permission(self, request):
+        # Jobs are created by the PDF export actions.
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('<path:object_id>/pdf/', self.admin_site.admin_view(self.download_view), name='core_reportjob_pdf'),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, object_id):
+        """The PDFs hold attendees' answers, so they are served here and not from media."""
+        job = get_object_or_404(ReportJob, pk=object_id)
+        if not self.has_view_permission(request, job):
+            raise PermissionDenied
+        if job.status != ReportJob.Status.DONE or not job.file:
+            raise Http404("This report has not been generated.")
+        return FileResponse(job.file.open('rb'), as_attachment=True, content_type='application/pdf')
+
+    @admin.display(description='PDF')
+    def download(self, obj):
+        if obj.status == ReportJob.Status.DONE and obj.file:
+            return format_html('<a href="{}">Download PDF</a>', reverse('admin:core_reportjob_pdf', args=[obj.pk]))
+        if obj.status == ReportJob.Status.FAILED:
+            return "Failed"
+        return "Not ready yet - refresh this page in a moment."
+
+    def rerun_jobs(self, request, queryset):
+        count = queryset.update(status=ReportJob.Status.PENDING, error='', finished_at=None, attempts=0, started_at=None)
+        self.message_user(request, f'{count} report jobs were queued again.')
+    rerun_jobs.short_description = "Re-run selected report jobs"
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'event', 'status', 'summary', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    list_select_related = ('event', 'requested_by')
+    fields = (
+        'filename', 'event', 'status', 'summary', 'skipped_rows', 'error', 'attempts', 'requested_by',
+        'created_at', 'started_at', 'finished_at',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        # Jobs are created by the Attendee admin's "Bulk import" page.
+        return False
+
+    @admin.display(description='Skipped rows')
+    def skipped_rows(self, obj):
+        if obj.status == ImportJob.Status.FAILED:
+            return "-"
+        if obj.status != ImportJob.Status.DONE:
+            return "Not finished yet - refresh this page in a moment."
+        if not obj.row_errors:
+            return "None"
+        return format_html_join(mark_safe('<br>'), "Line {}: {}", obj.row_errors)
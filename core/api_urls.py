@@ -1,7 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from . import api_views
 
+# Under ASGI the feed's unchanged polls are answered by an async view (see settings.ASYNC_VIEWS).
+event_list = api_views.aevent_list if settings.ASYNC_VIEWS else api_views.EventListAPIView.as_view()
+
 urlpatterns = [
-    path('events/', api_views.EventListAPIView.as_view(), name='api-event-list'),
+    path('events/', event_list, name='api-event-list'),
     path('events/<int:pk>/', api_views.EventDetailAPIView.as_view(), name='api-event-detail'),
+    path('resource-uploads/', api_views.ResourceUploadCreateAPIView.as_view(), name='api-resource-upload-create'),
+    path('resource-uploads/<uuid:pk>/', api_views.ResourceUploadDetailAPIView.as_view(), name='api-resource-upload-detail'),
+    path('resource-uploads/<uuid:pk>/chunks/<int:index>/', api_views.ResourceUploadChunkAPIView.as_view(), name='api-resource-upload-chunk'),
+    path('resource-uploads/<uuid:pk>/complete/', api_views.ResourceUploadCompleteAPIView.as_view(), name='api-resource-upload-complete'),
 ]
\ No newline at end of file
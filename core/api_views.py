@@ -1,20 +1,115 @@
-from rest_framework import generics
-from rest_framework.permissions import AllowAny
+import hashlib
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db.models import Count, Max, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+
+from .cache import cached
+from .models import Event, ResourceUpload
+from .pagination import EventCursorPagination
+from .serializers import EventSerializer, ResourceUploadSerializer
+from .uploads import UploadError, complete_upload, discard_upload, write_chunk
+
+
+def _marker_aggregates(now):
+    return {
+        'total': Count('id'),
+        'last_updated': Max('updated_at'),
+        'started': Count('id', filter=Q(start_datetime__lte=now)),
+        'ended': Count('id', filter=Q(end_datetime__lt=now)),
+    }
+
+
+def _marker_result(marker):
+    return f"{marker['total']}:{marker['last_updated']}:{marker['started']}:{marker['ended']}"
+
+
+def event_list_marker(now=None):
+    """
+    A cheap single-query fingerprint of everything the events feed depends on.
+
+    Saves and queryset updates bump an event's `updated_at`, deletes change
+    the count, and the start/end counters change whenever an event's status
+    moves on with time. A delete moves no timestamp, which is why the feed
+    is validated by ETag only and sends no Last-Modified.
+    """
+    return _marker_result(Event.objects.aggregate(**_marker_aggregates(now or timezone.now())))
+
+
+async def aevent_list_marker(now=None):
+    return _marker_result(await Event.objects.aaggregate(**_marker_aggregates(now or timezone.now())))
 
-from .models import Event
-from .serializers import EventSerializer
+
+def event_list_validators(request, fingerprint):
+    """Returns (etag, cache digest) for a page of the events feed."""
+    # The host is part of the key because the serializer builds absolute URLs.
+    variant = f"{fingerprint}|{request.get_host()}|{sorted(request.GET.lists())}"
+    digest = hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest), digest
 
 
 class EventListAPIView(generics.ListAPIView):
     """
-    API endpoint that provides a list of ALL active events in the database.
+    API endpoint that provides a paginated list of ALL active events in the database.
     This is a read-only endpoint.
+
+    Responses are cached per query string and carry an ETag, so a poll with
+    If-None-Match gets a 304 when nothing changed.
     """
-    # This queryset now fetches all active events, ordered by the most recent first.
-    queryset = Event.objects.filter(is_active=True).order_by('-start_datetime')
+    # This queryset fetches all active events; the paginator orders them by start_datetime, then id.
+    queryset = Event.objects.with_status().filter(is_active=True)
     serializer_class = EventSerializer
     permission_classes = [AllowAny]
+    pagination_class = EventCursorPagination
+
+    def get(self, request, *args, **kwargs):
+        # aevent_list() below has already computed the marker when it routed here.
+        marker = getattr(request, 'event_list_marker', None) or event_list_marker()
+        etag, digest = event_list_validators(request, marker)
+
+        # Answer unchanged polls before touching the serializer at all.
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = cached(
+            f'core:event_list:{digest}',
+            lambda: super(EventListAPIView, self).get(request, *args, **kwargs).data,
+            settings.EVENT_LIST_CACHE_TIMEOUT,
+        )
+        response = Response(data)
+
+        response['ETag'] = etag
+        return response
+
+
+_event_list_view = EventListAPIView.as_view()
+
+
+@csrf_exempt  # like every DRF view; DRF's authentication enforces CSRF itself.
+async def aevent_list(request, *args, **kwargs):
+    """
+    Async entry point for /api/v1/events/, routed when settings.ASYNC_VIEWS
+    is on (under ASGI). DRF views are synchronous, so the common case for
+    feed pollers, an unchanged feed answered with 304, is handled here
+    without a thread; anything else goes to EventListAPIView.
+    """
+    if request.method in ('GET', 'HEAD'):
+        marker = await aevent_list_marker()
+        etag, _ = event_list_validators(request, marker)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        request.event_list_marker = marker
+    return await sync_to_async(_event_list_view)(request, *args, **kwargs)
 
 
 class EventDetailAPIView(generics.RetrieveAPIView):
@@ -22,6 +117,63 @@ class EventDetailAPIView(generics.RetrieveAPIView):
     API endpoint that provides the details of a SINGLE event by its ID.
     This is a read-only endpoint.
     """
-    queryset = Event.objects.filter(is_active=True)
+    queryset = Event.objects.with_status().filter(is_active=True)
     serializer_class = EventSerializer
-    permission_classes = [AllowAny]
\ No newline at end of file
+    permission_classes = [AllowAny]
+
+
+# ==============================================================================
+# CHUNKED RESOURCE UPLOADS (see core/uploads.py)
+# POST resource-uploads/                      start an upload
+# GET/DELETE resource-uploads/<id>/           progress (to resume) / cancel
+# PUT resource-uploads/<id>/chunks/<n>/       raw chunk body, optional X-Chunk-SHA256
+# POST resource-uploads/<id>/complete/        verify, store, create the resource
+# ==============================================================================
+class ResourceUploadCreateAPIView(generics.CreateAPIView):
+    queryset = ResourceUpload.objects.all()
+    serializer_class = ResourceUploadSerializer
+    permission_classes = [IsAdminUser]
+
+    def perform_create(self, serializer):
+        serializer.save(uploaded_by=self.request.user, chunk_size=settings.RESOURCE_UPLOAD_CHUNK_SIZE)
+
+
+class ResourceUploadDetailAPIView(generics.RetrieveDestroyAPIView):
+    queryset = ResourceUpload.objects.all()
+    serializer_class = ResourceUploadSerializer
+    permission_classes = [IsAdminUser]
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+
+class ResourceUploadChunkAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def put(self, request, pk, index):
+        # The body is streamed into the upload's temp file, never parsed or buffered.
+        try:
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({'detail': "Content-Length is required."}, status=status.HTTP_411_LENGTH_REQUIRED)
+        try:
+            upload = write_chunk(pk, index, request.stream, length, sha256=request.headers.get('X-Chunk-SHA256'))
+        except ResourceUpload.DoesNotExist:
+            return Response({'detail': "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=e.status)
+        return Response(ResourceUploadSerializer(upload).data)
+
+
+class ResourceUploadCompleteAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, pk):
+        try:
+            upload = complete_upload(pk)
+        except ResourceUpload.DoesNotExist:
+            return Response({'detail': "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        except UploadError as e:
+            return Response({'detail': str(e), 'received': ResourceUpload.objects.get(pk=pk).received}, status=e.status)
+        return Response(ResourceUploadSerializer(upload).data)
+
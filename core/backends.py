@@ -0,0 +1,44 @@
+# core/backends.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+User = get_user_model()
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def users_with_email(email):
+    """
+    Users whose email matches `email`, ignoring case.
+
+    Filters on LOWER(email) and leaves out blank emails, so the lookup uses the
+    partial unique index created in core/migrations/0009_user_email_lower_index.py
+    instead of scanning auth_user. Accounts without an email never match.
+    """
+    return User.objects.annotate(email_key=Lower('email')).filter(
+        email_key=normalize_email(email)
+    ).exclude(email='')
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticates with an email address and password in a single query.
+    Usage: authenticate(request, email=..., password=...)
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = users_with_email(email).first()
+        if user is None:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
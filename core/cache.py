@@ -0,0 +1,124 @@
+# core/cache.py
+#
+# Helpers on top of Django's cache (configured by CACHE_BACKEND in settings).
+#
+# Version stamps: a stamp is part of each cache key, so bumping it (see
+# core/signals.py) makes every older entry unreachable. Each event has one
+# stamp for the fragments of its page and one for its registration
+# questions, bumped only when something shown there changes.
+#
+# cached(): cache-aside reads with stampede protection. On a miss only one
+# caller recomputes the value while the others wait briefly for it. The lock
+# is a cache.add(), which is only atomic across processes on Redis and
+# Memcached; on the file cache it falls back to a lock per process.
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Stored in place of None, so a cached None is told apart from a miss.
+_NONE = '__core_cache_none__'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() keeps a stamp another request created in the meantime.
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+async def _aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key, version)
+    return version
+
+
+# ==============================================================================
+# PER-EVENT VERSIONS
+# scope 'page' covers the event_detail fragments, 'questions' the compiled
+# registration form schema.
+# ==============================================================================
+
+def event_version_key(event_id, scope='page'):
+    return f'core:event_version:{scope}:{event_id}'
+
+
+def get_event_version(event_id, scope='page'):
+    """Returns the current version stamp for an event, creating one if needed."""
+    return _get_version(event_version_key(event_id, scope))
+
+
+async def aget_event_version(event_id, scope='page'):
+    """Async version of get_event_version, for async views."""
+    return await _aget_version(event_version_key(event_id, scope))
+
+
+def bump_event_versions(event_ids, scope='page'):
+    """Gives each event a fresh version stamp, invalidating its cached entries in `scope`."""
+    cache.set_many({event_version_key(event_id, scope): uuid.uuid4().hex for event_id in event_ids}, None)
+
+
+# ==============================================================================
+# CACHE-ASIDE
+# ==============================================================================
+
+# Used instead of cache.add() where add() is not atomic across processes; a
+# fixed set of locks, shared by hash, so the table does not grow with the keys.
+_LOCAL_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _acquire(lock_key, timeout):
+    """Tries to take the recompute lock; returns a release function, or None if it is taken."""
+    if isinstance(caches['default'], FileBasedCache):
+        # FileBasedCache.add() is a has_key() then a set(), so two processes can
+        # both win it. Only serialise the threads of this process instead.
+        lock = _LOCAL_LOCKS[hash(lock_key) % len(_LOCAL_LOCKS)]
+        return lock.release if lock.acquire(blocking=False) else None
+    if cache.add(lock_key, 1, timeout):
+        return lambda: cache.delete(lock_key)
+    return None
+
+
+def cached(key, compute, timeout, lock_timeout=None, wait=None):
+    """
+    Returns the value cached under `key`, calling `compute()` and caching its
+    result for `timeout` seconds on a miss.
+
+    Only the caller that takes the short-lived lock computes; others poll for
+    up to `wait` seconds for its result before computing it themselves, so a
+    popular entry expiring doesn't send every request to the database at once.
+    With the file cache that holds per process only: each worker process may
+    still recompute once. Use Redis or Memcached to share the lock.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return None if value == _NONE else value
+
+    lock_timeout = lock_timeout or settings.CACHE_LOCK_TIMEOUT
+    wait = settings.CACHE_LOCK_WAIT if wait is None else wait
+    release = _acquire(f'{key}:lock', lock_timeout)
+    if release is None:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(key)
+            if value is not None:
+                return None if value == _NONE else value
+
+    try:
+        value = compute()
+        cache.set(key, _NONE if value is None else value, timeout)
+    finally:
+        if release is not None:
+            release()
+    return value
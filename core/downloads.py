@@ -0,0 +1,142 @@
+# core/downloads.py
+#
+# Serving EventResource files. Files on the local disk are streamed in chunks
+# with byte-range support (206 Partial Content), so videos can be seeked
+# without downloading them from the start, and never read into memory whole.
+# When the front-end server is configured to do it, the file transfer is
+# handed off with X-Accel-Redirect (nginx) or X-Sendfile (Apache) instead.
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Returns the (start, end) byte offsets, inclusive, asked for by a Range
+    header, or None when the whole file should be sent. Only single ranges are
+    supported; anything else is ignored, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-500: the last 500 bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+
+
+def iter_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_response(name, content_type):
+    """Lets nginx or Apache send the file; they handle ranges themselves."""
+    response = HttpResponse(content_type=content_type)
+    if settings.RESOURCE_X_ACCEL_PREFIX:
+        # nginx decodes the URI, so spaces, '?', '#' and non-ASCII names must be quoted.
+        response['X-Accel-Redirect'] = settings.RESOURCE_X_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = name
+    return response
+
+
+def serve_file(request, field_file, as_attachment=False):
+    """
+    Response for a GET or HEAD of `field_file`, honouring If-None-Match,
+    If-Modified-Since, Range and If-Range. Files that do not live on the local
+    disk (e.g. cloud storage) are redirected to their storage URL.
+    """
+    storage = field_file.storage
+    try:
+        path = storage.path(field_file.name)
+    except NotImplementedError:
+        return HttpResponseRedirect(field_file.url)
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if settings.RESOURCE_X_ACCEL_PREFIX:
+        response = _offload_response(field_file.name, content_type)
+    elif settings.RESOURCE_X_SENDFILE:
+        response = _offload_response(path, content_type)
+    else:
+        response = None
+
+    if response is not None:
+        response['Content-Disposition'] = content_disposition_header(as_attachment, os.path.basename(path))
+        return response
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # The row outlived its file, e.g. after a restore without the media folder.
+        raise Http404("The file is missing from storage.")
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # RFC 9110 defines ranges for GET only; a HEAD describes the whole file.
+    if request.method == 'GET' and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = stat.st_size
+    elif byte_range is None:
+        # FileResponse lets the WSGI server use sendfile() when it can.
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(iter_range(path, start, length), status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, os.path.basename(path))
+    return response
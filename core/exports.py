@@ -0,0 +1,94 @@
+# core/exports.py
+#
+# Streaming attendee exports. Rows are produced from a server-side cursor a
+# chunk at a time and written straight to the response, so memory use stays
+# flat however many people registered.
+
+import csv
+import json
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
+from .models import AttendeeAnswer, EventQuestion
+
+EXPORT_CHUNK_SIZE = 2000
+
+BASE_COLUMNS = ['id', 'first_name', 'last_name', 'email', 'event', 'registration_date']
+
+
+class Echo:
+    """A file-like object whose write() just returns the value, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def _question_columns(queryset):
+    """
+    One column per EventQuestion of the events in `queryset`. Labels are
+    prefixed with the event name when more than one event is exported.
+    """
+    questions = list(
+        EventQuestion.objects.filter(event__in=queryset.values('event'))
+        .select_related('event')
+        .order_by('event__start_datetime', 'event_id', 'order', 'id')
+    )
+    several_events = len({question.event_id for question in questions}) > 1
+    return [
+        (question.id, question.event_id, f'{question.event.name}: {question.label}' if several_events else question.label)
+        for question in questions
+    ]
+
+
+def _rows(queryset):
+    """Yields (base_values, event_id, {question_id: answer}) for each attendee."""
+    attendees = (
+        queryset.select_related('user', 'event')
+        .prefetch_related(Prefetch('answers', queryset=AttendeeAnswer.objects.only('attendee_id', 'question_id', 'answer')))
+        .order_by('pk')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for attendee in attendees:
+        base = [
+            attendee.pk,
+            attendee.user.first_name,
+            attendee.user.last_name,
+            attendee.user.email,
+            attendee.event.name,
+            attendee.registration_date.isoformat(),
+        ]
+        answers = {answer.question_id: answer.answer for answer in attendee.answers.all()}
+        yield base, attendee.event_id, answers
+
+
+def stream_attendees_csv(queryset, filename):
+    question_columns = _question_columns(queryset)
+
+    def generate():
+        writer = csv.writer(Echo())
+        yield writer.writerow(BASE_COLUMNS + [label for _, _, label in question_columns])
+        for base, _, answers in _rows(queryset):
+            yield writer.writerow(base + [answers.get(question_id, '') for question_id, _, _ in question_columns])
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def stream_attendees_ndjson(queryset, filename):
+    """One JSON object per line; answers to the attendee's event questions are keyed by label."""
+    question_columns = _question_columns(queryset)
+
+    def generate():
+        for base, event_id, answers in _rows(queryset):
+            record = dict(zip(BASE_COLUMNS, base))
+            record['answers'] = {
+                label: answers.get(question_id, '')
+                for question_id, question_event_id, label in question_columns
+                if question_event_id == event_id
+            }
+            yield json.dumps(record) + '\n'
+
+    response = StreamingHttpResponse(generate(), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.ndjson"'
+    return response
@@ -1,8 +1,93 @@
 # core/forms.py
 
+import csv
+
 from django import forms
-from django.contrib.auth.models import User
-from .models import EventQuestion, EventResource
+from django.conf import settings
+from .backends import users_with_email
+from .cache import bump_event_versions, cached, get_event_version
+from django.urls import reverse_lazy
+from .models import Event, EventQuestion, EventResource, ResourceUpload
+
+
+# ==============================================================================
+# COMPILED QUESTION SCHEMA (shared by both registration forms)
+# The per-event list of custom fields is built once and kept in Django's cache.
+# It is invalidated by the EventQuestion signals in core/signals.py.
+# ==============================================================================
+
+# Maps EventQuestion.field_type to the form field class and widget to use.
+QUESTION_FIELD_TYPES = {
+    'text': (forms.CharField, None),
+    'textarea': (forms.CharField, forms.Textarea),
+    'dropdown': (forms.ChoiceField, forms.Select),
+    'radio': (forms.ChoiceField, forms.RadioSelect),
+    'checkbox': (forms.MultipleChoiceField, forms.CheckboxSelectMultiple),
+}
+
+
+def question_schema_cache_key(event_id):
+    # Carries the event's question version, so a change to one of its questions
+    # (including from another process) moves its schema to a fresh key.
+    return f"core:question_schema:{event_id}:{get_event_version(event_id, 'questions')}"
+
+
+def compile_question_schema(event_id):
+    """Builds the list of field definitions for an event's custom questions."""
+    schema = []
+    for question in EventQuestion.objects.filter(event_id=event_id):
+        if question.field_type not in QUESTION_FIELD_TYPES:
+            continue
+        field_class, field_widget = QUESTION_FIELD_TYPES[question.field_type]
+        schema.append({
+            'question_id': question.id,
+            'field_key': f'custom_question_{question.id}',
+            'field_type': question.field_type,
+            'field_class': field_class,
+            'widget': field_widget,
+            'label': question.label,
+            'required': question.is_required,
+            'choices': [(choice, choice) for choice in question.get_choices_as_list()],
+        })
+    return schema
+
+
+def get_question_schema(event):
+    """Returns the compiled schema for `event`, compiling and caching it on a miss."""
+    return cached(
+        question_schema_cache_key(event.pk),
+        lambda: compile_question_schema(event.pk),
+        settings.QUESTION_SCHEMA_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_question_schema(event_id):
+    bump_event_versions([event_id], 'questions')
+
+
+def add_question_fields(form, event):
+    """Adds one field per custom question of `event` to `form`."""
+    # Keep the question ids so the views can save answers without re-fetching them.
+    form.questions = {}
+
+    for entry in get_question_schema(event):
+        field_kwargs = {
+            'label': entry['label'],
+            'required': entry['required']
+        }
+        if entry['choices']:
+            field_kwargs['choices'] = entry['choices']
+        if entry['widget']:
+            field_kwargs['widget'] = entry['widget']
+
+        field_key = entry['field_key']
+        form.fields[field_key] = entry['field_class'](**field_kwargs)
+        form.questions[entry['question_id']] = entry
+
+        # It prevents .form-control from being added to radios/checkboxes.
+        if entry['field_type'] not in ['radio', 'checkbox']:
+            form.fields[field_key].widget.attrs.update({'class': 'form-control'})
+
 
 class CombinedSignupForm(forms.Form):
     # --- Part 1: Define the STATIC, REQUIRED fields ---
@@ -37,54 +122,14 @@ class CombinedSignupForm(forms.Form):
     def __init__(self, *args, **kwargs):
         event = kwargs.pop('event')
         super().__init__(*args, **kwargs)
-
-        questions = EventQuestion.objects.filter(event=event)
-
-        for question in questions:
-            field_key = f'custom_question_{question.id}'
-            choices = [(choice, choice) for choice in question.get_choices_as_list()]
-            
-            field_class = None
-            field_widget = None
-
-            if question.field_type == 'text':
-                field_class = forms.CharField
-            elif question.field_type == 'textarea':
-                field_class = forms.CharField
-                field_widget = forms.Textarea
-            elif question.field_type == 'dropdown':
-                field_class = forms.ChoiceField
-                field_widget = forms.Select
-            elif question.field_type == 'radio':
-                field_class = forms.ChoiceField
-                field_widget = forms.RadioSelect
-            elif question.field_type == 'checkbox':
-                field_class = forms.MultipleChoiceField
-                field_widget = forms.CheckboxSelectMultiple
-            
-            if field_class:
-                field_kwargs = {
-                    'label': question.label,
-                    'required': question.is_required
-                }
-                if choices:
-                    field_kwargs['choices'] = choices
-                if field_widget:
-                    field_kwargs['widget'] = field_widget
-
-                self.fields[field_key] = field_class(**field_kwargs)
-                
-                # --- THIS IS THE CRITICAL LOGIC ---
-                # It prevents .form-control from being added to radios/checkboxes.
-                if question.field_type not in ['radio', 'checkbox']:
-                    self.fields[field_key].widget.attrs.update({'class': 'form-control'})
+        add_question_fields(self, event)
 
     # ... (your clean methods are here)
 
     # --- Part 3: Validation Logic ---
     def clean_email(self):
         email = self.cleaned_data.get('email').strip().lower()
-        if User.objects.filter(email=email).exists():
+        if users_with_email(email).exists():
             raise forms.ValidationError("An account with this email address already exists.")
         return email
 
@@ -113,45 +158,7 @@ class DynamicQuestionsForm(forms.Form):
         # This is efficient and ensures consistency.
         event = kwargs.pop('event')
         super().__init__(*args, **kwargs)
-
-        questions = EventQuestion.objects.filter(event=event)
-
-        for question in questions:
-            field_key = f'custom_question_{question.id}'
-            choices = [(choice, choice) for choice in question.get_choices_as_list()]
-            
-            field_class = None
-            field_widget = None
-
-            if question.field_type == 'text':
-                field_class = forms.CharField
-            elif question.field_type == 'textarea':
-                field_class = forms.CharField
-                field_widget = forms.Textarea
-            elif question.field_type == 'dropdown':
-                field_class = forms.ChoiceField
-                field_widget = forms.Select
-            elif question.field_type == 'radio':
-                field_class = forms.ChoiceField
-                field_widget = forms.RadioSelect
-            elif question.field_type == 'checkbox':
-                field_class = forms.MultipleChoiceField
-                field_widget = forms.CheckboxSelectMultiple
-            
-            if field_class:
-                field_kwargs = {
-                    'label': question.label,
-                    'required': question.is_required
-                }
-                if choices:
-                    field_kwargs['choices'] = choices
-                if field_widget:
-                    field_kwargs['widget'] = field_widget
-
-                self.fields[field_key] = field_class(**field_kwargs)
-                
-                if question.field_type not in ['radio', 'checkbox']:
-                    self.fields[field_key].widget.attrs.update({'class': 'form-control'})
+        add_question_fields(self, event)
 
 
 class EventResourceForm(forms.ModelForm):
@@ -165,4 +172,57 @@ class EventResourceForm(forms.ModelForm):
         }
         help_texts = {
             'is_visible': 'Check this to make the file available to all event attendees.'
-        }
\ No newline at end of file
+        }
+
+
+class EventResourceInlineForm(forms.ModelForm):
+    """
+    Admin inline form for resources. Large files picked in the browser are
+    sent through the chunked upload API by static/chunked_upload.js, which
+    then fills in `chunked_upload` instead of posting the file with the form.
+    """
+    chunked_upload = forms.ModelChoiceField(
+        queryset=ResourceUpload.objects.filter(status=ResourceUpload.Status.COMPLETE, resource__isnull=True),
+        required=False,
+        widget=forms.HiddenInput(attrs={
+            'class': 'chunked-upload',
+            'data-upload-url': reverse_lazy('api-resource-upload-create'),
+            'data-chunk-size': settings.RESOURCE_UPLOAD_CHUNK_SIZE,
+        }),
+    )
+
+    class Meta:
+        model = EventResource
+        fields = ['title', 'speaker', 'file', 'is_visible']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('chunked_upload')
+        if upload is not None:
+            cleaned_data['file'] = upload.stored_name
+        elif not cleaned_data.get('file') and not self.instance.file:
+            self.add_error('file', forms.ValidationError("This field is required.", code='required'))
+        return cleaned_data
+
+
+class AttendeeImportForm(forms.Form):
+    """The admin's bulk attendee import page (see core/imports.py)."""
+    event = forms.ModelChoiceField(queryset=Event.objects.all())
+    file = forms.FileField(
+        label="CSV file",
+        help_text="Columns: email (required), first_name, last_name, password, company_name, job_title.",
+    )
+
+    def clean_file(self):
+        # The rows are only read by the import worker; catch a wrong file here.
+        file = self.cleaned_data['file']
+        header = file.readline().decode('utf-8-sig', errors='replace')
+        file.seek(0)
+        if 'email' not in [name.strip().lower() for name in next(csv.reader([header]), [])]:
+            raise forms.ValidationError("The CSV file needs an 'email' column.")
+        return file
+
@@ -0,0 +1,163 @@
+# core/images.py
+#
+# Resized derivatives of uploaded images. Each original gets one WebP and one
+# JPEG file per size in settings.IMAGE_DERIVATIVE_SIZES, stored with the same
+# storage under a `derivatives/` folder next to it. Derivative names are
+# derived from the original's name, so URLs are built without touching storage.
+# The derivatives are made when an image is uploaded and deleted when it is
+# replaced or its object deleted (see core/signals.py).
+
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.templatetags.static import static
+
+DEFAULT_IMAGE = 'images/default.png'
+
+# Derivatives are at most this many times as tall as they are wide.
+MAX_ASPECT_RATIO = 4
+
+# format name -> (Pillow format, file extension, content type)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+
+def derivative_name(name, size, format='jpeg'):
+    """
+    event_images/talk.png, 'card', 'webp' -> event_images/derivatives/talk.png-card.webp
+
+    The original's whole file name is kept, extension included, so talk.png
+    and talk.jpg in the same folder get derivatives of their own.
+    """
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, 'derivatives', f'{filename}-{size}.{FORMATS[format][1]}')
+
+
+def derivative_names(name):
+    return [
+        derivative_name(name, size, format)
+        for size in settings.IMAGE_DERIVATIVE_SIZES
+        for format in FORMATS
+    ]
+
+
+def derivative_width(width, image_size):
+    """
+    The width a derivative `width` pixels wide ends up with when made from an
+    image of `image_size` (width, height), as Image.thumbnail sizes it: never
+    enlarged, and narrower for very tall images.
+    """
+    original_width, original_height = image_size
+    scale = min(width / original_width, width * MAX_ASPECT_RATIO / original_height, 1)
+    return max(round(original_width * scale), 1)
+
+
+def size_fields(field_file):
+    """
+    Names of the model fields holding the original's width and height:
+    `<field>_width` and `<field>_height`, e.g. featured_image_width.
+    """
+    name = field_file.field.name
+    return f'{name}_width', f'{name}_height'
+
+
+def original_size(field_file):
+    """(width, height) of the original as stored on its model, or None if unknown."""
+    width, height = (getattr(field_file.instance, name, None) for name in size_fields(field_file))
+    return (width, height) if width and height else None
+
+
+def save_original_size(field_file, size):
+    """Stores `size` (width, height, or Nones) in the size fields of the field's instance."""
+    instance = field_file.instance
+    fields = size_fields(field_file)
+    for name, value in zip(fields, size):
+        setattr(instance, name, value)
+    # A save() limited to these fields, so `updated_at` moves and the page
+    # version stamps are bumped for the new srcset. The derivatives exist by
+    # now, so the save signals do not resize the image again.
+    update_fields = [*fields, *(['updated_at'] if hasattr(instance, 'updated_at') else [])]
+    instance.save(update_fields=update_fields)
+
+
+def has_derivatives(field_file):
+    return bool(field_file) and field_file.storage.exists(derivative_name(field_file.name, next(iter(settings.IMAGE_DERIVATIVE_SIZES)), 'webp'))
+
+
+def generate_derivatives(field_file):
+    """
+    Writes every size and format of `field_file` to its storage, replacing any
+    earlier copies. Images are never enlarged: a size wider than the original
+    is stored at the original's width. Returns the original's (width, height),
+    after any EXIF rotation.
+    """
+    # Pillow is only needed when an image is uploaded; keep it out of startup.
+    from PIL import Image, ImageOps
+
+    with field_file.open('rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+
+    if original.mode in ('RGBA', 'LA', 'P'):
+        # JPEG has no alpha channel; flatten transparent images onto white.
+        rgba = original.convert('RGBA')
+        original = Image.new('RGB', rgba.size, (255, 255, 255))
+        original.paste(rgba, mask=rgba.getchannel('A'))
+    elif original.mode != 'RGB':
+        original = original.convert('RGB')
+
+    storage = field_file.storage
+    for size, width in settings.IMAGE_DERIVATIVE_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail((width, width * MAX_ASPECT_RATIO), Image.Resampling.LANCZOS)
+        for format, (pil_format, _, _) in FORMATS.items():
+            buffer = ContentFile(b'')
+            options = {'quality': settings.IMAGE_DERIVATIVE_QUALITY}
+            if pil_format == 'JPEG':
+                options.update(optimize=True, progressive=True)
+            else:
+                options.update(method=4)
+            resized.save(buffer, pil_format, **options)
+
+            name = derivative_name(field_file.name, size, format)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, buffer)
+    return original.size
+
+
+def delete_derivatives(name, storage):
+    for derivative in derivative_names(name):
+        if storage.exists(derivative):
+            storage.delete(derivative)
+
+
+def image_url(field_file, size=None, format='jpeg'):
+    """
+    URL of the `size` derivative of `field_file` in `format`, or of the
+    original when no size is given. Empty fields fall back to the default image.
+    """
+    if not field_file:
+        return static(DEFAULT_IMAGE)
+    if size is None:
+        return field_file.url
+    return field_file.storage.url(derivative_name(field_file.name, size, format))
+
+
+def image_srcset(field_file, format='jpeg'):
+    """
+    A `srcset` value listing every derivative width of `field_file` in
+    `format`. The widths are the derivatives' real ones, so an original
+    smaller than the largest size is not listed as wider than it is, and
+    sizes that came out the same width are listed once.
+    """
+    if not field_file:
+        return ''
+    size = original_size(field_file)
+    sizes = {}
+    for name, width in settings.IMAGE_DERIVATIVE_SIZES.items():
+        sizes.setdefault(derivative_width(width, size) if size else width, name)
+    return ', '.join(f'{image_url(field_file, name, format)} {width}w' for width, name in sizes.items())
@@ -0,0 +1,289 @@
+# core/imports.py
+#
+# Bulk registration of attendees from a CSV file, for partner lists with tens
+# of thousands of people. The file is validated row by row as it is read and
+# written in chunks: per chunk, existing accounts are matched by email in one
+# query, usernames for new accounts are allocated in bulk, passwords are
+# hashed in a process pool, and User, UserProfile and Attendee rows are each
+# written with one bulk_create. A bad row is reported and skipped; it never
+# aborts the rest of the import.
+#
+# Columns: email (required), first_name, last_name, password, company_name,
+# job_title. Rows without a password get an unusable one; those people set a
+# password through "forgot password".
+#
+# The admin does not import in the request: it queues an ImportJob, which the
+# `run_import_jobs` management command picks up. A job whose worker died is
+# claimed again after ATTENDEE_IMPORT_JOB_TIMEOUT seconds; chunks it already
+# wrote are then reported as "already registered" rows.
+
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .backends import normalize_email
+from .models import Attendee, ImportJob, UserProfile
+from .stats import adjust_event_attendees
+from .utils import generate_unique_usernames
+
+User = get_user_model()
+
+COLUMNS = ['email', 'first_name', 'last_name', 'password', 'company_name', 'job_title']
+
+FIELD_MAX_LENGTHS = {
+    'first_name': User._meta.get_field('first_name').max_length,
+    'last_name': User._meta.get_field('last_name').max_length,
+    'company_name': UserProfile._meta.get_field('company_name').max_length,
+    'job_title': UserProfile._meta.get_field('job_title').max_length,
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created_users = 0
+        self.existing_users = 0
+        self.registered = 0
+        self.errors = []  # (line number, message)
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def merge(self, other):
+        self.created_users += other.created_users
+        self.existing_users += other.existing_users
+        self.registered += other.registered
+        self.errors.extend(other.errors)
+
+    def __str__(self):
+        return (
+            f"{self.registered} registered ({self.created_users} new accounts, "
+            f"{self.existing_users} existing), {len(self.errors)} rows skipped"
+        )
+
+
+def init_worker():
+    """Process pool initializer: password hashing needs the project's settings."""
+    django.setup()
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def read_rows(file, result):
+    """
+    Yields (line number, row dict) for every valid row of a CSV file object
+    (text or bytes), recording invalid and repeated rows on `result` instead.
+    """
+    if not isinstance(file, io.TextIOBase):
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(file)
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames or []]
+    if 'email' not in reader.fieldnames:
+        raise ValueError("The CSV file needs an 'email' column.")
+
+    seen = set()
+    for row in reader:
+        line = reader.line_num
+        row = {column: (row.get(column) or '').strip() for column in COLUMNS}
+        row['email'] = normalize_email(row['email'])
+        try:
+            validate_email(row['email'])
+        except ValidationError:
+            result.error(line, f"'{row['email']}' is not a valid email address.")
+            continue
+        too_long = [column for column, limit in FIELD_MAX_LENGTHS.items() if len(row[column]) > limit]
+        if too_long:
+            result.error(line, f"Too long: {', '.join(too_long)}.")
+            continue
+        if row['email'] in seen:
+            result.error(line, f"{row['email']} appears more than once in the file.")
+            continue
+        seen.add(row['email'])
+        yield line, row
+
+
+def _write_chunk(event, chunk, passwords):
+    """Registers one chunk of (line, row) pairs. Returns the chunk's ImportResult."""
+    result = ImportResult()
+    emails = [row['email'] for _, row in chunk]
+    existing = dict(
+        User.objects.annotate(email_key=Lower('email'))
+        .filter(email_key__in=emails)
+        .values_list('email_key', 'pk')
+    )
+    already_registered = set(
+        Attendee.objects.filter(event=event, user_id__in=existing.values()).values_list('user_id', flat=True)
+    )
+
+    new_rows = []
+    user_ids = []
+    for (line, row), password in zip(chunk, passwords):
+        user_id = existing.get(row['email'])
+        if user_id is None:
+            new_rows.append((line, row, password))
+        elif user_id in already_registered:
+            result.error(line, f"{row['email']} is already registered for {event.name}.")
+        else:
+            user_ids.append(user_id)
+            result.existing_users += 1
+
+    if new_rows:
+        usernames = generate_unique_usernames([row['first_name'] for _, row, _ in new_rows])
+        users = User.objects.bulk_create([
+            User(
+                username=username,
+                email=row['email'],
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                password=password,
+            )
+            for username, (_, row, password) in zip(usernames, new_rows)
+        ])
+        if any(user.pk is None for user in users):
+            # Backends that can't return ids from a bulk insert.
+            ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+            for user in users:
+                user.pk = ids[user.username]
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, company_name=row['company_name'], job_title=row['job_title'])
+            for user, (_, row, _) in zip(users, new_rows)
+        ])
+        user_ids.extend(user.pk for user in users)
+        result.created_users += len(users)
+
+    Attendee.objects.bulk_create([Attendee(user_id=user_id, event=event) for user_id in user_ids])
+    # bulk_create sends no post_save, so keep the EventStats rollup in step here.
+    adjust_event_attendees({event.pk: len(user_ids)})
+    result.registered = len(user_ids)
+    return result
+
+
+def import_attendees(file, event, chunk_size=None, processes=None):
+    """
+    Registers everyone in the CSV `file` for `event`, creating accounts for
+    emails that have none. Returns an ImportResult with per-row errors.
+    """
+    chunk_size = chunk_size or settings.ATTENDEE_IMPORT_CHUNK_SIZE
+    processes = processes or settings.ATTENDEE_IMPORT_PROCESSES
+    result = ImportResult()
+    rows = read_rows(file, result)
+
+    # Only started once a row brings a password to hash.
+    pool = None
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            # Only rows that bring a password need real hashing; the rest get an
+            # unusable one, which is cheap to make here.
+            to_hash = [row['password'] for _, row in chunk if row['password']]
+            hashed = iter(())
+            if to_hash:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=processes, initializer=init_worker)
+                hashed = iter(pool.map(hash_password, to_hash, chunksize=max(len(to_hash) // processes, 1)))
+            passwords = [next(hashed) if row['password'] else make_password(None) for _, row in chunk]
+
+            try:
+                with transaction.atomic():
+                    result.merge(_write_chunk(event, chunk, passwords))
+            except DatabaseError:
+                # Something in the chunk clashed (e.g. someone signed up meanwhile);
+                # retry its rows one at a time so only the bad ones are skipped.
+                for item, password in zip(chunk, passwords):
+                    try:
+                        with transaction.atomic():
+                            result.merge(_write_chunk(event, [item], [password]))
+                    except DatabaseError as e:
+                        result.error(item[0], f"Could not be saved: {e}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result
+
+
+# ==============================================================================
+# QUEUED IMPORTS (admin "Bulk import" page)
+# ==============================================================================
+
+def queue_import(event, file, user=None):
+    """Stores an uploaded CSV file and queues an ImportJob for it."""
+    job = ImportJob(event=event, filename=file.name[:255], requested_by=user)
+    job.file.save(f'{timezone.now():%Y%m%d%H%M%S}.csv', file, save=False)
+    job.save()
+    return job
+
+
+def claim_import_job():
+    """
+    Marks the oldest pending job as running and returns it, or None.
+
+    A job left running by a worker that died is claimed again once it has
+    been running for longer than ATTENDEE_IMPORT_JOB_TIMEOUT seconds, or
+    failed if it has already had ATTENDEE_IMPORT_JOB_MAX_ATTEMPTS tries.
+    """
+    now = timezone.now()
+    abandoned = Q(
+        status=ImportJob.Status.RUNNING,
+        started_at__lt=now - timedelta(seconds=settings.ATTENDEE_IMPORT_JOB_TIMEOUT),
+    )
+    with transaction.atomic():
+        for job in ImportJob.objects.filter(abandoned, attempts__gte=settings.ATTENDEE_IMPORT_JOB_MAX_ATTEMPTS):
+            finish_import_job(job, error="The worker running this import stopped.")
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ImportJob.Status.PENDING) | abandoned)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.Status.RUNNING, started_at=now, attempts=F('attempts') + 1,
+        )
+    job.status = ImportJob.Status.RUNNING
+    job.started_at = now
+    job.attempts += 1
+    return job
+
+
+def finish_import_job(job, result=None, error=None):
+    """Stores the outcome on the job and deletes its file, which is not needed any more."""
+    if job.file:
+        job.file.delete(save=False)
+    job.finished_at = timezone.now()
+    if error is not None:
+        job.status = ImportJob.Status.FAILED
+        job.error = str(error)
+    else:
+        job.status = ImportJob.Status.DONE
+        job.summary = str(result)
+        job.row_errors = result.errors[:settings.ATTENDEE_IMPORT_JOB_ERRORS_KEPT]
+    job.save(update_fields=['file', 'status', 'summary', 'row_errors', 'error', 'finished_at'])
+
+
+def run_import_job(job, chunk_size=None, processes=None):
+    """Imports a claimed job's file and records the result on it."""
+    try:
+        with job.file.open('rb') as f:
+            result = import_attendees(f.file, job.event, chunk_size, processes)
+    except (OSError, ValueError) as e:
+        finish_import_job(job, error=e)
+        return None
+    finish_import_job(job, result)
+    return result
@@ -0,0 +1,142 @@
+# core/mail_queue.py
+#
+# A small database-backed outbound mail queue. Views call enqueue_email()
+# instead of sending, and the `send_queued_emails` management command drains
+# the queue with a bounded pool of workers.
+#
+# Everything except attachments is stored: recipients (to, cc, bcc), reply-to,
+# extra headers, the body's subtype and any HTML or other alternatives.
+# Attachments would have to be kept as blobs in the queue table, so messages
+# with attachments are rejected rather than sent without them.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def enqueue_email(email_message):
+    """
+    Stores an EmailMessage (or EmailMultiAlternatives) in the outbound queue
+    and returns the queued row. Raises ValueError for messages the queue
+    cannot carry: ones with attachments or with non-text alternatives.
+    """
+    if email_message.attachments:
+        raise ValueError("Queued emails cannot have attachments; send the message directly instead.")
+    alternatives = [list(alternative) for alternative in getattr(email_message, 'alternatives', [])]
+    if any(not isinstance(content, str) for content, mimetype in alternatives):
+        raise ValueError("Queued emails can only have text alternatives.")
+    return OutboundEmail.objects.create(
+        subject=email_message.subject,
+        body=email_message.body,
+        content_subtype=email_message.content_subtype,
+        from_email=email_message.from_email or '',
+        to=list(email_message.to),
+        cc=list(email_message.cc),
+        bcc=list(email_message.bcc),
+        reply_to=list(email_message.reply_to),
+        headers=dict(email_message.extra_headers),
+        alternatives=alternatives,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base, ... capped at the max delay."""
+    delay = settings.EMAIL_QUEUE_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.EMAIL_QUEUE_RETRY_MAX_SECONDS))
+
+
+def claim_batch(batch_size):
+    """
+    Marks up to `batch_size` due messages as SENDING and returns them.
+
+    Messages left in SENDING by a worker that died are reclaimed once their
+    lock is older than EMAIL_QUEUE_LOCK_TIMEOUT seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EMAIL_QUEUE_LOCK_TIMEOUT)
+    due = Q(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now) | Q(
+        status=OutboundEmail.Status.SENDING, locked_at__lt=stale
+    )
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status=OutboundEmail.Status.SENDING, locked_at=now
+        )
+    return batch
+
+
+def send_batch(batch):
+    """
+    Sends a claimed batch over a single SMTP connection and records the
+    outcome of each message. Returns (sent, failed) counts.
+    """
+    sent = failed = 0
+    if not batch:
+        return sent, failed
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for message in batch:
+            _record_failure(message, e)
+        return sent, len(batch)
+
+    try:
+        for message in batch:
+            email_message = EmailMultiAlternatives(
+                message.subject,
+                message.body,
+                from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+                to=message.to,
+                cc=message.cc,
+                bcc=message.bcc,
+                reply_to=message.reply_to,
+                headers=message.headers,
+                alternatives=[tuple(alternative) for alternative in message.alternatives],
+                connection=connection,
+            )
+            email_message.content_subtype = message.content_subtype
+            try:
+                email_message.send()
+            except Exception as e:
+                _record_failure(message, e)
+                failed += 1
+            else:
+                message.status = OutboundEmail.Status.SENT
+                message.attempts += 1
+                message.sent_at = timezone.now()
+                message.locked_at = None
+                message.last_error = ''
+                message.save(update_fields=['status', 'attempts', 'sent_at', 'locked_at', 'last_error'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _record_failure(message, error):
+    message.attempts += 1
+    message.last_error = str(error)
+    message.locked_at = None
+    if message.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+        message.status = OutboundEmail.Status.FAILED
+    else:
+        message.status = OutboundEmail.Status.PENDING
+        message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+    message.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'next_attempt_at'])
+
+
+def process_queue(batch_size):
+    """Claims and sends one batch. Returns (sent, failed) counts."""
+    return send_batch(claim_batch(batch_size))
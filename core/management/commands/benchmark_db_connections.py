@@ -0,0 +1,127 @@
+import statistics
+import time
+
+import dj_database_url
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import Event
+
+PERSISTENT_MAX_AGE = 600
+
+# Connection settings taken from --pgbouncer; the rest (engine, options) stay as configured.
+PGBOUNCER_KEYS = ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures request latency of the events API and an event page with a new "
+        "database connection per request versus reused connections, using the "
+        "configured database. When DB_POOL_MODE='django' configures a pool, the "
+        "pooled mode is measured too, against the same two modes without the pool. "
+        "With --pgbouncer, new connections per request through PgBouncer are measured "
+        "as well. Needs at least one active event."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Requests timed per URL and mode.")
+        parser.add_argument('--warmup', type=int, default=10,
+                            help="Untimed requests per URL and mode, to fill caches first.")
+        parser.add_argument('--pgbouncer', metavar='DATABASE_URL',
+                            help="URL of a PgBouncer (transaction pooling) in front of the configured "
+                                 "PostgreSQL database, e.g. postgres://user:pw@localhost:6432/efs.")
+
+    def handle(self, *args, **options):
+        event = Event.objects.filter(is_active=True).order_by('pk').first()
+        if event is None:
+            raise CommandError("There are no active events to request.")
+        urls = [reverse('api-event-list'), event.get_absolute_url()]
+
+        # mode -> (CONN_MAX_AGE, pool options, connection settings); the unpooled modes
+        # always run, so a pool is compared with what it replaces.
+        modes = [('per-request', 0, None, {}), ('persistent', PERSISTENT_MAX_AGE, None, {})]
+        pool = connection.settings_dict.get('OPTIONS', {}).get('pool')
+        if pool:
+            # With a pool "connects" counts checkouts from it, not new server connections.
+            modes.append(('pooled', 0, pool, {}))
+        if options['pgbouncer']:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--pgbouncer needs the configured database to be PostgreSQL.")
+            target = dj_database_url.parse(options['pgbouncer'])
+            # As DB_POOL_MODE='pgbouncer' sets up: a cursor can't outlive its transaction there.
+            modes.append(('pgbouncer', 0, None, {
+                **{key: target[key] for key in PGBOUNCER_KEYS}, 'DISABLE_SERVER_SIDE_CURSORS': True,
+            }))
+
+        self.stdout.write(f"Database: {connection.vendor} {connection.settings_dict.get('HOST') or connection.settings_dict['NAME']}")
+        self.stdout.write(f"{'mode':<12} {'url':<24} {'connects':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for mode, max_age, pool, target in modes:
+            for url in urls:
+                connects, timings = self.measure(url, max_age, pool, target, options['requests'], options['warmup'])
+                timings.sort()
+                p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+                self.stdout.write(
+                    f"{mode:<12} {url:<24} {connects:>9} {statistics.mean(timings):>9.2f} "
+                    f"{statistics.median(timings):>9.2f} {p95:>9.2f}"
+                )
+
+    def request(self, client, url):
+        # The test client skips the request_started/request_finished connection
+        # handling of a real server; do it here so CONN_MAX_AGE takes effect.
+        close_old_connections()
+        response = client.get(url)
+        close_old_connections()
+        return response
+
+    def use_pool(self, pool):
+        """Turns the connection pool on (with these options) or off for the following requests."""
+        connection.close()
+        # Drop the pool built from the previous options, if any.
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        options = connection.settings_dict.setdefault('OPTIONS', {})
+        if pool:
+            options['pool'] = pool
+        else:
+            options.pop('pool', None)
+
+    def measure(self, url, max_age, pool, target, requests, warmup):
+        """`target` overrides connection settings, e.g. to connect through PgBouncer."""
+        original_max_age = connection.settings_dict['CONN_MAX_AGE']
+        original_pool = connection.settings_dict.get('OPTIONS', {}).get('pool')
+        original_target = {key: connection.settings_dict.get(key) for key in target}
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        # use_pool() closes the connection, so the next request connects to `target`.
+        connection.settings_dict.update(target)
+        self.use_pool(pool)
+
+        connects = 0
+
+        def count(**kwargs):
+            nonlocal connects
+            connects += 1
+
+        client = Client()
+        timings = []
+        connection_created.connect(count)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for _ in range(warmup):
+                    self.request(client, url)
+                connects = 0
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    response = self.request(client, url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{url} answered {response.status_code}.")
+        finally:
+            connection_created.disconnect(count)
+            connection.settings_dict['CONN_MAX_AGE'] = original_max_age
+            connection.settings_dict.update(original_target)
+            self.use_pool(original_pool)
+        return connects, timings
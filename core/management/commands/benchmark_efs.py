@@ -0,0 +1,230 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django import forms
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.forms import CombinedSignupForm
+from core.models import Attendee, AttendeeAnswer, Event
+from core.seeding import USERNAME_PREFIX, seeded_users
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Times signup, the dashboard, event pages, the events API and the admin exports "
+        "against the configured database (fill it with seed_efs first) and writes the "
+        "results to a JSON file. --compare prints the change against an earlier file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per scenario, to fill caches first.")
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', help="Run only these scenarios.")
+        parser.add_argument('--output', help="JSON file to write (default: benchmark-<commit>.json).")
+        parser.add_argument('--compare', metavar='JSON', help="An earlier results file to compare with.")
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            report = self.run(options)
+
+        output = options['output'] or f"benchmark-{report['commit'][:12] or 'local'}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}."))
+
+        if options['compare']:
+            self.compare(options['compare'], report)
+
+    def run(self, options):
+        event = (
+            Event.objects.filter(is_active=True, start_datetime__gt=timezone.now(), attendees__isnull=False)
+            .order_by('-stats__attendee_count', 'pk').first()
+        )
+        if event is None:
+            raise CommandError("No upcoming event with attendees; run seed_efs first.")
+        attendee = Attendee.objects.filter(event=event).select_related('user').order_by('pk').first()
+        admin_user = (
+            seeded_users().filter(username=f'{USERNAME_PREFIX}admin', is_superuser=True).first()
+            or User.objects.filter(is_superuser=True).order_by('pk').first()
+        )
+        if admin_user is None:
+            raise CommandError("No superuser to run the admin exports as.")
+
+        self.user_client = Client()
+        self.user_client.force_login(attendee.user)
+        self.admin_client = Client()
+        self.admin_client.force_login(admin_user)
+        self.anonymous_client = Client()
+        self.event = event
+        self.signups = 0
+
+        scenarios = self.scenarios()
+        if options['only']:
+            unknown = set(options['only']) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(scenarios)}.")
+            scenarios = {name: scenarios[name] for name in options['only']}
+
+        self.stdout.write(f"Event: {event.name} (#{event.pk}, {event.stats.attendee_count} attendees)")
+        self.stdout.write(f"{'scenario':<24} {'status':>6} {'queries':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        results = {}
+        for name, (request, expected_status) in scenarios.items():
+            results[name] = result = self.measure(request, expected_status, options['requests'], options['warmup'])
+            self.stdout.write(
+                f"{name:<24} {result['status']:>6} {result['queries']:>8} {result['mean_ms']:>9.2f} "
+                f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f}"
+            )
+
+        return {
+            'commit': self.git_commit(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'rows': {
+                'events': Event.objects.count(),
+                'users': User.objects.count(),
+                'attendees': Attendee.objects.count(),
+                'answers': AttendeeAnswer.objects.count(),
+            },
+            'requests': options['requests'],
+            'results': results,
+        }
+
+    # ==========================================================================
+    # SCENARIOS
+    # ==========================================================================
+
+    def scenarios(self):
+        """name -> (function making one request and returning the response, expected status)."""
+        event = self.event
+        api_url = reverse('api-event-list')
+        etag = self.user_client.get(api_url).get('ETag')
+        if etag is None:
+            raise CommandError("The events API sent no ETag.")
+        attendee_changelist = reverse('admin:core_attendee_changelist') + f'?event__id__exact={event.pk}'
+        question_changelist = reverse('admin:core_eventquestion_changelist') + f'?event__id__exact={event.pk}'
+        return {
+            'signup_form': (lambda: self.anonymous_client.get(reverse('efs_signup', args=[event.pk])), 200),
+            'signup_submit': (self.submit_signup, 302),
+            'dashboard': (lambda: self.user_client.get(reverse('efs_dashboard')), 200),
+            'event_detail': (lambda: self.user_client.get(reverse('event_detail', args=[event.pk])), 200),
+            'events_api': (lambda: self.user_client.get(api_url), 200),
+            'events_api_not_modified': (lambda: self.user_client.get(api_url, HTTP_IF_NONE_MATCH=etag), 304),
+            'admin_export_attendees': (
+                lambda: self.run_action(attendee_changelist, 'export_as_csv', event.attendees.first()), 200,
+            ),
+            'admin_export_summaries': (
+                lambda: self.run_action(question_changelist, 'export_summary_as_csv', event.questions.first()), 200,
+            ),
+        }
+
+    def submit_signup(self):
+        """Signs a new person up for the event, answering every question; rolled back afterwards."""
+        self.signups += 1
+        form = CombinedSignupForm(event=self.event)
+        data = {
+            'first_name': 'Bench',
+            'last_name': 'Mark',
+            'email': f'benchmark-{self.signups}@example.com',
+            'password': 'benchmark-password',
+            'confirm_password': 'benchmark-password',
+        }
+        for key, field in form.fields.items():
+            if key not in data:
+                choices = [value for value, _ in getattr(field, 'choices', [])]
+                if isinstance(field, forms.MultipleChoiceField):
+                    data[key] = choices[:1]
+                else:
+                    data[key] = choices[0] if choices else 'Benchmark'
+        try:
+            with transaction.atomic():
+                response = self.anonymous_client.post(reverse('efs_signup', args=[self.event.pk]), data)
+                raise Rollback
+        except Rollback:
+            pass
+        return response
+
+    def run_action(self, changelist_url, action, row):
+        """
+        Runs an admin action on every row of a (filtered) changelist, as "Select
+        all" does. The admin still wants one row of the page ticked.
+        """
+        return self.admin_client.post(changelist_url, {
+            'action': action, 'select_across': '1', 'index': '0', ACTION_CHECKBOX_NAME: [row.pk],
+        })
+
+    # ==========================================================================
+    # MEASURING
+    # ==========================================================================
+
+    def request(self, make_request):
+        start = time.perf_counter()
+        response = make_request()
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response, (time.perf_counter() - start) * 1000
+
+    def measure(self, make_request, expected_status, requests, warmup):
+        for _ in range(warmup):
+            self.request(make_request)
+        # Counted separately, so the query log's overhead stays out of the timings.
+        with CaptureQueriesContext(connection) as queries:
+            response, _ = self.request(make_request)
+        query_count = len(queries.captured_queries)
+        if response.status_code != expected_status:
+            raise CommandError(f"Expected {expected_status}, got {response.status_code}.")
+
+        timings = sorted(self.request(make_request)[1] for _ in range(requests))
+        return {
+            'status': response.status_code,
+            'queries': query_count,
+            'mean_ms': round(statistics.mean(timings), 3),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+            'min_ms': round(timings[0], 3),
+            'max_ms': round(timings[-1], 3),
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
+
+    def compare(self, path, report):
+        with open(path) as f:
+            baseline = json.load(f)
+        if baseline.get('rows') != report['rows']:
+            self.stdout.write(self.style.WARNING("The two runs used different data; compare with care."))
+        self.stdout.write(f"Compared with {baseline.get('commit', '')[:12] or path}:")
+        self.stdout.write(f"{'scenario':<24} {'queries':>11} {'p50 ms':>21} {'change':>8}")
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if before is None:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            self.stdout.write(
+                f"{name:<24} {before['queries']:>4} -> {result['queries']:<4} "
+                f"{before['p50_ms']:>9.2f} -> {result['p50_ms']:<9.2f} {change:>+7.1f}%"
+            )
@@ -0,0 +1,109 @@
+import os
+import statistics
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import Event
+
+User = get_user_model()
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'efs_portal.wsgi', '--bind', '127.0.0.1:{port}', '--workers', '{workers}'],
+    'asgi': ['uvicorn', 'efs_portal.asgi:application', '--host', '127.0.0.1', '--port', '{port}',
+             '--workers', '{workers}', '--log-level', 'warning'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts the app under gunicorn (WSGI) and uvicorn (ASGI) in turn and measures "
+        "throughput of the dashboard, an event page and the events API under concurrent "
+        "requests. Uses the configured database; needs an active event and a user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--requests', type=int, default=500, help="Requests per URL and mode.")
+        parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument('--workers', type=int, default=2, help="Server worker processes.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--username', help="User to load the dashboard as (default: the first user).")
+
+    def handle(self, *args, **options):
+        event = Event.objects.filter(is_active=True).order_by('pk').first()
+        user = User.objects.filter(username=options['username']).first() if options['username'] else User.objects.order_by('pk').first()
+        if event is None or user is None:
+            raise CommandError("Needs at least one active event and one user.")
+
+        # A real session cookie, so the dashboard is measured logged in.
+        client = Client()
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            client.force_login(user)
+        cookie = f"sessionid={client.cookies['sessionid'].value}"
+        urls = [reverse('efs_dashboard'), event.get_absolute_url(), reverse('api-event-list')]
+
+        self.stdout.write(
+            f"{options['requests']} requests per URL, {options['concurrency']} concurrent, "
+            f"{options['workers']} workers"
+        )
+        self.stdout.write(f"{'mode':<6} {'url':<22} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for mode in options['modes']:
+            server = self.start(mode, options['port'], options['workers'])
+            try:
+                for url in urls:
+                    rate, p50, p95, errors = self.load(
+                        f"http://127.0.0.1:{options['port']}{url}", cookie,
+                        options['requests'], options['concurrency'],
+                    )
+                    self.stdout.write(f"{mode:<6} {url:<22} {rate:>8.1f} {p50:>8.1f} {p95:>8.1f} {errors:>7}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    def start(self, mode, port, workers):
+        command = [part.format(port=port, workers=workers) for part in SERVERS[mode]]
+        env = {**os.environ, 'ALLOWED_HOSTS': '127.0.0.1,localhost'}
+        server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{command[0]} exited with {server.returncode}; is it installed?")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{reverse('api-event-list')}", timeout=1)
+                return server
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"{command[0]} did not start within 30 seconds.")
+
+    def load(self, url, cookie, requests, concurrency):
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Cookie': cookie})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            return (time.perf_counter() - start) * 1000, ok
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Warm up each worker's connections and caches first.
+            list(pool.map(fetch, range(concurrency)))
+            start = time.perf_counter()
+            results = list(pool.map(fetch, range(requests)))
+            elapsed = time.perf_counter() - start
+
+        timings = sorted(timing for timing, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        return requests / elapsed, statistics.median(timings), p95, errors
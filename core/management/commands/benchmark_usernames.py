@@ -0,0 +1,54 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import slugify
+
+from core.models import UsernameCounter
+from core.utils import generate_unique_username
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures generate_unique_username as the number of users sharing a first name grows. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                            help="Numbers of existing same-name users to measure at.")
+        parser.add_argument('--samples', type=int, default=20,
+                            help="Allocations timed at each size.")
+        parser.add_argument('--name', default='benchmark',
+                            help="The first name to allocate usernames for.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'existing':>10} {'queries/alloc':>14} {'ms/alloc':>10}")
+        with transaction.atomic():
+            for size in options['sizes']:
+                queries, elapsed = self.measure(options['name'], size, options['samples'])
+                self.stdout.write(f"{size:>10} {queries:>14.1f} {elapsed * 1000:>10.3f}")
+            transaction.set_rollback(True)
+
+    def measure(self, name, size, samples):
+        base = slugify(name) or 'user'
+        User.objects.filter(username__startswith=base).delete()
+        UsernameCounter.objects.filter(base=base).delete()
+
+        User.objects.bulk_create(
+            [User(username=base if i == 0 else f"{base}{i}") for i in range(size)],
+            batch_size=1000,
+        )
+        # Seed the counter from the existing users once; that scan is not part of the steady state.
+        User.objects.create(username=generate_unique_username(name))
+
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            for _ in range(samples):
+                generate_unique_username(name)
+            elapsed = time.perf_counter() - start
+        return len(context.captured_queries) / samples, elapsed / samples
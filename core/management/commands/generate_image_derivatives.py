@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.images import generate_derivatives, has_derivatives, original_size, save_original_size
+from core.models import Event, Speaker
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the resized WebP/JPEG copies of event images and speaker pictures, "
+        "and records each original's size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Regenerate derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        generated = 0
+        images = [
+            *(event.featured_image for event in Event.objects.exclude(featured_image='').exclude(featured_image=None).only('featured_image', 'featured_image_width', 'featured_image_height')),
+            *(speaker.picture for speaker in Speaker.objects.exclude(picture='').exclude(picture=None).only('picture', 'picture_width', 'picture_height')),
+        ]
+        for field_file in images:
+            if not options['force'] and has_derivatives(field_file) and original_size(field_file):
+                continue
+            try:
+                save_original_size(field_file, generate_derivatives(field_file))
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"Skipped {field_file.name}: {e}")
+                continue
+            generated += 1
+        self.stdout.write(self.style.SUCCESS(f"Generated derivatives for {generated} images."))
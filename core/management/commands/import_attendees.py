@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import import_attendees
+from core.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Registers everyone in a CSV file for an event, creating accounts for new emails. "
+        "Columns: email, first_name, last_name, password, company_name, job_title."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="The CSV file to import.")
+        parser.add_argument('--event', type=int, required=True, help="ID of the event to register people for.")
+        parser.add_argument('--chunk-size', type=int, default=settings.ATTENDEE_IMPORT_CHUNK_SIZE,
+                            help="Rows written per batch.")
+        parser.add_argument('--processes', type=int, default=settings.ATTENDEE_IMPORT_PROCESSES,
+                            help="Processes used to hash passwords.")
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.get(pk=options['event'])
+        except Event.DoesNotExist:
+            raise CommandError(f"Event {options['event']} does not exist.")
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                result = import_attendees(f, event, options['chunk_size'], max(options['processes'], 1))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Line {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(f"{event.name}: {result}."))
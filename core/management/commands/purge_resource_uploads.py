@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Deletes unfinished chunked resource uploads older than RESOURCE_UPLOAD_EXPIRY_HOURS."
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} stale uploads."))
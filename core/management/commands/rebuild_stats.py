@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the event and question statistics rollups from the registration tables."
+
+    def handle(self, *args, **options):
+        rebuild_stats()
+        self.stdout.write(self.style.SUCCESS("Statistics rebuilt."))
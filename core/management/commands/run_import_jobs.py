@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.imports import claim_import_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Runs the attendee CSV imports queued from the admin's \"Bulk import\" page, one at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.ATTENDEE_IMPORT_PROCESSES,
+                            help="Processes used to hash passwords.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait when there are no pending jobs.")
+        parser.add_argument('--once', action='store_true',
+                            help="Run the pending jobs once and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        while True:
+            close_old_connections()
+            job = claim_import_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            result = run_import_job(job, processes=max(options['processes'], 1))
+            if result is None:
+                failed += 1
+                self.stderr.write(f"{job.filename}: {job.error}")
+            else:
+                done += 1
+                self.stdout.write(f"{job.filename} for {job.event.name}: {result}.")
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} imports, {failed} failed."))
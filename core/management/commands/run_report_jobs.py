@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.report_jobs import claim_jobs, finish_job, init_worker, release_job, render_report_pdf
+
+
+class Command(BaseCommand):
+    help = "Renders queued PDF report jobs in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.REPORT_JOB_PROCESSES,
+                            help="Number of rendering processes.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait when there are no pending jobs.")
+        parser.add_argument('--once', action='store_true',
+                            help="Render the pending jobs once and exit instead of polling forever.")
+
+    def start_pool(self, processes):
+        # Forked workers must not inherit this process's database connections.
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=processes, initializer=init_worker)
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        done = failed = 0
+
+        pool = self.start_pool(processes)
+        try:
+            while True:
+                close_old_connections()
+                jobs = claim_jobs(processes)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                futures = [(job, pool.submit(render_report_pdf, job.payload)) for job in jobs]
+                broken = False
+                for job, future in futures:
+                    try:
+                        finish_job(job, pdf_file=future.result())
+                        done += 1
+                    except BrokenProcessPool as e:
+                        # A rendering process died (e.g. killed for its memory use) and
+                        # every job in the pool is lost with it; queue them again.
+                        release_job(job, e)
+                        broken = True
+                    except Exception as e:
+                        finish_job(job, error=e)
+                        failed += 1
+
+                if broken:
+                    self.stderr.write("A rendering process died; starting a new pool.")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.start_pool(processes)
+        finally:
+            pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {done} reports, {failed} failed."))
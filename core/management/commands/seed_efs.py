@@ -0,0 +1,56 @@
+import os
+from datetime import date, datetime, time, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Event
+from core.seeding import COUNTS, USERNAME_PREFIX, SeedingError, flush, scaled, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with a large, deterministic data set for benchmarks: at scale 1, "
+        + ", ".join(f"{count:,} {name}" for name, count in COUNTS.items())
+        + " and about 1.5 million answers. Refuses to run on a database that already has events unless --flush is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--scale', type=float, default=1.0, help="Multiplies every row count, e.g. 0.01 for a quick run.")
+        parser.add_argument('--anchor', type=date.fromisoformat,
+                            help="Date (YYYY-MM-DD) event dates are spread around. Default: today.")
+        parser.add_argument('--flush', action='store_true',
+                            help="First delete ALL events and speakers, and the accounts an earlier seed wrote.")
+        parser.add_argument('--no-input', action='store_false', dest='interactive',
+                            help="Don't ask for confirmation before --flush.")
+        parser.add_argument('--password', default=os.environ.get('SEED_PASSWORD'),
+                            help="Password for every seeded account, including the superuser "
+                                 "(default: $SEED_PASSWORD). Without one they can't log in.")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            if options['interactive']:
+                answer = input("This deletes every event, speaker and registration in the database. Type 'yes' to continue: ")
+                if answer != 'yes':
+                    raise CommandError("Cancelled.")
+            flush()
+            self.stdout.write("Existing events, speakers and seeded accounts deleted.")
+        elif Event.objects.exists():
+            raise CommandError("The database already has events; use --flush to replace them.")
+
+        anchor = datetime.combine(options['anchor'], time(), tzinfo=timezone.utc) if options['anchor'] else None
+        counts = scaled(options['scale'])
+        self.stdout.write(
+            f"Seeding with seed {options['seed']}: {counts['events']} events, {counts['users']} users, "
+            f"about {counts['registrations']} registrations."
+        )
+        try:
+            written = seed(options['seed'], options['scale'], anchor, log=self.stdout.write, password=options['password'])
+        except SeedingError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in written.items()) + ". "
+            f"Accounts are {USERNAME_PREFIX}0 ... and {USERNAME_PREFIX}admin (superuser), "
+            + ("with the given password." if options['password'] else "with unusable passwords.")
+        ))
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core.mail_queue import process_queue
+
+
+class Command(BaseCommand):
+    help = "Sends emails from the outbound queue using a bounded pool of workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.EMAIL_QUEUE_WORKERS,
+                            help="Number of worker threads, each with its own SMTP connection.")
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_QUEUE_BATCH_SIZE,
+                            help="Messages sent per SMTP connection.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue once and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self.work, options['batch_size'], options['interval'], options['once'])
+                for _ in range(workers)
+            ]
+            totals = [future.result() for future in futures]
+
+        sent = sum(total[0] for total in totals)
+        failed = sum(total[1] for total in totals)
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {failed} failed."))
+
+    def work(self, batch_size, interval, once):
+        sent = failed = 0
+        try:
+            while True:
+                close_old_connections()
+                batch_sent, batch_failed = process_queue(batch_size)
+                sent += batch_sent
+                failed += batch_failed
+                if batch_sent or batch_failed:
+                    continue
+                if once:
+                    return sent, failed
+                time.sleep(interval)
+        finally:
+            connection.close()
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsernameCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(max_length=150, unique=True)),
+                ('next_suffix', models.PositiveIntegerField(default=0, help_text='The suffix the next user with this base gets. 0 means the bare base name.')),
+            ],
+            options={
+                'verbose_name': 'Username Counter',
+                'verbose_name_plural': 'Username Counters',
+            },
+        ),
+    ]
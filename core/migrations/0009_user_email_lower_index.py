@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stops before the unique index is created if two accounts share an email
+    that differs only in case, and lists them, so they can be merged or
+    renamed by hand instead of failing on a bare IntegrityError.
+    """
+    User = apps.get_model('auth', 'User')
+    users = User.objects.using(schema_editor.connection.alias).exclude(email='').annotate(email_key=Lower('email'))
+    duplicates = list(
+        users.values('email_key').annotate(accounts=Count('pk')).filter(accounts__gt=1)
+        .values_list('email_key', flat=True)
+    )
+    clashes = {}
+    rows = users.filter(email_key__in=duplicates).order_by('email_key', 'pk').values_list('email_key', 'username', 'email')
+    for email_key, username, email in rows:
+        clashes.setdefault(email_key, []).append(f"{username} <{email}>")
+    if clashes:
+        lines = "\n".join(f"  {email_key}: {', '.join(accounts)}" for email_key, accounts in clashes.items())
+        raise RuntimeError(
+            "Some accounts share an email address that differs only in case. Change or clear "
+            f"all but one email in each group, then run the migration again:\n{lines}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_usernamecounter'),
+    ]
+
+    # auth_user belongs to django.contrib.auth, so the index is created with SQL.
+    # It rejects two accounts whose emails differ only in case, and makes
+    # LOWER(email) lookups (core.backends.users_with_email) an index seek; blank
+    # emails, e.g. on superusers created without one, are left out.
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX core_auth_user_email_lower_uniq ON auth_user (LOWER(email)) WHERE email <> ''",
+            reverse_sql="DROP INDEX core_auth_user_email_lower_uniq",
+        ),
+    ]
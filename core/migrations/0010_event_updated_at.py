@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='The last time the event was changed.'),
+        ),
+    ]
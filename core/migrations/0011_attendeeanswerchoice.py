@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_event_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendeeAnswerChoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choice', models.CharField(max_length=255)),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choices', to='core.attendeeanswer')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_choices', to='core.eventquestion')),
+            ],
+            options={
+                'verbose_name': 'Attendee Answer Choice',
+                'verbose_name_plural': 'Attendee Answer Choices',
+                'indexes': [models.Index(fields=['question', 'choice'], name='core_attend_questio_1dd9b5_idx')],
+                'unique_together': {('answer', 'choice')},
+            },
+        ),
+    ]
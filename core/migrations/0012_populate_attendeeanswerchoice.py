@@ -0,0 +1,50 @@
+from django.db import migrations
+
+CHOICE_FIELD_TYPES = ('dropdown', 'radio', 'checkbox')
+BATCH_SIZE = 2000
+
+
+def split_checkbox_answer(answer, choices):
+    # A frozen copy of core.models.split_checkbox_answer.
+    known = set(choices)
+    parts = answer.split(', ')
+    selected, start = [], 0
+    while start < len(parts):
+        # The longest known choice starting here, so 'Red, dark' wins over 'Red'.
+        end = next(
+            (end for end in range(len(parts), start + 1, -1) if ', '.join(parts[start:end]) in known),
+            start + 1,
+        )
+        selected.append(', '.join(parts[start:end]))
+        start = end
+    return selected
+
+
+def populate_choices(apps, schema_editor):
+    EventQuestion = apps.get_model('core', 'EventQuestion')
+    AttendeeAnswer = apps.get_model('core', 'AttendeeAnswer')
+    AttendeeAnswerChoice = apps.get_model('core', 'AttendeeAnswerChoice')
+
+    for question in EventQuestion.objects.filter(field_type__in=CHOICE_FIELD_TYPES).iterator():
+        choices = [choice.strip() for choice in question.choices.splitlines() if choice.strip()]
+        rows = []
+        answers = AttendeeAnswer.objects.filter(question=question).exclude(answer='').values_list('pk', 'answer')
+        for answer_id, answer in answers.iterator(chunk_size=BATCH_SIZE):
+            selected = split_checkbox_answer(answer, choices) if question.field_type == 'checkbox' else [answer]
+            for choice in dict.fromkeys(selected):
+                rows.append(AttendeeAnswerChoice(answer_id=answer_id, question_id=question.pk, choice=choice[:255]))
+            if len(rows) >= BATCH_SIZE:
+                AttendeeAnswerChoice.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+        AttendeeAnswerChoice.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_attendeeanswerchoice'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_choices, migrations.RunPython.noop),
+    ]
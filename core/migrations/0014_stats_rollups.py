@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.event')),
+                ('attendee_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Event Statistics',
+                'verbose_name_plural': 'Event Statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.eventquestion')),
+                ('response_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Question Statistics',
+                'verbose_name_plural': 'Question Statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionChoiceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choice', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choice_stats', to='core.eventquestion')),
+            ],
+            options={
+                'verbose_name': 'Question Choice Statistics',
+                'verbose_name_plural': 'Question Choice Statistics',
+                'unique_together': {('question', 'choice')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Attendee = apps.get_model('core', 'Attendee')
+    AttendeeAnswer = apps.get_model('core', 'AttendeeAnswer')
+    AttendeeAnswerChoice = apps.get_model('core', 'AttendeeAnswerChoice')
+    EventStats = apps.get_model('core', 'EventStats')
+    QuestionStats = apps.get_model('core', 'QuestionStats')
+    QuestionChoiceStats = apps.get_model('core', 'QuestionChoiceStats')
+
+    EventStats.objects.bulk_create(
+        EventStats(event_id=row['event'], attendee_count=row['count'])
+        for row in Attendee.objects.values('event').annotate(count=Count('id')).order_by()
+    )
+    QuestionStats.objects.bulk_create(
+        QuestionStats(question_id=row['question'], response_count=row['count'])
+        for row in AttendeeAnswer.objects.values('question').annotate(count=Count('id')).order_by()
+    )
+    QuestionChoiceStats.objects.bulk_create(
+        QuestionChoiceStats(question_id=row['question'], choice=row['choice'], count=row['count'])
+        for row in AttendeeAnswerChoice.objects.values('question', 'choice').annotate(count=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
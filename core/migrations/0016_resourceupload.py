@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:53
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_populate_stats_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.BigIntegerField(help_text='Size of the whole file in bytes.')),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('received', models.BigIntegerField(default=0, help_text='Bytes received so far, from the start of the file.')),
+                ('chunk_hashes', models.JSONField(default=list, help_text='SHA-256 of each chunk received, in order.')),
+                ('sha256', models.CharField(blank=True, help_text='SHA-256 of the whole file, if the client sent one.', max_length=64)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete')], default='uploading', max_length=10)),
+                ('stored_name', models.CharField(blank=True, help_text='Name of the assembled file in media storage.', max_length=255)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('is_visible', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resource_uploads', to='core.event')),
+                ('resource', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='core.eventresource')),
+                ('speaker', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resource_uploads', to='core.speaker')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resource_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resource Upload',
+                'verbose_name_plural': 'Resource Uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_resourceupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='alternatives',
+            field=models.JSONField(blank=True, default=list, help_text='List of [content, mimetype] pairs, e.g. an HTML version.'),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='bcc',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='cc',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='content_subtype',
+            field=models.CharField(default='plain', help_text='MIME subtype of the body, e.g. plain or html.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='headers',
+            field=models.JSONField(blank=True, default=dict, help_text='Extra message headers.'),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='reply_to',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
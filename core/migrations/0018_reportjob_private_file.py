@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:23
+
+import core.models
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_reports_to_private_storage(apps, schema_editor):
+    """PDFs rendered before this migration sit in public media; move them out of it."""
+    ReportJob = apps.get_model('core', 'ReportJob')
+    private = core.models.private_storage()
+    for job in ReportJob.objects.exclude(file='').only('pk', 'file'):
+        name = job.file.name
+        if not default_storage.exists(name):
+            continue
+        with default_storage.open(name, 'rb') as f:
+            new_name = private.save(name, f)
+        default_storage.delete(name)
+        if new_name != name:
+            ReportJob.objects.filter(pk=job.pk).update(file=new_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_outboundemail_message_parts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker last claimed the job.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='reportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=core.models.private_storage, upload_to='reports/'),
+        ),
+        migrations.RunPython(move_reports_to_private_storage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+from core.images import generate_derivatives, has_derivatives
+
+
+def backfill_images(apps, schema_editor):
+    """
+    Records the size of every image uploaded before this migration and makes
+    any derivatives it is missing, since pages link to the derivatives. Uses
+    the live core.images, so the files get the names the pages link to.
+    Files that are missing or unreadable are skipped.
+    """
+    for model_name, field_name in (('Event', 'featured_image'), ('Speaker', 'picture')):
+        model = apps.get_model('core', model_name)
+        field = model._meta.get_field(field_name)
+        rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        for pk, name in rows.values_list('pk', field_name).iterator():
+            field_file = field.attr_class(None, field, name)
+            try:
+                if has_derivatives(field_file):
+                    size = (field_file.width, field_file.height)
+                else:
+                    size = generate_derivatives(field_file)
+            except (OSError, ValueError):
+                continue
+            model.objects.filter(pk=pk).update(**{f'{field_name}_width': size[0], f'{field_name}_height': size[1]})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_reportjob_private_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='featured_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='featured_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='speaker',
+            name='picture_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='speaker',
+            name='picture_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_importjob'),
+    ]
+
+    # Databases migrated before 0009 lost its plain LOWER(email) index still have
+    # it. The partial unique index on the same expression serves the lookups, so
+    # the plain one only slowed down writes to auth_user.
+    operations = [
+        migrations.RunSQL(
+            sql="DROP INDEX IF EXISTS core_auth_user_email_lower_idx",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,50 @@
+import posixpath
+
+from django.conf import settings
+from django.db import migrations
+
+from core.images import FORMATS, generate_derivatives, has_derivatives
+
+
+def old_derivative_name(name, size, format):
+    # Derivative names before 0022 dropped the original's extension, so
+    # talk.png and talk.jpg shared one set of files.
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'derivatives', f'{stem}-{size}.{FORMATS[format][1]}')
+
+
+def rename_derivatives(apps, schema_editor):
+    """
+    Makes the derivatives of every stored image under their new names, then
+    deletes the files with the old names. The old files are not copied,
+    since a collision may mean they show another image. Uses the live
+    core.images, like 0019. Files that are missing or unreadable are skipped.
+    """
+    for model_name, field_name in (('Event', 'featured_image'), ('Speaker', 'picture')):
+        model = apps.get_model('core', model_name)
+        field = model._meta.get_field(field_name)
+        rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        for name in rows.values_list(field_name, flat=True).iterator():
+            field_file = field.attr_class(None, field, name)
+            try:
+                if not has_derivatives(field_file):
+                    generate_derivatives(field_file)
+            except (OSError, ValueError):
+                continue
+            for size in settings.IMAGE_DERIVATIVE_SIZES:
+                for format in FORMATS:
+                    old_name = old_derivative_name(name, size, format)
+                    if field_file.storage.exists(old_name):
+                        field_file.storage.delete(old_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_drop_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_derivatives, migrations.RunPython.noop),
+    ]
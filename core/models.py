@@ -1,20 +1,57 @@
+import uuid
+
 from django.db import models
+from django.db.models import Case, Value, When
+from django.db.models.functions import Now
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
 from django.utils import timezone # <-- ADD THIS IMPORT
-from django.templatetags.static import static
 from django.urls import reverse
 
+from .images import image_srcset, image_url
+
 # ==============================================================================
 # 1. Event Model
 # Stores the core details for each event.
 # ==============================================================================
+class EventQuerySet(models.QuerySet):
+    def with_status(self):
+        """
+        Annotates each event with `status` ('Past', 'Ongoing' or 'Upcoming'),
+        computed by the database so lists can filter, sort and count by it.
+        Mirrors the rules of Event.event_status.
+        """
+        now = Now()
+        return self.annotate(
+            status=Case(
+                When(end_datetime__lt=now, then=Value(Event.Status.PAST)),
+                When(start_datetime__gt=now, then=Value(Event.Status.UPCOMING)),
+                default=Value(Event.Status.ONGOING),
+                output_field=models.CharField(),
+            )
+        )
+
+    def update(self, **kwargs):
+        """
+        Stamps `updated_at` like save() does (auto_now only applies to save()),
+        so bulk changes also reach everything keyed on it, e.g. the events feed ETag.
+        """
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
 class Event(models.Model):
     # --- NEW: EVENT TYPE CHOICES ---
     class EventType(models.TextChoices):
         PHYSICAL = 'Physical', 'Physical'
         ONLINE = 'Online', 'Online'
         HYBRID = 'Hybrid', 'Hybrid'
+
+    class Status(models.TextChoices):
+        PAST = 'Past', 'Past'
+        ONGOING = 'Ongoing', 'Ongoing'
+        UPCOMING = 'Upcoming', 'Upcoming'
     
     name = models.CharField(max_length=200)
     # --- MODIFIED/RENAMED and NEW DATE FIELDS ---
@@ -25,6 +62,7 @@ class Event(models.Model):
         null=True
     )
     created_at = models.DateTimeField(auto_now_add=True, help_text="The date the event was created in the system.")
+    updated_at = models.DateTimeField(auto_now=True, help_text="The last time the event was changed.")
         
     # --- NEW: TYPE AND LOCATION FIELDS ---
     event_type = models.CharField(
@@ -60,6 +98,11 @@ class Event(models.Model):
         null=True,
         help_text="A featured image for the event, displayed on home/list pages."
     )
+    # Stored when the image's derivatives are made; the srcset widths are worked out from them.
+    featured_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    objects = EventQuerySet.as_manager()
 
     class Meta:
         # --- UPDATE ORDERING ---
@@ -69,17 +112,17 @@ class Event(models.Model):
 
        
     # --- THIS IS THE NEW, CORRECT WAY TO PROVIDE A DEFAULT ---
-    @property
-    def featured_image_url(self):
+    def featured_image_url(self, size=None, format='jpeg'):
         """
-        Returns the URL for the event's featured image.
+        Returns the URL for the event's featured image, or for one of its
+        resized derivatives when `size` (a key of IMAGE_DERIVATIVE_SIZES) is given.
         If no image is uploaded, it returns the URL for a default static image.
         """
-        if self.featured_image:
-            return self.featured_image.url
-        else:
-            # This will correctly return '/static/images/default_event.png'
-            return static('images/default.png')
+        return image_url(self.featured_image, size, format)
+
+    def featured_image_srcset(self, format='jpeg'):
+        """A srcset of every derivative width, for <img>/<source> tags."""
+        return image_srcset(self.featured_image, format)
 
     def __str__(self):
         return self.name
@@ -91,22 +134,27 @@ class Event(models.Model):
         """
         Returns the status of the event as a string: 
         'Past', 'Ongoing', or 'Upcoming'.
+        Uses the value annotated by Event.objects.with_status() when present.
         """
+        annotated = self.__dict__.get('status')
+        if annotated is not None:
+            return annotated
+
         now = timezone.now()
         # If the event has a defined end time and it's in the past
         if self.end_datetime and self.end_datetime < now:
-            return 'Past'
+            return self.Status.PAST
         # If the event start time is in the future
         if self.start_datetime > now:
-            return 'Upcoming'
+            return self.Status.UPCOMING
         # If it's not in the future and not in the past, it must be ongoing
         else:
-            return 'Ongoing'
+            return self.Status.ONGOING
 
     @property
     def is_past(self):
         """A simple boolean check, very useful in templates."""
-        return self.event_status == 'Past'
+        return self.event_status == self.Status.PAST
     
     
     def get_absolute_url(self):
@@ -162,6 +210,8 @@ class Speaker(models.Model):
         null=True, 
         help_text="A headshot or profile picture for the speaker."
     )
+    picture_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    picture_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
     
     # --- THIS IS THE KEY ---
     # Optional link to a registered user in the system.
@@ -180,17 +230,16 @@ class Speaker(models.Model):
         verbose_name_plural = "Speakers"
 
      # --- THIS IS THE NEW, CORRECT WAY TO PROVIDE A DEFAULT ---
-    @property
-    def picture_url(self):
+    def picture_url(self, size=None, format='jpeg'):
         """
-        Returns the URL for the event's featured image.
+        Returns the URL for the speaker's picture, or for one of its resized
+        derivatives when `size` is given.
         If no image is uploaded, it returns the URL for a default static image.
         """
-        if self.picture:
-            return self.picture.url
-        else:
-            # This will correctly return '/static/images/default_event.png'
-            return static('images/default.png')
+        return image_url(self.picture, size, format)
+
+    def picture_srcset(self, format='jpeg'):
+        return image_srcset(self.picture, format)
 
     def __str__(self):
         return self.name
@@ -256,6 +305,9 @@ class EventQuestion(models.Model):
         ('checkbox', 'Checkboxes (Multiple Answers)'),
     ]
 
+    # Field types whose answers are picked from `choices`.
+    CHOICE_FIELD_TYPES = ('dropdown', 'radio', 'checkbox')
+
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='questions')
     label = models.CharField(max_length=255, help_text="The question text that the user will see.")
     field_type = models.CharField(max_length=20, choices=FIELD_TYPE_CHOICES)
@@ -295,6 +347,55 @@ class AttendeeAnswer(models.Model):
     def __str__(self):
         return f'Answer by {self.attendee.user.username} for "{self.question.label}"'
 
+    def get_selected_choices(self):
+        """The individual choices in this answer, for dropdown/radio/checkbox questions."""
+        if self.question.field_type not in EventQuestion.CHOICE_FIELD_TYPES or not self.answer:
+            return []
+        if self.question.field_type != 'checkbox':
+            return [self.answer]
+        return split_checkbox_answer(self.answer, self.question.get_choices_as_list())
+
+
+def split_checkbox_answer(answer, choices):
+    """
+    Splits a stored checkbox answer (its choices joined with ", ") back into
+    the selected choices. Known `choices` that themselves contain ", " are
+    kept whole; anything unrecognised is returned piece by piece.
+    """
+    known = set(choices)
+    parts = answer.split(', ')
+    selected, start = [], 0
+    while start < len(parts):
+        # The longest known choice starting here, so 'Red, dark' wins over 'Red'.
+        end = next(
+            (end for end in range(len(parts), start + 1, -1) if ', '.join(parts[start:end]) in known),
+            start + 1,
+        )
+        selected.append(', '.join(parts[start:end]))
+        start = end
+    return selected
+
+
+# ==============================================================================
+# 5b. AttendeeAnswerChoice Model
+# One row per choice picked in a dropdown/radio/checkbox answer, so per-choice
+# counts are a single indexed GROUP BY instead of splitting answer strings.
+# ==============================================================================
+class AttendeeAnswerChoice(models.Model):
+    answer = models.ForeignKey(AttendeeAnswer, on_delete=models.CASCADE, related_name='choices')
+    # Denormalized from the answer so counts per question need no join.
+    question = models.ForeignKey(EventQuestion, on_delete=models.CASCADE, related_name='answer_choices')
+    choice = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('answer', 'choice')
+        indexes = [models.Index(fields=['question', 'choice'])]
+        verbose_name = "Attendee Answer Choice"
+        verbose_name_plural = "Attendee Answer Choices"
+
+    def __str__(self):
+        return self.choice
+
 # 7. Session Model (NEW)
 # Represents a single scheduled item within an event's agenda.
 # ==============================================================================
@@ -319,4 +420,241 @@ class Session(models.Model):
         verbose_name_plural = "Event Sessions"
 
     def __str__(self):
-        return f'"{self.title}" at {self.event.name}'
\ No newline at end of file
+        return f'"{self.title}" at {self.event.name}'
+
+# ==============================================================================
+# 8. OutboundEmail Model
+# A persistent queue of emails waiting to be sent by the send_queued_emails
+# worker (see core/mail_queue.py). Doubles as a delivery status table.
+# ==============================================================================
+class OutboundEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENDING = 'sending', 'Sending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default='plain', help_text="MIME subtype of the body, e.g. plain or html.")
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(help_text="List of recipient addresses.")
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True, help_text="Extra message headers.")
+    alternatives = models.JSONField(default=list, blank=True, help_text="List of [content, mimetype] pairs, e.g. an HTML version.")
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="The message will not be sent before this time.")
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the message.")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+
+    def __str__(self):
+        return f'"{self.subject}" to {", ".join(self.to)} ({self.get_status_display()})'
+
+
+# ==============================================================================
+# 9. UsernameCounter Model
+# Remembers the next free numeric suffix for each username base (e.g. "john"
+# -> john, john1, john2 ...) so new usernames are allocated in constant time.
+# See core.utils.generate_unique_username.
+# ==============================================================================
+class UsernameCounter(models.Model):
+    base = models.CharField(max_length=150, unique=True)
+    next_suffix = models.PositiveIntegerField(
+        default=0,
+        help_text="The suffix the next user with this base gets. 0 means the bare base name."
+    )
+
+    class Meta:
+        verbose_name = "Username Counter"
+        verbose_name_plural = "Username Counters"
+
+    def __str__(self):
+        return f'{self.base} (next: {self.next_suffix})'
+
+
+# ==============================================================================
+# 10. ReportJob Model
+# A PDF summary report rendered in the background by the run_report_jobs
+# worker (see core/report_jobs.py). Finished jobs are reused for identical
+# report data, keyed by `data_hash`.
+# ==============================================================================
+def private_storage():
+    """Storage under PRIVATE_MEDIA_ROOT, for files only served by permission-checked views."""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+class ReportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    title = models.CharField(max_length=255)
+    data_hash = models.CharField(max_length=64, db_index=True, help_text="Hash of the questions and answer counts in the report.")
+    payload = models.JSONField(help_text="The report data the PDF is rendered from.")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    file = models.FileField(upload_to='reports/', storage=private_storage, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True, help_text="When a worker last claimed the job.")
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Report Job"
+        verbose_name_plural = "Report Jobs"
+
+    def __str__(self):
+        return f'{self.title} ({self.get_status_display()})'
+
+
+# ==============================================================================
+# 11. Statistics rollups
+# Counts kept up to date as attendees register and answers are saved (see
+# core/stats.py), so admin lists, the dashboard and reports read them directly
+# instead of counting raw rows. `python manage.py rebuild_stats` recomputes them.
+# ==============================================================================
+class EventStats(models.Model):
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attendee_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Event Statistics"
+        verbose_name_plural = "Event Statistics"
+
+    def __str__(self):
+        return f'{self.event.name}: {self.attendee_count} attendees'
+
+
+class QuestionStats(models.Model):
+    question = models.OneToOneField(EventQuestion, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    response_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Question Statistics"
+        verbose_name_plural = "Question Statistics"
+
+    def __str__(self):
+        return f'{self.question.label}: {self.response_count} responses'
+
+
+class QuestionChoiceStats(models.Model):
+    question = models.ForeignKey(EventQuestion, on_delete=models.CASCADE, related_name='choice_stats')
+    choice = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('question', 'choice')
+        verbose_name = "Question Choice Statistics"
+        verbose_name_plural = "Question Choice Statistics"
+
+    def __str__(self):
+        return f'{self.question.label} / {self.choice}: {self.count}'
+
+
+# ==============================================================================
+# 12. ResourceUpload Model
+# A chunked, resumable upload of a large EventResource file (see core/uploads.py).
+# Chunks are written to a temporary file; once all of them have arrived the
+# file is verified and moved into media storage.
+# ==============================================================================
+class ResourceUpload(models.Model):
+    class Status(models.TextChoices):
+        UPLOADING = 'uploading', 'Uploading'
+        COMPLETE = 'complete', 'Complete'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField(help_text="Size of the whole file in bytes.")
+    chunk_size = models.PositiveIntegerField()
+    received = models.BigIntegerField(default=0, help_text="Bytes received so far, from the start of the file.")
+    chunk_hashes = models.JSONField(default=list, help_text="SHA-256 of each chunk received, in order.")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the whole file, if the client sent one.")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.UPLOADING)
+    stored_name = models.CharField(max_length=255, blank=True, help_text="Name of the assembled file in media storage.")
+
+    # When these are given the EventResource is created as soon as the upload completes.
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, null=True, blank=True, related_name='resource_uploads')
+    speaker = models.ForeignKey(Speaker, on_delete=models.CASCADE, null=True, blank=True, related_name='resource_uploads')
+    title = models.CharField(max_length=200, blank=True)
+    is_visible = models.BooleanField(default=False)
+    resource = models.OneToOneField(EventResource, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='resource_uploads')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Resource Upload"
+        verbose_name_plural = "Resource Uploads"
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.total_size} bytes)'
+
+    @property
+    def chunk_count(self):
+        return max(-(-self.total_size // self.chunk_size), 1)
+
+
+# ==============================================================================
+# 13. ImportJob Model
+# A CSV of attendees queued from the admin's "Bulk import" page and imported
+# by the run_import_jobs worker (see core/imports.py), so a large file never
+# ties up a web request. The file holds personal data and passwords, so it is
+# kept in private storage and deleted once the import has run.
+# ==============================================================================
+class ImportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='import_jobs')
+    file = models.FileField(upload_to='imports/', storage=private_storage, blank=True)
+    filename = models.CharField(max_length=255, help_text="Name of the uploaded file.")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    summary = models.CharField(max_length=255, blank=True, help_text="Counts of registered people and skipped rows.")
+    row_errors = models.JSONField(default=list, blank=True, help_text="[line, problem] for the first rows that were skipped.")
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True, help_text="When a worker last claimed the job.")
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+
+    def __str__(self):
+        return f'{self.filename} for {self.event.name} ({self.get_status_display()})'
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class EventCursorPagination(CursorPagination):
+    """
+    Stable, index-friendly paging for the public events feed.
+    Clients follow the `next`/`previous` links instead of page numbers.
+    """
+    # id breaks ties, so events starting at the same time are neither skipped nor repeated.
+    ordering = ('start_datetime', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,130 @@
+# core/report_jobs.py
+#
+# Background rendering of PDF summary reports. The admin queues a ReportJob
+# with the report data; the `run_report_jobs` management command renders the
+# PDFs in a pool of processes and stores them with the default file storage.
+# Identical report data reuses the job (and file) that already exists.
+#
+# A job whose worker died is picked up again once it has been running for
+# REPORT_JOB_TIMEOUT seconds, and failed after REPORT_JOB_MAX_ATTEMPTS tries.
+# The PDFs hold attendees' answers, so they are kept in private storage and
+# only served through the admin (ReportJobAdmin.download_view).
+
+import hashlib
+import json
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ReportJob
+from .reports import render_summaries_html
+
+
+def report_payload(summaries):
+    """Turns core.reports summaries into plain JSON data for a ReportJob."""
+    return [
+        {
+            'question': {
+                'id': summary['question'].pk,
+                'label': summary['question'].label,
+                'event': {'name': summary['question'].event.name},
+            },
+            'summary_data': [{'answer': item['answer'], 'count': item['count']} for item in summary['summary_data']],
+            'total_responses': summary['total_responses'],
+        }
+        for summary in summaries
+    ]
+
+
+def queue_summary_report(summaries, title, user=None):
+    """
+    Returns the ReportJob for these summaries, creating a pending one only if
+    no job has been queued for exactly the same questions and answer counts.
+    A running job is reused too: if its worker died, claim_jobs retries it.
+    """
+    payload = report_payload(summaries)
+    data_hash = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    existing = (
+        ReportJob.objects.filter(data_hash=data_hash)
+        .exclude(status=ReportJob.Status.FAILED)
+        .order_by('-created_at')
+        .first()
+    )
+    if existing is not None:
+        return existing
+    return ReportJob.objects.create(title=title, data_hash=data_hash, payload=payload, requested_by=user)
+
+
+def init_worker():
+    """Process pool initializer: each worker process needs its own Django setup."""
+    django.setup()
+
+
+def render_report_pdf(payload):
+    """Renders a report payload to PDF bytes. Runs inside a pool process."""
+    # WeasyPrint is only needed here, so it is only loaded by the report workers.
+    from weasyprint import HTML
+
+    return HTML(string=render_summaries_html(payload)).write_pdf()
+
+
+def claim_jobs(limit):
+    """
+    Marks up to `limit` pending jobs as running and returns them.
+
+    Jobs left running by a worker that died are claimed again once they have
+    been running for longer than REPORT_JOB_TIMEOUT seconds, or failed if
+    they have already had REPORT_JOB_MAX_ATTEMPTS tries.
+    """
+    now = timezone.now()
+    abandoned = Q(status=ReportJob.Status.RUNNING, started_at__lt=now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT))
+    with transaction.atomic():
+        ReportJob.objects.filter(abandoned, attempts__gte=settings.REPORT_JOB_MAX_ATTEMPTS).update(
+            status=ReportJob.Status.FAILED, error="The worker rendering this report stopped.", finished_at=now,
+        )
+        jobs = list(
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ReportJob.Status.PENDING) | abandoned)
+            .order_by('created_at')[:limit]
+        )
+        ReportJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ReportJob.Status.RUNNING, started_at=now, attempts=F('attempts') + 1,
+        )
+    for job in jobs:
+        job.status = ReportJob.Status.RUNNING
+        job.started_at = now
+        job.attempts += 1
+    return jobs
+
+
+def release_job(job, error):
+    """
+    Puts back a job whose rendering process died (taking the pool with it),
+    or fails it once it has had REPORT_JOB_MAX_ATTEMPTS tries.
+    """
+    if job.attempts >= settings.REPORT_JOB_MAX_ATTEMPTS:
+        finish_job(job, error=error)
+        return
+    job.status = ReportJob.Status.PENDING
+    job.started_at = None
+    job.save(update_fields=['status', 'started_at'])
+
+
+def finish_job(job, pdf_file=None, error=None):
+    """Stores the rendered PDF (or the error) on the job."""
+    job.finished_at = timezone.now()
+    if error is not None:
+        job.status = ReportJob.Status.FAILED
+        job.error = str(error)
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return
+    job.file.save(f'report-{job.pk}-{job.data_hash[:12]}.pdf', ContentFile(pdf_file), save=False)
+    job.status = ReportJob.Status.DONE
+    job.error = ''
+    job.save(update_fields=['file', 'status', 'error', 'finished_at'])
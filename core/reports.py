@@ -0,0 +1,92 @@
+# core/reports.py
+#
+# Response summaries for EventQuestions, shared by the EventQuestion and Event
+# admin export actions. All selected questions are summarised with a fixed
+# number of grouped queries, however many are selected.
+
+import csv
+import io
+import zipfile
+
+from django.db.models import Count
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+from .models import AttendeeAnswer, EventQuestion, QuestionChoiceStats, QuestionStats
+
+
+def build_question_summaries(questions):
+    """
+    Returns one dict per question with its `question`, `summary_data`
+    (answer/count rows, most common first) and `total_responses`.
+
+    Dropdown, radio and checkbox questions are counted per choice and read
+    from the QuestionChoiceStats rollup, so a checkbox answer counts towards
+    each choice it picked. Other questions are counted per distinct answer
+    text. Totals come from QuestionStats.
+    """
+    questions = list(questions)
+    summaries = {question.pk: [] for question in questions}
+    choice_ids = [question.pk for question in questions if question.field_type in EventQuestion.CHOICE_FIELD_TYPES]
+    text_ids = [question.pk for question in questions if question.field_type not in EventQuestion.CHOICE_FIELD_TYPES]
+
+    # Choice questions: precomputed per-choice counts from QuestionChoiceStats.
+    choice_rows = (
+        QuestionChoiceStats.objects.filter(question__in=choice_ids, count__gt=0)
+        .values('question', 'choice', 'count')
+        .order_by('question', '-count', 'choice')
+    ) if choice_ids else []
+    text_rows = (
+        AttendeeAnswer.objects.filter(question__in=text_ids)
+        .values('question', 'answer')
+        .annotate(count=Count('id'))
+        .order_by('question', '-count', 'answer')
+    ) if text_ids else []
+    for row in choice_rows:
+        summaries[row['question']].append({'answer': row['choice'], 'count': row['count']})
+    for row in text_rows:
+        summaries[row['question']].append({'answer': row['answer'], 'count': row['count']})
+
+    totals = dict(QuestionStats.objects.filter(question__in=questions).values_list('question', 'response_count'))
+    return [
+        {
+            'question': question,
+            'summary_data': summaries[question.pk],
+            'total_responses': totals.get(question.pk, 0),
+        }
+        for question in questions
+    ]
+
+
+def _summary_csv(summary):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Answer', 'Count']) # Header row
+    for item in summary['summary_data']:
+        writer.writerow([item['answer'], item['count']])
+    return buffer.getvalue()
+
+
+def summaries_csv_response(summaries, filename):
+    """A single CSV for one question, otherwise a ZIP with one CSV per question."""
+    if len(summaries) == 1:
+        response = HttpResponse(_summary_csv(summaries[0]), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        return response
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for number, summary in enumerate(summaries, start=1):
+            question = summary['question']
+            name = f"{number:02d}-{slugify(question.event.name)}-{slugify(question.label)[:60]}.csv"
+            archive.writestr(name, _summary_csv(summary))
+
+    response = HttpResponse(buffer.getvalue(), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.zip"'
+    return response
+
+
+def render_summaries_html(summaries):
+    """The HTML for a combined report, one page per question."""
+    return render_to_string('admin/question_summary_report.html', {'reports': summaries})
@@ -0,0 +1,18 @@
+# core/resources.py
+#
+# django-import-export resources. Kept out of core/admin.py so tablib and
+# import_export are only loaded when an admin actually opens an import (see
+# LazyImportMixin there), not by every worker at startup.
+
+from import_export import resources
+
+from .models import Attendee
+
+
+# Describes how the Attendee model maps to an import/export file
+class AttendeeResource(resources.ModelResource):
+    class Meta:
+        model = Attendee
+        # Define which fields you want in the export
+        fields = ('id', 'user__first_name', 'user__last_name', 'user__email', 'event__name', 'registration_date')
+        export_order = fields
@@ -0,0 +1,311 @@
+# core/seeding.py
+#
+# Generates a large, realistic data set for benchmarking (see the seed_efs
+# and benchmark_efs commands). Everything is drawn from one random.Random, so
+# the same seed, scale and anchor date always produce the same rows. The only
+# exceptions are auto_now/auto_now_add timestamps such as registration_date.
+#
+# At scale 1 this writes about 2,000 events, 200,000 users, 500,000
+# registrations and 1.5 million answers. Rows are written with bulk_create in
+# batches, bypassing signals, so the stats rollups are rebuilt and the cache
+# is cleared at the end.
+
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    Attendee, AttendeeAnswer, AttendeeAnswerChoice, Event, EventQuestion, Session, Speaker, UserProfile,
+)
+from .services import format_answer
+from .stats import rebuild_stats
+
+User = get_user_model()
+
+# Seeded accounts are "seed-<n>"; the superuser is "seed-admin". They all share
+# the password given to seed(), or get an unusable one (benchmark_efs logs in
+# with force_login, so it needs none).
+USERNAME_PREFIX = 'seed-'
+# Every seeded account also has an email under this domain. .invalid is
+# reserved (RFC 6761), so no real account can have one, and flush() only
+# deletes accounts with both the prefix and the domain.
+EMAIL_DOMAIN = 'seed.invalid'
+
+BATCH_SIZE = 2000
+
+# Row counts at scale 1.
+COUNTS = {
+    'events': 2000,
+    'speakers': 600,
+    'users': 200_000,
+    'registrations': 500_000,
+}
+
+FIRST_NAMES = [
+    'Ada', 'Adebayo', 'Aisha', 'Akua', 'Amara', 'Ana', 'Ayodele', 'Chen', 'Chidi', 'Chloe', 'Daniel',
+    'David', 'Efua', 'Elena', 'Emeka', 'Fatima', 'Femi', 'Grace', 'Hannah', 'Ibrahim', 'Ifeoma', 'James',
+    'Jane', 'Kemi', 'Kofi', 'Lara', 'Liam', 'Maria', 'Mohammed', 'Musa', 'Ngozi', 'Nia', 'Olu', 'Priya',
+    'Rahul', 'Sade', 'Samuel', 'Sara', 'Tunde', 'Wei', 'Yaw', 'Zainab',
+]
+LAST_NAMES = [
+    'Adeyemi', 'Afolabi', 'Banda', 'Brown', 'Chukwu', 'Diallo', 'Eze', 'Garcia', 'Hassan', 'Ibekwe',
+    'Johnson', 'Kamau', 'Khan', 'Mensah', 'Mohammed', 'Moreau', 'Nakamura', 'Nwosu', 'Okafor', 'Okonkwo',
+    'Olawale', 'Owusu', 'Patel', 'Rossi', 'Schmidt', 'Silva', 'Smith', 'Sow', 'Wang', 'Williams',
+]
+COMPANIES = [
+    'Access Holdings', 'Atlas Capital', 'Baobab Ventures', 'Cedar Advisory', 'Delta Energy', 'Equinox Bank',
+    'Harbor Logistics', 'Kilimanjaro Partners', 'Lagos Fintech Hub', 'Meridian Insurance', 'Niger Delta Power',
+    'Sahel Agritech', 'Savanna Telecom', 'Zenith Consulting', '',
+]
+JOB_TITLES = [
+    'Analyst', 'Chief Economist', 'Consultant', 'Director', 'Founder', 'Head of Strategy', 'Investor',
+    'Managing Partner', 'Policy Advisor', 'Product Manager', 'Researcher', 'Student', '',
+]
+TOPICS = [
+    'African Trade', 'Capital Markets', 'Climate Finance', 'Digital Payments', 'Energy Transition',
+    'Fiscal Policy', 'Food Security', 'Infrastructure', 'Monetary Policy', 'Public Health Economics',
+    'Startups & Venture Capital', 'Supply Chains', 'Tax Reform', 'Urban Development',
+]
+FORMATS = ['Forum', 'Summit', 'Roundtable', 'Masterclass', 'Symposium', 'Briefing']
+CITIES = ['Lagos', 'Abuja', 'Accra', 'Nairobi', 'Kigali', 'Johannesburg', 'Cairo', 'Dakar', 'London']
+
+# (label, field_type, choices)
+QUESTIONS = [
+    ('How did you hear about this event?', 'dropdown', ['Email', 'LinkedIn', 'A colleague', 'Our website', 'The press']),
+    ('Which topics interest you most?', 'checkbox', ['Policy', 'Markets', 'Technology', 'Sustainability', 'Careers']),
+    ('Which sector do you work in?', 'radio', ['Finance', 'Government', 'Academia', 'Industry', 'Non-profit', 'Other']),
+    ('Will you attend the networking reception?', 'radio', ['Yes', 'No', 'Maybe']),
+    ('How large is your organisation?', 'dropdown', ['1-10', '11-50', '51-200', '201-1000', 'More than 1000']),
+    ('Do you have any dietary requirements?', 'text', []),
+    ('What would you like to get out of this event?', 'textarea', []),
+    ('Which sessions do you plan to attend?', 'checkbox', ['Keynote', 'Panel', 'Workshop', 'Fireside chat']),
+]
+TEXT_ANSWERS = [
+    '', 'None', 'Vegetarian', 'Vegan', 'Halal', 'No nuts, please.',
+    'Meeting people working on the same problems.',
+    'A clearer view of where policy is heading next year.',
+    'Practical ideas I can take back to my team.',
+    'Contacts in the investment community.',
+]
+SESSION_KINDS = ['Keynote', 'Panel', 'Workshop', 'Fireside chat', 'Q&A', 'Networking break']
+
+
+class SeedingError(Exception):
+    """The data set can't be written to this database."""
+
+
+def seeded_users():
+    """The accounts written by seed(): the username prefix alone could match real people."""
+    return User.objects.filter(username__startswith=USERNAME_PREFIX, email__endswith=f'@{EMAIL_DOMAIN}')
+
+
+def flush():
+    """Deletes every event and speaker, and the seeded accounts."""
+    with transaction.atomic():
+        Event.objects.all().delete()
+        Speaker.objects.all().delete()
+        seeded_users().delete()
+    rebuild_stats()
+    cache.clear()
+
+
+def scaled(scale):
+    return {name: max(int(count * scale), 1) for name, count in COUNTS.items()}
+
+
+def seed(seed=1, scale=1.0, anchor=None, log=print, password=None):
+    """
+    Writes the data set for `seed` at `scale` (a fraction or multiple of
+    COUNTS). Event dates are spread around `anchor` (default: today, midnight
+    UTC) so that some events are always ongoing and upcoming. Every seeded
+    account gets `password`, or an unusable one if it is None. Returns the
+    number of rows written per model.
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        raise SeedingError("Seeding needs a database that returns ids from bulk inserts (PostgreSQL or SQLite).")
+
+    rng = random.Random(seed)
+    counts = scaled(scale)
+    anchor = anchor or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    written = {}
+
+    with transaction.atomic():
+        speakers = _seed_speakers(rng, counts['speakers'])
+        events = _seed_events(rng, counts['events'], speakers, anchor)
+        user_ids = _seed_users(rng, counts['users'], password)
+    written.update(speakers=len(speakers), events=len(events), users=len(user_ids))
+    log(f"{len(events)} events, {len(speakers)} speakers and {len(user_ids)} users written.")
+
+    questions = _seed_questions(rng, events)
+    written['questions'] = sum(len(event_questions) for event_questions in questions.values())
+
+    written.update(attendees=0, answers=0, answer_choices=0)
+    sizes = _registration_sizes(rng, len(events), counts['registrations'], len(user_ids))
+    for number, (event, size) in enumerate(zip(events, sizes), start=1):
+        attendee_user_ids = [user_ids[i] for i in rng.sample(range(len(user_ids)), size)]
+        with transaction.atomic():
+            attendees, answers, choices = _seed_registrations(rng, event, attendee_user_ids, questions[event.pk])
+        written['attendees'] += attendees
+        written['answers'] += answers
+        written['answer_choices'] += choices
+        if number % 100 == 0 or number == len(events):
+            log(f"Registrations for {number}/{len(events)} events written ({written['answers']} answers).")
+
+    _seed_admin(password)
+    rebuild_stats()
+    cache.clear()
+    return written
+
+
+def _seed_speakers(rng, count):
+    speakers = [
+        Speaker(
+            name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            bio=f"{rng.choice(JOB_TITLES) or 'Speaker'} at {rng.choice(COMPANIES) or 'an independent practice'}, "
+                f"working on {rng.choice(TOPICS).lower()}.",
+        )
+        for _ in range(count)
+    ]
+    return Speaker.objects.bulk_create(speakers, batch_size=BATCH_SIZE)
+
+
+def _seed_events(rng, count, speakers, anchor):
+    events = []
+    for i in range(count):
+        topic, city = rng.choice(TOPICS), rng.choice(CITIES)
+        # Spread over a year either side of the anchor; a few run across it.
+        start = anchor + timedelta(days=rng.randint(-365, 365), hours=rng.choice([9, 10, 13, 14, 18]))
+        end = start + rng.choice([timedelta(hours=2), timedelta(hours=4), timedelta(hours=8), timedelta(days=2)])
+        event_type = rng.choice(Event.EventType.values)
+        events.append(Event(
+            name=f"{topic} {rng.choice(FORMATS)} {city} {start.year}",
+            start_datetime=start,
+            end_datetime=end,
+            event_type=event_type,
+            physical_location='' if event_type == Event.EventType.ONLINE else f"Conference Centre, {city}",
+            online_link='' if event_type == Event.EventType.PHYSICAL else f"https://meet.example.com/efs-{i}",
+            description=f"A {topic.lower()} event for practitioners and policy makers in {city}.",
+            is_active=rng.random() > 0.05,
+        ))
+    events = Event.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+    event_speakers, sessions, session_speakers = [], [], []
+    for event in events:
+        lineup = rng.sample(speakers, min(rng.randint(2, 5), len(speakers)))
+        event_speakers.extend(Event.speakers.through(event_id=event.pk, speaker_id=speaker.pk) for speaker in lineup)
+        start = datetime.combine(event.start_datetime.date(), time(9))
+        for _ in range(rng.randint(3, 8)):
+            end = start + timedelta(minutes=rng.choice([30, 45, 60, 90]))
+            sessions.append(Session(
+                event=event,
+                title=f"{rng.choice(SESSION_KINDS)}: {rng.choice(TOPICS)}",
+                start_time=start.time(),
+                end_time=end.time(),
+            ))
+            start = end
+    Event.speakers.through.objects.bulk_create(event_speakers, batch_size=BATCH_SIZE)
+    sessions = Session.objects.bulk_create(sessions, batch_size=BATCH_SIZE)
+    lineups = {}
+    for link in event_speakers:
+        lineups.setdefault(link.event_id, []).append(link.speaker_id)
+    for session in sessions:
+        lineup = lineups[session.event_id]
+        for speaker_id in rng.sample(lineup, rng.randint(1, min(2, len(lineup)))):
+            session_speakers.append(Session.speakers.through(session_id=session.pk, speaker_id=speaker_id))
+    Session.speakers.through.objects.bulk_create(session_speakers, batch_size=BATCH_SIZE)
+    return events
+
+
+def _seed_users(rng, count, password):
+    # Hashing once keeps seeding fast; every seeded account can still log in with it.
+    password = make_password(password)
+    user_ids = []
+    for offset in range(0, count, BATCH_SIZE):
+        users, profiles = [], []
+        for i in range(offset, min(offset + BATCH_SIZE, count)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(User(
+                username=f'{USERNAME_PREFIX}{i}',
+                email=f'{first}.{last}.{i}@{EMAIL_DOMAIN}'.lower(),
+                first_name=first,
+                last_name=last,
+                password=password,
+            ))
+            profiles.append((rng.choice(COMPANIES), rng.choice(JOB_TITLES)))
+        users = User.objects.bulk_create(users)
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, company_name=company, job_title=job_title)
+            for user, (company, job_title) in zip(users, profiles)
+        ])
+        user_ids.extend(user.pk for user in users)
+    return user_ids
+
+
+def _seed_questions(rng, events):
+    """Returns {event id: [EventQuestion, ...]}."""
+    questions = []
+    for event in events:
+        for order, (label, field_type, choices) in enumerate(rng.sample(QUESTIONS, rng.randint(2, 6))):
+            questions.append(EventQuestion(
+                event=event,
+                label=label,
+                field_type=field_type,
+                is_required=rng.random() < 0.5,
+                choices='\n'.join(choices),
+                order=order,
+            ))
+    by_event = {event.pk: [] for event in events}
+    for question in EventQuestion.objects.bulk_create(questions, batch_size=BATCH_SIZE):
+        by_event[question.event_id].append(question)
+    return by_event
+
+
+def _registration_sizes(rng, events, registrations, users):
+    """A long-tailed number of attendees per event, adding up to about `registrations`."""
+    weights = [rng.paretovariate(1.2) for _ in range(events)]
+    total = sum(weights)
+    return [min(round(registrations * weight / total), users) for weight in weights]
+
+
+def _seed_registrations(rng, event, user_ids, questions):
+    """Registers `user_ids` for `event` with answers. Returns the rows written per model."""
+    attendees = Attendee.objects.bulk_create(
+        [Attendee(user_id=user_id, event=event) for user_id in user_ids], batch_size=BATCH_SIZE,
+    )
+    answers, picked = [], []
+    for attendee in attendees:
+        for question in questions:
+            if not question.is_required and rng.random() < 0.2:
+                continue
+            options = question.get_choices_as_list()
+            if question.field_type == 'checkbox':
+                selected = sorted(rng.sample(options, rng.randint(1, 3)), key=options.index)
+                value = selected
+            elif question.field_type in EventQuestion.CHOICE_FIELD_TYPES:
+                selected = [rng.choice(options)]
+                value = selected[0]
+            else:
+                selected = []
+                value = rng.choice(TEXT_ANSWERS)
+            answers.append(AttendeeAnswer(attendee=attendee, question=question, answer=format_answer(value)))
+            picked.append(selected)
+    answers = AttendeeAnswer.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+    choices = AttendeeAnswerChoice.objects.bulk_create(
+        [
+            AttendeeAnswerChoice(answer_id=answer.pk, question_id=answer.question_id, choice=choice)
+            for answer, selected in zip(answers, picked)
+            for choice in selected
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return len(attendees), len(answers), len(choices)
+
+
+def _seed_admin(password):
+    if not User.objects.filter(username=f'{USERNAME_PREFIX}admin').exists():
+        User.objects.create_superuser(f'{USERNAME_PREFIX}admin', f'admin@{EMAIL_DOMAIN}', password)
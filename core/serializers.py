@@ -1,5 +1,9 @@
+import os
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
 from rest_framework import serializers
-from .models import Event
+from .models import Event, ResourceUpload
 
 class EventSerializer(serializers.ModelSerializer):
     """
@@ -7,6 +11,9 @@ class EventSerializer(serializers.ModelSerializer):
     """
     # Use our custom property to always get a valid image URL
     featured_image = serializers.URLField(source='featured_image_url', read_only=True)
+    # Resized copies, so list views don't have to download the original upload
+    featured_image_thumbnail = serializers.SerializerMethodField()
+    featured_image_srcset = serializers.SerializerMethodField()
     
     # Show the human-readable version of the event type
     event_type_display = serializers.CharField(source='get_event_type_display', read_only=True)
@@ -31,12 +38,53 @@ class EventSerializer(serializers.ModelSerializer):
             'physical_location',
             'online_link',
             'featured_image', # This will now use the URL from our property
+            'featured_image_thumbnail',
+            'featured_image_srcset',
             'event_status',
             'event_detail_url',
         ]
         
+    def get_featured_image_thumbnail(self, obj):
+        return obj.featured_image_url(size='card', format='webp')
+
+    def get_featured_image_srcset(self, obj):
+        return obj.featured_image_srcset(format='webp')
+
     def get_event_detail_url(self, obj):
         # This creates a full, absolute URL to the event detail page
         # which is very useful for API consumers.
         request = self.context.get('request')
-        return request.build_absolute_uri(obj.get_absolute_url()) # We'll add this method to the model next
\ No newline at end of file
+        return request.build_absolute_uri(obj.get_absolute_url()) # We'll add this method to the model next
+
+
+class ResourceUploadSerializer(serializers.ModelSerializer):
+    """
+    Starts a chunked upload and reports its progress. Give `event`, `speaker`
+    and `title` to have the EventResource created when the upload completes.
+    """
+    chunk_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ResourceUpload
+        fields = [
+            'id', 'filename', 'total_size', 'sha256', 'chunk_size', 'chunk_count', 'received', 'status',
+            'event', 'speaker', 'title', 'is_visible', 'resource', 'stored_name',
+        ]
+        read_only_fields = ['id', 'chunk_size', 'received', 'status', 'resource', 'stored_name']
+
+    def validate_filename(self, value):
+        return get_valid_filename(os.path.basename(value))
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("The file is empty.")
+        if value > settings.RESOURCE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files can be at most {settings.RESOURCE_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate(self, attrs):
+        given = [name for name in ('event', 'speaker', 'title') if attrs.get(name)]
+        if given and len(given) < 3:
+            raise serializers.ValidationError("Give all of event, speaker and title, or none of them.")
+        return attrs
+
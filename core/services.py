@@ -0,0 +1,115 @@
+# core/services.py
+
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Attendee, AttendeeAnswer, AttendeeAnswerChoice, Event, EventQuestion
+from .stats import record_answers
+
+
+CUSTOM_QUESTION_PREFIX = 'custom_question_'
+
+
+def format_answer(value):
+    """Flattens a cleaned form value into the text stored on AttendeeAnswer."""
+    return ", ".join(value) if isinstance(value, list) else str(value)
+
+
+def save_attendee_answers(attendee, cleaned_data, questions=None):
+    """
+    Saves every custom-question answer in `cleaned_data` for `attendee`,
+    along with one AttendeeAnswerChoice per picked choice.
+
+    `questions` is an optional mapping from question id to its compiled
+    schema entry (see core.forms.compile_question_schema), normally the
+    form's own. Any other id is checked with a single query, and answers and
+    choices are each written with one `bulk_create`.
+    """
+    values = {}
+    for key, value in cleaned_data.items():
+        if key.startswith(CUSTOM_QUESTION_PREFIX):
+            values[int(key[len(CUSTOM_QUESTION_PREFIX):])] = value
+
+    field_types = {question_id: entry['field_type'] for question_id, entry in (questions or {}).items()}
+    missing_ids = [question_id for question_id in values if question_id not in field_types]
+    if missing_ids:
+        field_types.update(EventQuestion.objects.filter(pk__in=missing_ids).values_list('pk', 'field_type'))
+
+    answers = [
+        AttendeeAnswer(attendee=attendee, question_id=question_id, answer=format_answer(value))
+        for question_id, value in values.items()
+        if question_id in field_types
+    ]
+    answers = AttendeeAnswer.objects.bulk_create(answers)
+
+    # Backends that cannot return primary keys from a bulk insert need one lookup.
+    answer_ids = {answer.question_id: answer.pk for answer in answers}
+    if None in answer_ids.values():
+        answer_ids = dict(attendee.answers.values_list('question_id', 'pk'))
+
+    choices = []
+    for question_id, value in values.items():
+        if field_types.get(question_id) not in EventQuestion.CHOICE_FIELD_TYPES:
+            continue
+        selected = value if isinstance(value, list) else [value] if value else []
+        for choice in dict.fromkeys(selected):
+            choices.append(AttendeeAnswerChoice(
+                answer_id=answer_ids[question_id], question_id=question_id, choice=choice[:255]
+            ))
+    choices = AttendeeAnswerChoice.objects.bulk_create(choices, ignore_conflicts=True)
+
+    # Bulk inserts skip the model signals, so update the statistics rollups here.
+    record_answers(answers, choices)
+    return answers
+
+
+def register_attendee(user, event, form):
+    """
+    Registers `user` for `event` and saves the answers from a validated
+    CombinedSignupForm or DynamicQuestionsForm. Must be called inside a
+    transaction.
+    """
+    attendee = Attendee.objects.create(user=user, event=event)
+    save_attendee_answers(attendee, form.cleaned_data, questions=form.questions)
+    return attendee
+
+
+def dashboard_events(user, now):
+    """
+    The dashboard's events in one query: active events that are ongoing or
+    upcoming at `now`. Each is annotated with `status`, `attendee_count` (from
+    the EventStats rollup) and `is_registered` (whether `user` is already an
+    attendee), so the template never needs a per-card query.
+    """
+    return (
+        Event.objects.with_status()
+        .filter(is_active=True)
+        # Ongoing: started but not yet ended. Upcoming: starts in the future.
+        .filter(Q(start_datetime__lte=now, end_datetime__gte=now) | Q(start_datetime__gt=now))
+        .annotate(
+            # Read from the EventStats rollup instead of counting attendees.
+            attendee_count=Coalesce(F('stats__attendee_count'), Value(0)),
+            is_registered=Exists(Attendee.objects.filter(event=OuterRef('pk'), user_id=user.pk)),
+        )
+        .order_by('start_datetime')
+    )
+
+
+def split_dashboard(events, now):
+    ongoing_events, upcoming_events = [], []
+    for event in events:
+        (upcoming_events if event.start_datetime > now else ongoing_events).append(event)
+    return ongoing_events, upcoming_events
+
+
+def build_dashboard(user, now=None):
+    """Returns (ongoing_events, upcoming_events) for the dashboard in one query."""
+    now = now or timezone.now()
+    return split_dashboard(dashboard_events(user, now), now)
+
+
+async def abuild_dashboard(user, now=None):
+    """Async version of build_dashboard, for the async dashboard view."""
+    now = now or timezone.now()
+    return split_dashboard([event async for event in dashboard_events(user, now)], now)
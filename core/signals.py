@@ -0,0 +1,162 @@
+# core/signals.py
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_event_versions
+from .forms import invalidate_question_schema
+from .images import delete_derivatives, generate_derivatives, has_derivatives, save_original_size
+from .stats import adjust_choice_counts, adjust_event_attendees, adjust_question_responses
+from .models import Attendee, AttendeeAnswer, AttendeeAnswerChoice, Event, EventQuestion, EventResource, Session, Speaker
+
+
+@receiver([post_save, post_delete], sender=EventQuestion)
+def clear_question_schema(sender, instance, **kwargs):
+    """Drops the cached form schema whenever one of an event's questions changes."""
+    invalidate_question_schema(instance.event_id)
+
+
+@receiver(post_save, sender=AttendeeAnswer)
+def sync_answer_choices(sender, instance, **kwargs):
+    """
+    Keeps AttendeeAnswerChoice rows in step with answers saved one at a time.
+    Answers saved in bulk get their choices from core.services.save_attendee_answers.
+    """
+    if kwargs.get('created'):
+        adjust_question_responses({instance.question_id: 1})
+    instance.choices.all().delete()
+    choices = AttendeeAnswerChoice.objects.bulk_create(
+        [
+            AttendeeAnswerChoice(answer=instance, question_id=instance.question_id, choice=choice[:255])
+            for choice in dict.fromkeys(instance.get_selected_choices())
+        ],
+        ignore_conflicts=True,
+    )
+    adjust_choice_counts({(choice.question_id, choice.choice): 1 for choice in choices})
+
+
+# ==============================================================================
+# IMAGE DERIVATIVES (see core/images.py)
+# A new upload gets a new file name, so missing derivatives mean a new image.
+# The derivatives of a replaced or deleted image are removed once the change
+# commits.
+# ==============================================================================
+
+IMAGE_FIELDS = {Event: 'featured_image', Speaker: 'picture'}
+
+
+def _delete_derivatives_on_commit(name, storage):
+    transaction.on_commit(lambda: delete_derivatives(name, storage))
+
+
+@receiver(pre_save, sender=Event)
+@receiver(pre_save, sender=Speaker)
+def remember_old_image(sender, instance, update_fields=None, **kwargs):
+    instance._old_image_name = None
+    if instance.pk is not None and (update_fields is None or IMAGE_FIELDS[sender] in update_fields):
+        instance._old_image_name = (
+            sender.objects.filter(pk=instance.pk).values_list(IMAGE_FIELDS[sender], flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Speaker)
+def resize_image(sender, instance, **kwargs):
+    field_file = getattr(instance, IMAGE_FIELDS[sender])
+    old_name = getattr(instance, '_old_image_name', None)
+    if old_name and old_name != field_file.name:
+        _delete_derivatives_on_commit(old_name, field_file.storage)
+        if not field_file:
+            save_original_size(field_file, (None, None))
+    if field_file and not has_derivatives(field_file):
+        save_original_size(field_file, generate_derivatives(field_file))
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Speaker)
+def delete_image_derivatives(sender, instance, **kwargs):
+    field_file = getattr(instance, IMAGE_FIELDS[sender])
+    if field_file:
+        _delete_derivatives_on_commit(field_file.name, field_file.storage)
+
+
+# ==============================================================================
+# STATISTICS ROLLUPS (see core/stats.py)
+# ==============================================================================
+
+@receiver(post_save, sender=Attendee)
+def count_attendee(sender, instance, created, **kwargs):
+    if created:
+        adjust_event_attendees({instance.event_id: 1})
+
+
+@receiver(post_delete, sender=Attendee)
+def uncount_attendee(sender, instance, **kwargs):
+    adjust_event_attendees({instance.event_id: -1})
+
+
+@receiver(post_delete, sender=AttendeeAnswer)
+def uncount_answer(sender, instance, **kwargs):
+    adjust_question_responses({instance.question_id: -1})
+
+
+@receiver(post_delete, sender=AttendeeAnswerChoice)
+def uncount_answer_choice(sender, instance, **kwargs):
+    adjust_choice_counts({(instance.question_id, instance.choice): -1})
+
+
+# ==============================================================================
+# EVENT PAGE VERSION STAMPS
+# Anything shown on event_detail bumps the version of the events it appears on.
+# ==============================================================================
+
+@receiver([post_save, post_delete], sender=Event)
+def bump_event(sender, instance, **kwargs):
+    bump_event_versions([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Session)
+@receiver([post_save, post_delete], sender=EventResource)
+def bump_event_of_child(sender, instance, **kwargs):
+    bump_event_versions([instance.event_id])
+
+
+def events_featuring(speaker_ids):
+    return set(
+        Event.objects.filter(Q(speakers__in=speaker_ids) | Q(sessions__speakers__in=speaker_ids))
+        .values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Speaker)
+@receiver(pre_delete, sender=Speaker)
+def bump_events_of_speaker(sender, instance, **kwargs):
+    # pre_delete: the speaker's links are gone by the time post_delete fires.
+    bump_event_versions(events_featuring([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Event.speakers.through)
+def bump_events_of_speaker_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_event_versions([instance.pk])
+    elif pk_set:
+        bump_event_versions(pk_set)
+    else:
+        # post_clear from the speaker side does not say which events were affected.
+        bump_event_versions(Event.objects.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Session.speakers.through)
+def bump_events_of_session_speakers(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_event_versions([instance.event_id])
+    elif pk_set:
+        bump_event_versions(set(Session.objects.filter(pk__in=pk_set).values_list('event_id', flat=True)))
+    else:
+        bump_event_versions(Event.objects.values_list('pk', flat=True))
@@ -0,0 +1,100 @@
+# core/stats.py
+#
+# Incremental maintenance of the EventStats, QuestionStats and
+# QuestionChoiceStats rollups. Single-row saves and deletes are handled by
+# the signals in core/signals.py; bulk answer saves in core/services.py call
+# the adjust_* helpers directly. rebuild_stats() recomputes everything.
+#
+# Every signup for an event updates the same few rows, so the updates are
+# made after the registering transaction commits, each in a transaction of
+# its own. The row locks are then held for one UPDATE instead of the whole
+# signup, and concurrent signups for an event no longer queue behind each
+# other. A rolled-back signup is never counted. If a process dies between
+# the commit and the update, rebuild_stats() puts the counts right.
+
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import (
+    Attendee, AttendeeAnswer, AttendeeAnswerChoice,
+    EventStats, QuestionChoiceStats, QuestionStats,
+)
+
+
+def _adjust(model, key_fields, count_field, deltas):
+    """
+    Applies {key: delta} to `count_field` once the current transaction
+    commits (straight away outside a transaction).
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(partial(_apply, model, key_fields, count_field, deltas))
+
+
+def _apply(model, key_fields, count_field, deltas):
+    """
+    Applies {key: delta} to `count_field` with one UPDATE per distinct delta.
+    Missing rows are created first for increments only, so a decrement that
+    runs after its parent was deleted never resurrects a stats row.
+    """
+    new_keys = [key for key, delta in deltas.items() if delta > 0]
+    if new_keys:
+        model.objects.bulk_create(
+            [model(**dict(zip(key_fields, key))) for key in new_keys],
+            ignore_conflicts=True,
+        )
+
+    keys_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        keys_by_delta[delta].append(key)
+    for delta, keys in keys_by_delta.items():
+        condition = Q()
+        for key in keys:
+            condition |= Q(**dict(zip(key_fields, key)))
+        model.objects.filter(condition).update(**{count_field: F(count_field) + delta})
+
+
+def adjust_event_attendees(deltas):
+    """`deltas` maps event ids to the change in their attendee count."""
+    _adjust(EventStats, ('event_id',), 'attendee_count', {(event_id,): delta for event_id, delta in deltas.items()})
+
+
+def adjust_question_responses(deltas):
+    """`deltas` maps question ids to the change in their response count."""
+    _adjust(QuestionStats, ('question_id',), 'response_count', {(question_id,): delta for question_id, delta in deltas.items()})
+
+
+def adjust_choice_counts(deltas):
+    """`deltas` maps (question_id, choice) pairs to the change in their count."""
+    _adjust(QuestionChoiceStats, ('question_id', 'choice'), 'count', deltas)
+
+
+def record_answers(answers, choices):
+    """Counts freshly bulk-created AttendeeAnswer and AttendeeAnswerChoice rows."""
+    adjust_question_responses(Counter(answer.question_id for answer in answers))
+    adjust_choice_counts(Counter((choice.question_id, choice.choice) for choice in choices))
+
+
+def rebuild_stats():
+    """Recomputes every rollup from the raw registration tables."""
+    with transaction.atomic():
+        EventStats.objects.all().delete()
+        EventStats.objects.bulk_create(
+            EventStats(event_id=row['event'], attendee_count=row['count'])
+            for row in Attendee.objects.values('event').annotate(count=Count('id')).order_by()
+        )
+
+        QuestionStats.objects.all().delete()
+        QuestionStats.objects.bulk_create(
+            QuestionStats(question_id=row['question'], response_count=row['count'])
+            for row in AttendeeAnswer.objects.values('question').annotate(count=Count('id')).order_by()
+        )
+
+        QuestionChoiceStats.objects.all().delete()
+        QuestionChoiceStats.objects.bulk_create(
+            QuestionChoiceStats(question_id=row['question'], choice=row['choice'], count=row['count'])
+            for row in AttendeeAnswerChoice.objects.values('question', 'choice').annotate(count=Count('id')).order_by()
+        )
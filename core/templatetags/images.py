@@ -0,0 +1,24 @@
+# core/templatetags/images.py
+from django import template
+
+from core.images import image_srcset, image_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_size_url(field_file, size=None, format='jpeg'):
+    """
+    URL of a resized derivative of an image field.
+    Usage: {% image_size_url event.featured_image 'card' 'webp' %}
+    """
+    return image_url(field_file, size, format)
+
+
+@register.simple_tag
+def image_size_srcset(field_file, format='jpeg'):
+    """
+    srcset of every derivative width of an image field.
+    Usage: <source type="image/webp" srcset="{% image_size_srcset event.featured_image 'webp' %}">
+    """
+    return image_srcset(field_file, format)
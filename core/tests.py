@@ -1,3 +1,1647 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count
+from django.http import Http404
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import api_views, views
+from .cache import _acquire, cached, get_event_version
+from .downloads import RangeNotSatisfiable, parse_range
+from .forms import CombinedSignupForm, DynamicQuestionsForm, get_question_schema
+from .imports import claim_import_job, import_attendees, queue_import
+from .images import derivative_name, derivative_names, save_original_size
+from .uploads import UploadError, complete_upload, temp_path, write_chunk
+from .mail_queue import claim_batch, enqueue_email, process_queue, retry_delay
+from .models import (
+    Attendee, AttendeeAnswer, AttendeeAnswerChoice, Event, EventQuestion, EventResource, EventStats, ImportJob,
+    OutboundEmail, QuestionChoiceStats, QuestionStats, ReportJob, ResourceUpload, Session, Speaker, UsernameCounter,
+)
+from .report_jobs import claim_jobs, finish_job, queue_summary_report, release_job
+from .reports import build_question_summaries
+from .seeding import flush, seed, seeded_users
+from .services import build_dashboard, save_attendee_answers
+from .stats import rebuild_stats
+from .utils import create_user_with_unique_username, generate_unique_username, generate_unique_usernames
+
+
+class RegistrationAnswerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'jane@example.com', 'pw')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_event(self, name, extra_questions=0):
+        event = Event.objects.create(name=name, start_datetime=timezone.now() + timedelta(days=1))
+        colours = EventQuestion.objects.create(event=event, label='Colours', field_type='checkbox', choices='Red\nBlue')
+        size = EventQuestion.objects.create(event=event, label='Size', field_type='dropdown', choices='S\nM', order=1)
+        texts = [
+            EventQuestion.objects.create(event=event, label=f'Note {i}', field_type='text', order=2 + i)
+            for i in range(extra_questions + 1)
+        ]
+        return event, colours, size, texts
+
+    def answers(self, colours, size, texts):
+        data = {f'custom_question_{colours.pk}': ['Red', 'Blue'], f'custom_question_{size.pk}': 'M'}
+        data.update({f'custom_question_{text.pk}': f'Answer {i}' for i, text in enumerate(texts)})
+        return data
+
+    def test_signup_saves_the_account_and_every_answer(self):
+        event, colours, size, texts = self.create_event('Summit')
+        data = {
+            'first_name': 'Bob', 'last_name': 'Smith', 'email': 'bob@example.com',
+            'password': 'a-long-password', 'confirm_password': 'a-long-password',
+            **self.answers(colours, size, texts),
+        }
+        response = self.client.post(reverse('efs_signup', args=[event.pk]), data)
+        self.assertRedirects(response, reverse('efs_verification_email_sent'))
+
+        attendee = Attendee.objects.get(event=event)
+        self.assertEqual(attendee.user.email, 'bob@example.com')
+        self.assertFalse(attendee.user.is_active)
+        self.assertEqual(
+            dict(attendee.answers.values_list('question__label', 'answer')),
+            {'Colours': 'Red, Blue', 'Size': 'M', 'Note 0': 'Answer 0'},
+        )
+        self.assertEqual(
+            sorted(AttendeeAnswerChoice.objects.filter(answer__attendee=attendee).values_list('question__label', 'choice')),
+            [('Colours', 'Blue'), ('Colours', 'Red'), ('Size', 'M')],
+        )
+
+    def test_answer_queries_do_not_grow_with_the_questions(self):
+        self.client.force_login(self.user)
+
+        def register(extra_questions):
+            event, colours, size, texts = self.create_event(f'Event {extra_questions}', extra_questions)
+            url = reverse('answer_event_questions', args=[event.pk])
+            # Compiles and caches the question schema, as the form page does.
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, self.answers(colours, size, texts))
+            self.assertRedirects(response, reverse('efs_dashboard'), fetch_redirect_response=False)
+            self.assertEqual(AttendeeAnswer.objects.filter(attendee__event=event).count(), 3 + extra_questions)
+            return len(queries.captured_queries)
+
+        self.assertEqual(register(10), register(0))
+
+
+class QuestionSchemaCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        cls.question = EventQuestion.objects.create(
+            event=cls.event, label='Colour', field_type='dropdown', choices='Red\nGreen',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def labels(self):
+        return [entry['label'] for entry in get_question_schema(self.event)]
+
+    def test_the_schema_is_compiled_once(self):
+        with self.assertNumQueries(1):
+            schema = get_question_schema(self.event)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_question_schema(self.event), schema)
+        self.assertEqual(schema[0]['field_key'], f'custom_question_{self.question.pk}')
+        self.assertEqual(schema[0]['choices'], [('Red', 'Red'), ('Green', 'Green')])
+
+    def test_question_changes_refresh_the_schema(self):
+        self.assertEqual(self.labels(), ['Colour'])
+        self.question.label = 'Favourite colour'
+        self.question.save()
+        self.assertEqual(self.labels(), ['Favourite colour'])
+
+        EventQuestion.objects.create(event=self.event, label='Company', field_type='text', order=1)
+        self.assertEqual(self.labels(), ['Favourite colour', 'Company'])
+        self.question.delete()
+        self.assertEqual(self.labels(), ['Company'])
+
+    def test_both_registration_forms_build_their_fields_from_the_schema(self):
+        key = f'custom_question_{self.question.pk}'
+        for form in (CombinedSignupForm(event=self.event), DynamicQuestionsForm(event=self.event)):
+            self.assertEqual(form.fields[key].label, 'Colour')
+            self.assertEqual(list(form.fields[key].choices), [('Red', 'Red'), ('Green', 'Green')])
+        self.assertEqual(list(form.questions), [self.question.pk])
+
+
+class EventListAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.events = [
+            Event.objects.create(
+                name=f'Event {i}', start_datetime=now + timedelta(days=i), end_datetime=now + timedelta(days=i, hours=2),
+            )
+            for i in (3, 1, 4, 2, 5)
+        ]
+        Event.objects.create(name='Hidden', start_datetime=now, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_follow_the_start_time(self):
+        names = []
+        url = reverse('api-event-list') + '?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            names += [event['name'] for event in page['results']]
+            url = page['next']
+        self.assertEqual(names, ['Event 1', 'Event 2', 'Event 3', 'Event 4', 'Event 5'])
+
+    def test_events_starting_together_are_paged_once_each(self):
+        start = timezone.now() + timedelta(days=10)
+        tied = {Event.objects.create(name=f'Tied {i}', start_datetime=start).pk for i in range(5)}
+        ids = []
+        url = reverse('api-event-list') + '?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            ids += [event['id'] for event in page['results']]
+            url = page['next']
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), tied | {event.pk for event in self.events})
+        self.assertEqual([pk for pk in ids if pk in tied], sorted(tied))
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('api-event-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # A delete moves no timestamp, so the feed has no Last-Modified to go stale.
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Another page of the feed is a different resource.
+        self.assertEqual(self.client.get(url + '?page_size=2', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        event = self.events[1]
+        event.name = 'Event 1 (moved)'
+        event.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['name'], 'Event 1 (moved)')
+
+    def test_deletes_and_bulk_updates_change_the_etag(self):
+        url = reverse('api-event-list')
+        etag = self.client.get(url)['ETag']
+
+        self.events[0].delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Event 3', [event['name'] for event in response.json()['results']])
+        etag = response['ETag']
+
+        Event.objects.filter(pk=self.events[1].pk).update(name='Renamed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['name'], 'Renamed')
+
+
+class EventStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.past = Event.objects.create(
+            name='Past', start_datetime=now - timedelta(days=2), end_datetime=now - timedelta(days=1),
+        )
+        cls.ongoing = Event.objects.create(
+            name='Ongoing', start_datetime=now - timedelta(hours=1), end_datetime=now + timedelta(hours=1),
+        )
+        # An event without an end time is ongoing once it has started.
+        cls.open_ended = Event.objects.create(name='Open ended', start_datetime=now - timedelta(hours=1))
+        cls.upcoming = Event.objects.create(
+            name='Upcoming', start_datetime=now + timedelta(days=1), end_datetime=now + timedelta(days=1, hours=2),
+        )
+
+    def test_annotation_matches_the_python_rules(self):
+        with self.assertNumQueries(1):
+            events = {event.pk: event for event in Event.objects.with_status()}
+            statuses = {pk: event.event_status for pk, event in events.items()}
+        self.assertEqual(statuses, {
+            self.past.pk: Event.Status.PAST,
+            self.ongoing.pk: Event.Status.ONGOING,
+            self.open_ended.pk: Event.Status.ONGOING,
+            self.upcoming.pk: Event.Status.UPCOMING,
+        })
+        for pk, status in statuses.items():
+            self.assertEqual(Event.objects.get(pk=pk).event_status, status)
+
+    def test_filter_and_count_by_status_in_the_database(self):
+        with self.assertNumQueries(1):
+            ongoing = list(Event.objects.with_status().filter(status=Event.Status.ONGOING).order_by('name'))
+        self.assertEqual(ongoing, [self.ongoing, self.open_ended])
+
+        with self.assertNumQueries(1):
+            counts = dict(
+                Event.objects.with_status().values_list('status').annotate(n=Count('pk')).values_list('status', 'n')
+            )
+        self.assertEqual(counts, {Event.Status.PAST: 1, Event.Status.ONGOING: 2, Event.Status.UPCOMING: 1})
+
+
+class DashboardQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'jane@example.com', 'pw')
+        cls.other = User.objects.create_user('john', 'john@example.com', 'pw')
+
+    def create_events(self, count):
+        now = timezone.now()
+        events = []
+        for i in range(count):
+            # Alternate between ongoing and upcoming events.
+            if i % 2:
+                start, end = now - timedelta(hours=1), now + timedelta(hours=1 + i)
+            else:
+                start, end = now + timedelta(days=1 + i), now + timedelta(days=2 + i)
+            events.append(Event.objects.create(name=f'Event {i}', start_datetime=start, end_datetime=end))
+        return events
+
+    def test_build_dashboard_annotates_registration_state(self):
+        ongoing, upcoming = self.create_events(2)[::-1]
+        Event.objects.create(
+            name='Past', start_datetime=timezone.now() - timedelta(days=3),
+            end_datetime=timezone.now() - timedelta(days=2),
+        )
+        # The attendee counts are updated once the registrations commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendee.objects.create(user=self.user, event=upcoming)
+            Attendee.objects.create(user=self.other, event=upcoming)
+
+        ongoing_events, upcoming_events = build_dashboard(self.user)
+
+        self.assertEqual(ongoing_events, [ongoing])
+        self.assertEqual(upcoming_events, [upcoming])
+        self.assertFalse(ongoing_events[0].is_registered)
+        self.assertEqual(ongoing_events[0].attendee_count, 0)
+        self.assertTrue(upcoming_events[0].is_registered)
+        self.assertEqual(upcoming_events[0].attendee_count, 2)
+        self.assertEqual(upcoming_events[0].event_status, Event.Status.UPCOMING)
+
+    def test_dashboard_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        url = reverse('efs_dashboard')
+
+        self.create_events(2)
+        with self.assertNumQueries(3) as small:
+            self.client.get(url)
+
+        for event in self.create_events(20):
+            Attendee.objects.create(user=self.user, event=event)
+        with self.assertNumQueries(len(small.captured_queries)):
+            response = self.client.get(url)
+        self.assertContains(response, "You're registered", count=20)
+
+
+class EventDetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'jane@example.com', 'pw')
+        now = timezone.now()
+        cls.event, cls.other = [
+            Event.objects.create(name=name, start_datetime=now + timedelta(days=1), end_datetime=now + timedelta(days=2))
+            for name in ('Event', 'Other')
+        ]
+        cls.speaker = Speaker.objects.create(name='Ada', bio='Bio')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('event_detail', args=[self.event.pk])
+
+    def versions(self):
+        return get_event_version(self.event.pk), get_event_version(self.other.pk)
+
+    def test_page_fragments_follow_changes(self):
+        self.assertContains(self.client.get(self.url), 'The full agenda will be posted soon.')
+        session = Session.objects.create(event=self.event, title='Keynote', start_time='09:00', end_time='10:00')
+        self.assertContains(self.client.get(self.url), 'Keynote')
+
+        session.speakers.add(self.speaker)
+        self.assertContains(self.client.get(self.url), 'Ada')
+        self.speaker.name = 'Ada Lovelace'
+        self.speaker.save()
+        self.assertContains(self.client.get(self.url), 'Ada Lovelace')
+
+    def test_the_registration_button_is_not_cached(self):
+        self.assertContains(self.client.get(self.url), 'Register Now')
+        Attendee.objects.create(user=self.user, event=self.event)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(self.url), 'You are registered')
+
+    def test_session_changes_invalidate_their_event_page(self):
+        event, other = self.versions()
+        session = Session.objects.create(event=self.event, title='Talk', start_time='10:00', end_time='11:00')
+        self.assertNotEqual(get_event_version(self.event.pk), event)
+        self.assertEqual(get_event_version(self.other.pk), other)
+
+        event = get_event_version(self.event.pk)
+        session.speakers.add(self.speaker)
+        self.assertNotEqual(get_event_version(self.event.pk), event)
+
+    def test_speaker_changes_invalidate_the_events_featuring_them(self):
+        self.event.speakers.add(self.speaker)
+        event, other = self.versions()
+
+        self.speaker.bio = 'New bio'
+        self.speaker.save()
+        self.assertNotEqual(get_event_version(self.event.pk), event)
+        self.assertEqual(get_event_version(self.other.pk), other)
+
+        event = get_event_version(self.event.pk)
+        self.speaker.delete()
+        self.assertNotEqual(get_event_version(self.event.pk), event)
+        self.assertEqual(get_event_version(self.other.pk), other)
+
+    def test_speaker_links_from_the_speaker_side_invalidate_those_events(self):
+        event, other = self.versions()
+        self.speaker.events.add(self.other)
+        self.assertEqual(get_event_version(self.event.pk), event)
+        self.assertNotEqual(get_event_version(self.other.pk), other)
+
+
+class AdminChangelistQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def add_rows(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                event = Event.objects.create(name=f'Event {i}', start_datetime=timezone.now())
+                question = EventQuestion.objects.create(event=event, label=f'Question {i}', field_type='text')
+                user = User.objects.create_user(f'user-{event.pk}', f'user-{event.pk}@example.com')
+                attendee = Attendee.objects.create(user=user, event=event)
+                AttendeeAnswer.objects.create(attendee=attendee, question=question, answer='yes')
+
+    def assertFlatQueryCount(self, url):
+        self.add_rows(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_rows(20)
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_event_changelist_query_count_is_flat(self):
+        self.assertFlatQueryCount(reverse('admin:core_event_changelist') + '?o=6')
+
+    def test_question_changelist_query_count_is_flat(self):
+        self.assertFlatQueryCount(reverse('admin:core_eventquestion_changelist') + '?o=5')
+
+    def test_counts_are_annotated(self):
+        self.add_rows(1)
+        response = self.client.get(reverse('admin:core_event_changelist'))
+        self.assertEqual(response.context['cl'].result_list[0].num_attendees, 1)
+        response = self.client.get(reverse('admin:core_eventquestion_changelist'))
+        self.assertEqual(response.context['cl'].result_list[0].num_responses, 1)
+
+
+class AttendeeExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        now = timezone.now()
+        cls.summit = Event.objects.create(name='Summit', start_datetime=now + timedelta(days=1))
+        cls.meetup = Event.objects.create(name='Meetup', start_datetime=now + timedelta(days=2))
+        colours = EventQuestion.objects.create(event=cls.summit, label='Colours', field_type='checkbox', choices='Red\nBlue')
+        EventQuestion.objects.create(event=cls.summit, label='Notes', field_type='text', order=1)
+        diet = EventQuestion.objects.create(event=cls.meetup, label='Diet', field_type='text')
+
+        def attend(username, event, answers):
+            user = User.objects.create_user(username, f'{username}@example.com', first_name=username.title())
+            attendee = Attendee.objects.create(user=user, event=event)
+            for question, answer in answers.items():
+                AttendeeAnswer.objects.create(attendee=attendee, question=question, answer=answer)
+            return attendee
+
+        cls.bob = attend('bob', cls.summit, {colours: 'Red, Blue'})
+        cls.carol = attend('carol', cls.summit, {})
+        cls.dave = attend('dave', cls.meetup, {diet: 'Vegan, no nuts'})
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def export(self, action, attendees):
+        response = self.client.post(reverse('admin:core_attendee_changelist'), {
+            'action': action, '_selected_action': [attendee.pk for attendee in attendees],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def base(self, attendee):
+        user = attendee.user
+        return [
+            str(attendee.pk), user.first_name, '', user.email, attendee.event.name,
+            attendee.registration_date.isoformat(),
+        ]
+
+    def test_csv_has_a_column_per_question_of_the_selected_events(self):
+        response, content = self.export('export_as_csv', [self.bob, self.carol])
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="Attendee-[\d-]+\.csv"$')
+        self.assertEqual(list(csv.reader(StringIO(content))), [
+            ['id', 'first_name', 'last_name', 'email', 'event', 'registration_date', 'Colours', 'Notes'],
+            self.base(self.bob) + ['Red, Blue', ''],
+            self.base(self.carol) + ['', ''],
+        ])
+
+    def test_csv_prefixes_labels_when_several_events_are_selected(self):
+        _, content = self.export('export_as_csv', [self.dave, self.bob])
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0][6:], ['Summit: Colours', 'Summit: Notes', 'Meetup: Diet'])
+        self.assertEqual(rows[1:], [
+            self.base(self.bob) + ['Red, Blue', '', ''],
+            self.base(self.dave) + ['', '', 'Vegan, no nuts'],
+        ])
+
+    def test_ndjson_keys_answers_by_the_attendees_own_questions(self):
+        response, content = self.export('export_as_ndjson', [self.bob, self.dave])
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record['id'] for record in records], [self.bob.pk, self.dave.pk])
+        self.assertEqual(records[0]['answers'], {'Summit: Colours': 'Red, Blue', 'Summit: Notes': ''})
+        self.assertEqual(records[1]['answers'], {'Meetup: Diet': 'Vegan, no nuts'})
+        self.assertEqual(records[1]['email'], 'dave@example.com')
+
+
+class QuestionSummaryExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        now = timezone.now()
+        cls.summit = Event.objects.create(name='Summit', start_datetime=now + timedelta(days=1))
+        cls.meetup = Event.objects.create(name='Meetup', start_datetime=now + timedelta(days=2))
+        cls.empty = Event.objects.create(name='Empty', start_datetime=now + timedelta(days=3))
+        cls.colours = EventQuestion.objects.create(
+            event=cls.summit, label='Colours', field_type='checkbox', choices='Red\nBlue\nGreen',
+        )
+        cls.notes = EventQuestion.objects.create(event=cls.summit, label='Notes', field_type='text', order=1)
+        cls.diet = EventQuestion.objects.create(event=cls.meetup, label='Diet', field_type='text')
+        answers = [
+            (cls.summit, {cls.colours: 'Red, Blue', cls.notes: 'Great'}),
+            (cls.summit, {cls.colours: 'Red', cls.notes: 'Great'}),
+            (cls.summit, {cls.colours: 'Blue, Red', cls.notes: 'Too long'}),
+            (cls.meetup, {cls.diet: 'Vegan'}),
+        ]
+        # The summaries read the stats rollups, which are updated on commit.
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i, (event, event_answers) in enumerate(answers):
+                user = User.objects.create_user(f'user-{i}', f'user-{i}@example.com')
+                attendee = Attendee.objects.create(user=user, event=event)
+                for question, answer in event_answers.items():
+                    AttendeeAnswer.objects.create(attendee=attendee, question=question, answer=answer)
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def export(self, changelist, action, objects):
+        return self.client.post(reverse(f'admin:core_{changelist}_changelist'), {
+            'action': action, '_selected_action': [obj.pk for obj in objects],
+        })
+
+    def read_csv(self, content):
+        return list(csv.reader(StringIO(content.decode())))
+
+    def test_one_question_exports_a_single_csv(self):
+        response = self.export('eventquestion', 'export_summary_as_csv', [self.colours])
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Colours_summary.csv"')
+        # A checkbox answer counts towards each choice it picked.
+        self.assertEqual(self.read_csv(response.content), [['Answer', 'Count'], ['Red', '3'], ['Blue', '2']])
+
+    def test_several_questions_export_a_zip_with_a_csv_each(self):
+        response = self.export('eventquestion', 'export_summary_as_csv', [self.notes, self.diet])
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="question_summaries.zip"')
+        with zipfile.ZipFile(BytesIO(response.content)) as archive:
+            files = {name: self.read_csv(archive.read(name)) for name in archive.namelist()}
+        self.assertEqual(files, {
+            '01-summit-notes.csv': [['Answer', 'Count'], ['Great', '2'], ['Too long', '1']],
+            '02-meetup-diet.csv': [['Answer', 'Count'], ['Vegan', '1']],
+        })
+
+    def test_event_export_covers_the_questions_of_the_selected_events(self):
+        response = self.export('event', 'export_question_summaries_as_csv', [self.summit, self.empty])
+        with zipfile.ZipFile(BytesIO(response.content)) as archive:
+            self.assertEqual(archive.namelist(), ['01-summit-colours.csv', '02-summit-notes.csv'])
+
+        response = self.export('event', 'export_question_summaries_as_csv', [self.meetup])
+        self.assertEqual(self.read_csv(response.content), [['Answer', 'Count'], ['Vegan', '1']])
+
+    def test_events_without_questions_export_nothing(self):
+        response = self.export('event', 'export_question_summaries_as_csv', [self.empty])
+        self.assertRedirects(response, reverse('admin:core_event_changelist'))
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ["The selected events have no questions to export."],
+        )
+
+
+class AnswerChoiceTests(TestCase):
+    """Checkbox answers are stored joined with ", ", so choices containing commas must survive the round trip."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now() + timedelta(days=1))
+        cls.colours = EventQuestion.objects.create(
+            event=cls.event, label='Colours', field_type='checkbox', choices='  Red\nRed, dark \n Blue, light, pale\nGreen',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_choices_with_commas_and_whitespace_are_split_back_whole(self):
+        self.assertEqual(self.colours.get_choices_as_list(), ['Red', 'Red, dark', 'Blue, light, pale', 'Green'])
+        attendee = Attendee.objects.create(user=User.objects.create_user('bob'), event=self.event)
+        answer = AttendeeAnswer.objects.create(attendee=attendee, question=self.colours, answer='Red, dark, Red, Green')
+        self.assertEqual(answer.get_selected_choices(), ['Red, dark', 'Red', 'Green'])
+        self.assertEqual(sorted(answer.choices.values_list('choice', flat=True)), ['Green', 'Red', 'Red, dark'])
+        # Text that matches no choice is kept piece by piece.
+        answer.answer = 'Blue, light, pale, Purple, ish'
+        self.assertEqual(answer.get_selected_choices(), ['Blue, light, pale', 'Purple', 'ish'])
+
+    def test_form_answers_are_stored_and_exported_per_choice(self):
+        url = reverse('answer_event_questions', args=[self.event.pk])
+        field = f'custom_question_{self.colours.pk}'
+        for username, picked in (('bob', ['Red, dark', 'Blue, light, pale']), ('eve', ['Red', 'Red, dark'])):
+            self.client.force_login(User.objects.create_user(username))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, {field: picked})
+
+        answers = AttendeeAnswer.objects.filter(question=self.colours).order_by('attendee__user__username')
+        self.assertEqual([answer.answer for answer in answers], ['Red, dark, Blue, light, pale', 'Red, Red, dark'])
+        for answer in answers:
+            self.assertEqual(
+                sorted(answer.choices.values_list('choice', flat=True)), sorted(answer.get_selected_choices()),
+            )
+
+        self.client.force_login(self.admin_user)
+        response = self.client.post(reverse('admin:core_eventquestion_changelist'), {
+            'action': 'export_summary_as_csv', '_selected_action': [self.colours.pk],
+        })
+        self.assertEqual(list(csv.reader(StringIO(response.content.decode()))), [
+            ['Answer', 'Count'], ['Red, dark', '2'], ['Blue, light, pale', '1'], ['Red', '1'],
+        ])
+
+
+class AnswerChoiceMigrationTests(TransactionTestCase):
+    """Migration 0012 fills AttendeeAnswerChoice from answers saved before it existed."""
+    migrate_from = [('core', '0011_attendeeanswerchoice')]
+    migrate_to = [('core', '0012_populate_attendeeanswerchoice')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets or executor.loader.graph.leaf_nodes())
+        return executor.loader.project_state(targets).apps if targets else None
+
+    def tearDown(self):
+        self.migrate(None)
+
+    def test_answers_are_split_into_choices(self):
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('auth', 'User')
+        Event = apps.get_model('core', 'Event')
+        EventQuestion = apps.get_model('core', 'EventQuestion')
+        Attendee = apps.get_model('core', 'Attendee')
+        AttendeeAnswer = apps.get_model('core', 'AttendeeAnswer')
+
+        event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        questions = {
+            field_type: EventQuestion.objects.create(event=event, label=field_type, field_type=field_type, choices=choices)
+            for field_type, choices in (
+                ('checkbox', ' Red\nRed, dark \nGreen'), ('dropdown', 'S, M or L\nXL'), ('text', ''),
+            )
+        }
+        attendee = Attendee.objects.create(user=User.objects.create(username='bob'), event=event)
+        answers = {
+            field_type: AttendeeAnswer.objects.create(attendee=attendee, question=questions[field_type], answer=answer)
+            for field_type, answer in (
+                ('checkbox', 'Red, dark, Red, Purple'), ('dropdown', 'S, M or L'), ('text', 'Hello, world'),
+            )
+        }
+        AttendeeAnswer.objects.create(
+            attendee=Attendee.objects.create(user=User.objects.create(username='eve'), event=event),
+            question=questions['checkbox'], answer='',
+        )
+
+        apps = self.migrate(self.migrate_to)
+        AttendeeAnswerChoice = apps.get_model('core', 'AttendeeAnswerChoice')
+        self.assertEqual(
+            sorted(AttendeeAnswerChoice.objects.values_list('answer_id', 'question_id', 'choice')),
+            sorted([
+                (answers['checkbox'].pk, questions['checkbox'].pk, 'Red, dark'),
+                (answers['checkbox'].pk, questions['checkbox'].pk, 'Red'),
+                (answers['checkbox'].pk, questions['checkbox'].pk, 'Purple'),
+                (answers['dropdown'].pk, questions['dropdown'].pk, 'S, M or L'),
+            ]),
+        )
+
+
+class StartupImportTests(SimpleTestCase):
+    """
+    Every worker process pays for what Django imports at startup. Heavy
+    dependencies used by rare admin actions are loaded on first use instead.
+    """
+    # What a worker imports before serving its first request.
+    STARTUP = "import django; django.setup(); import efs_portal.urls, efs_portal.wsgi"
+    LAZY_MODULES = ['import_export.admin', 'tablib', 'PIL.Image', 'weasyprint']
+    # Sum of per-module import times, in ms; about 310 on a developer laptop.
+    BUDGET_MS = int(os.environ.get('IMPORT_TIME_BUDGET_MS', 600))
+
+    def run_startup(self, *options, code=STARTUP):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'efs_portal.settings'}
+        return subprocess.run(
+            [sys.executable, *options, '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        code = f"{self.STARTUP}; import sys; print(' '.join(m for m in {self.LAZY_MODULES!r} if m in sys.modules))"
+        self.assertEqual(self.run_startup(code=code).stdout.strip(), '')
+
+    def test_startup_import_time_is_within_budget(self):
+        timings = []
+        for _ in range(3):
+            lines = self.run_startup('-X', 'importtime').stderr.splitlines()
+            # "import time: self [us] | cumulative | imported package"
+            timings.append(sum(
+                int(line.split('|')[0].split(':')[1]) for line in lines
+                if line.startswith('import time:') and 'self [us]' not in line
+            ) / 1000)
+        self.assertLess(min(timings), self.BUDGET_MS, f"Startup imports took {min(timings):.0f} ms")
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_HEADER='all')
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'jane@example.com', 'pw')
+        cls.staff = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def test_server_timing_header_counts_queries(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('efs_dashboard'))
+        header = response['Server-Timing']
+        self.assertIn(f'desc="{len(queries.captured_queries)} queries"', header)
+        self.assertRegex(header, r'tpl;dur=\d+\.\d, total;dur=\d+\.\d$')
+
+    @override_settings(REQUEST_TIMING_HEADER='staff')
+    def test_header_is_for_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('efs_dashboard')))
+        self.client.force_login(self.staff)
+        self.assertIn('Server-Timing', self.client.get(reverse('admin:core_event_changelist')))
+
+    @override_settings(REQUEST_TIMING_SLOW_QUERIES=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(reverse('efs_dashboard'))
+        self.assertIn('Slow request: GET /dashboard/ -> 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_can_be_switched_off(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('efs_dashboard')))
+
+
+class SeedingTests(TestCase):
+    def snapshot(self):
+        return list(
+            AttendeeAnswer.objects.order_by('pk')
+            .values_list('attendee__user__username', 'question__event__name', 'question__label', 'answer')
+        )
+
+    def test_same_seed_gives_same_data(self):
+        anchor = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        written = seed(seed=7, scale=0.002, anchor=anchor, log=lambda message: None)
+        first = self.snapshot()
+        self.assertEqual(len(first), written['answers'])
+        # bulk_create skips the signals; the rollups are rebuilt instead.
+        event = Event.objects.order_by('pk').first()
+        self.assertEqual(event.stats.attendee_count, event.attendees.count())
+
+        flush()
+        seed(seed=7, scale=0.002, anchor=anchor, log=lambda message: None)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_seeded_accounts_only_get_a_password_when_given_one(self):
+        seed(scale=0.0001, log=lambda message: None)
+        self.assertFalse(any(user.has_usable_password() for user in User.objects.filter(username__startswith='seed-')))
+
+        flush()
+        call_command('seed_efs', '--scale', '0.0001', '--password', 'local-only', stdout=StringIO())
+        admin = User.objects.get(username='seed-admin')
+        self.assertTrue(admin.is_superuser)
+        self.assertTrue(admin.check_password('local-only'))
+        self.assertTrue(User.objects.get(username='seed-0').check_password('local-only'))
+
+    def test_flush_only_deletes_seeded_accounts(self):
+        seed(scale=0.0001, log=lambda message: None)
+        seeded = set(User.objects.filter(username__startswith='seed-').values_list('pk', flat=True))
+        self.assertEqual(set(seeded_users().values_list('pk', flat=True)), seeded)
+        self.assertTrue(all(email.endswith('@seed.invalid') for email in seeded_users().values_list('email', flat=True)))
+        # Real accounts that happen to share the prefix.
+        real = [
+            User.objects.create_user('seed-lover', 'lover@example.com'),
+            User.objects.create_user('seed-99999', 'someone@example.com'),
+        ]
+
+        flush()
+        self.assertFalse(User.objects.filter(pk__in=seeded).exists())
+        self.assertEqual(list(User.objects.filter(username__startswith='seed-').order_by('pk')), real)
+
+    def test_unsupported_databases_are_a_command_error(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            with self.assertRaisesMessage(CommandError, 'returns ids from bulk inserts'):
+                call_command('seed_efs', '--scale', '0.0001', stdout=StringIO())
+
+
+@override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=3, EMAIL_QUEUE_RETRY_BASE_SECONDS=60,
+                   EMAIL_QUEUE_RETRY_MAX_SECONDS=150, EMAIL_QUEUE_LOCK_TIMEOUT=600)
+class MailQueueTests(TestCase):
+    def queue(self, **kwargs):
+        return enqueue_email(mail.EmailMessage('Hello', 'Body', 'from@example.com', ['to@example.com'], **kwargs))
+
+    def test_every_message_part_survives_the_queue(self):
+        message = mail.EmailMultiAlternatives(
+            'Hello', 'Plain body', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], bcc=['bcc@example.com'], reply_to=['reply@example.com'],
+            headers={'X-Campaign': 'welcome'},
+        )
+        message.attach_alternative('<p>HTML body</p>', 'text/html')
+        enqueue_email(message)
+
+        self.assertEqual(process_queue(10), (1, 0))
+        sent = mail.outbox[0]
+        self.assertEqual(sent.recipients(), ['to@example.com', 'cc@example.com', 'bcc@example.com'])
+        self.assertEqual(sent.reply_to, ['reply@example.com'])
+        self.assertEqual(sent.extra_headers['X-Campaign'], 'welcome')
+        self.assertEqual([tuple(a) for a in sent.alternatives], [('<p>HTML body</p>', 'text/html')])
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.Status.SENT)
+
+    def test_attachments_are_rejected(self):
+        message = mail.EmailMessage('Hello', 'Body', 'from@example.com', ['to@example.com'])
+        message.attach('notes.txt', 'notes', 'text/plain')
+        with self.assertRaises(ValueError):
+            enqueue_email(message)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_claim_takes_due_and_abandoned_messages_only(self):
+        now = timezone.now()
+        due = self.queue()
+        later = self.queue()
+        later.next_attempt_at = now + timedelta(minutes=5)
+        later.save()
+        abandoned = self.queue()
+        OutboundEmail.objects.filter(pk=abandoned.pk).update(
+            status=OutboundEmail.Status.SENDING, locked_at=now - timedelta(seconds=601),
+        )
+        in_progress = self.queue()
+        OutboundEmail.objects.filter(pk=in_progress.pk).update(
+            status=OutboundEmail.Status.SENDING, locked_at=now - timedelta(seconds=60),
+        )
+
+        claimed = {message.pk for message in claim_batch(10)}
+        self.assertEqual(claimed, {due.pk, abandoned.pk})
+        self.assertEqual(OutboundEmail.objects.get(pk=due.pk).status, OutboundEmail.Status.SENDING)
+        self.assertEqual(claim_batch(10), [])
+
+    def test_retry_delay_backs_off_up_to_the_maximum(self):
+        self.assertEqual([retry_delay(n).total_seconds() for n in (1, 2, 3, 4)], [60, 120, 150, 150])
+
+    def test_failures_are_retried_then_given_up(self):
+        message = self.queue()
+        with mock.patch.object(mail.EmailMultiAlternatives, 'send', side_effect=SMTPException('refused')):
+            self.assertEqual(process_queue(10), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboundEmail.Status.PENDING)
+            self.assertEqual(message.attempts, 1)
+            self.assertEqual(message.last_error, 'refused')
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=55))
+            # Not due yet.
+            self.assertEqual(process_queue(10), (0, 0))
+
+            for _ in range(2):
+                OutboundEmail.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+                process_queue(10)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(message.attempts, 3)
+        self.assertEqual(mail.outbox, [])
+
+
+class UsernameAllocationTests(TestCase):
+    def test_sequential_names_get_increasing_suffixes(self):
+        names = [create_user_with_unique_username('Jane').username for _ in range(3)]
+        self.assertEqual(names, ['jane', 'jane1', 'jane2'])
+        self.assertEqual(UsernameCounter.objects.get(base='jane').next_suffix, 3)
+
+    def test_a_new_base_starts_after_existing_names(self):
+        User.objects.create_user('jane')
+        User.objects.create_user('jane7')
+        User.objects.create_user('janet')
+        self.assertEqual(generate_unique_username('Jane'), 'jane8')
+
+    def test_names_taken_by_another_base_are_skipped(self):
+        UsernameCounter.objects.create(base='jane', next_suffix=21)
+        self.assertEqual(create_user_with_unique_username('Jane2').username, 'jane2')
+        self.assertEqual(create_user_with_unique_username('Jane2').username, 'jane21')
+        self.assertEqual(create_user_with_unique_username('Jane').username, 'jane22')
+
+    def test_a_name_taken_concurrently_is_retried(self):
+        # As if another transaction created jane21 after the allocator checked it.
+        User.objects.create_user('jane21')
+        with mock.patch('core.utils.generate_unique_username', side_effect=['jane21', 'jane22']):
+            user = create_user_with_unique_username('Jane')
+        self.assertEqual(user.username, 'jane22')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        create_user_with_unique_username('Jane', email='jane@example.com')
+        with self.assertRaises(IntegrityError):
+            create_user_with_unique_username('Jane', email='JANE@example.com')
+
+    def test_bulk_allocation_matches_sequential(self):
+        User.objects.create_user('jane')
+        names = generate_unique_usernames(['Jane', 'John', 'Jane', '', 'Jane'])
+        self.assertEqual(names, ['jane1', 'john', 'jane2', 'user', 'jane3'])
+        self.assertEqual(generate_unique_username('Jane'), 'jane4')
+
+    def test_bulk_allocation_only_counts_the_bases_own_names(self):
+        for username in ['al', 'al7', 'alice', 'al2x', 'al12']:
+            User.objects.create_user(username)
+        # al12 is suffix 12 of "al" and suffix 2 of "al1"; al13 then goes to "al" only.
+        self.assertEqual(generate_unique_usernames(['Al', 'Al1', 'Alice']), ['al13', 'al14', 'alice1'])
+        self.assertEqual(generate_unique_username('Al1'), 'al15')
+
+    def test_bulk_allocation_never_repeats_a_name(self):
+        names = generate_unique_usernames(['Jane', 'Jane2'] * 30)
+        self.assertEqual(len(set(names)), 60)
+        for name in names:
+            User.objects.create_user(name)
+
+    def test_bulk_allocation_of_many_new_bases(self):
+        names = [f'Person{i}' for i in range(1500)]
+        User.objects.create_user('person0')
+        usernames = generate_unique_usernames(names)
+        self.assertEqual(usernames[:2], ['person01', 'person1'])
+        self.assertEqual(len(set(usernames)), 1500)
+
+
+class EmailBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'Jane.Doe@Example.com', 'secret')
+
+    def test_login_ignores_the_case_of_the_email(self):
+        self.assertEqual(authenticate(email='jane.doe@example.com', password='secret'), self.user)
+        self.assertEqual(authenticate(email=' JANE.DOE@EXAMPLE.COM ', password='secret'), self.user)
+        self.assertIsNone(authenticate(email='jane.doe@example.com', password='wrong'))
+
+    def test_inactive_users_cannot_log_in(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(authenticate(email='jane.doe@example.com', password='secret'))
+
+    def test_unknown_email_still_runs_the_hasher_once(self):
+        with mock.patch('django.contrib.auth.base_user.make_password', wraps=make_password) as hasher:
+            self.assertIsNone(authenticate(email='nobody@example.com', password='secret'))
+        hasher.assert_called_once_with('secret')
+
+    def test_accounts_without_an_email_never_match(self):
+        User.objects.create_user('blank', '', 'secret')
+        self.assertIsNone(authenticate(email='', password='secret'))
+
+
+class FakePool:
+    """Stands in for ProcessPoolExecutor; the first pool made dies on its first job."""
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        FakePool.created += 1
+        self.broken = FakePool.created == 1
+
+    def submit(self, fn, *args):
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool("A process in the pool was terminated abruptly."))
+        else:
+            future.set_result(b'%PDF-1.4 report')
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+@override_settings(REPORT_JOB_TIMEOUT=900, REPORT_JOB_MAX_ATTEMPTS=2)
+class ReportJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        EventQuestion.objects.create(event=cls.event, label='Company', field_type='text')
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        patcher = mock.patch.object(ReportJob._meta.get_field('file'), 'storage', FileSystemStorage(location=location))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self):
+        return queue_summary_report(build_question_summaries(self.event.questions.all()), 'Summit answers')
+
+    def test_identical_reports_reuse_the_job_unless_it_failed(self):
+        job = self.queue()
+        self.assertEqual(self.queue(), job)
+        finish_job(job, error='boom')
+        self.assertNotEqual(self.queue(), job)
+
+    def test_abandoned_jobs_are_claimed_again_then_failed(self):
+        job = self.queue()
+        self.assertEqual(claim_jobs(5), [job])
+        # Still within the timeout: the worker may be busy rendering it.
+        self.assertEqual(claim_jobs(5), [])
+
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=901))
+        self.assertEqual(claim_jobs(5), [job])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ReportJob.Status.RUNNING, 2))
+
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=901))
+        self.assertEqual(claim_jobs(5), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.Status.FAILED)
+        # A failed job is not reused, so the report can be asked for again.
+        self.assertNotEqual(self.queue(), job)
+
+    def test_released_jobs_are_queued_again_until_the_last_attempt(self):
+        job = self.queue()
+        release_job(claim_jobs(1)[0], 'pool died')
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.Status.PENDING)
+        release_job(claim_jobs(1)[0], 'pool died')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ReportJob.Status.FAILED, 'pool died'))
+
+    @mock.patch('core.management.commands.run_report_jobs.connections')
+    @mock.patch('core.management.commands.run_report_jobs.close_old_connections')
+    @mock.patch('core.management.commands.run_report_jobs.ProcessPoolExecutor', FakePool)
+    def test_worker_replaces_a_broken_pool(self, *mocks):
+        FakePool.created = 0
+        job = self.queue()
+        call_command('run_report_jobs', '--once', processes=1, stdout=StringIO(), stderr=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ReportJob.Status.DONE, 2))
+        self.assertEqual(FakePool.created, 2)
+
+    def test_pdfs_are_only_served_to_staff_through_the_admin(self):
+        job = self.queue()
+        finish_job(job, pdf_file=b'%PDF-1.4 report')
+        url = reverse('admin:core_reportjob_pdf', args=[job.pk])
+
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.admin_user)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 report')
+        self.assertContains(self.client.get(reverse('admin:core_reportjob_change', args=[job.pk])), url)
+
+
+class StatsRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        cls.colour = EventQuestion.objects.create(event=cls.event, label='Colours', field_type='checkbox',
+                                                  choices='Red\nBlue\nGreen')
+        cls.company = EventQuestion.objects.create(event=cls.event, label='Company', field_type='text')
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com') for i in range(3)]
+
+    def rollups(self):
+        return {
+            'events': dict(EventStats.objects.values_list('event_id', 'attendee_count')),
+            'questions': dict(QuestionStats.objects.values_list('question_id', 'response_count')),
+            'choices': dict(
+                ((question_id, choice), count)
+                for question_id, choice, count in QuestionChoiceStats.objects.values_list('question_id', 'choice', 'count')
+                if count
+            ),
+        }
+
+    def register(self, user, colours):
+        attendee = Attendee.objects.create(user=user, event=self.event)
+        save_attendee_answers(attendee, {
+            f'custom_question_{self.colour.pk}': colours, f'custom_question_{self.company.pk}': 'ACME',
+        })
+        return attendee
+
+    def test_rollups_follow_attendees_answers_and_choices(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.register(self.users[0], ['Red', 'Blue'])
+            self.register(self.users[1], ['Red'])
+        self.assertEqual(self.rollups(), {
+            'events': {self.event.pk: 2},
+            'questions': {self.colour.pk: 2, self.company.pk: 2},
+            'choices': {(self.colour.pk, 'Red'): 2, (self.colour.pk, 'Blue'): 1},
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # Changing an answer one at a time moves its choices.
+            answer = first.answers.get(question=self.colour)
+            answer.answer = 'Green'
+            answer.save()
+            first.answers.get(question=self.company).delete()
+        self.assertEqual(self.rollups()['questions'], {self.colour.pk: 2, self.company.pk: 1})
+        self.assertEqual(self.rollups()['choices'], {(self.colour.pk, 'Red'): 1, (self.colour.pk, 'Green'): 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.rollups(), {
+            'events': {self.event.pk: 1},
+            'questions': {self.colour.pk: 1, self.company.pk: 1},
+            'choices': {(self.colour.pk, 'Red'): 1},
+        })
+
+    def test_counts_change_only_when_the_registration_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.register(self.users[0], ['Red'])
+            self.assertFalse(EventStats.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.event.stats.attendee_count, 1)
+
+    def test_rolled_back_registrations_are_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.register(self.users[0], ['Red'])
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            self.register(self.users[1], ['Blue'])
+        self.assertEqual(self.rollups()['events'], {self.event.pk: 1})
+        self.assertEqual(self.rollups()['choices'], {(self.colour.pk, 'Blue'): 1})
+
+    def test_rebuild_reproduces_the_incremental_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user, colours in zip(self.users, [['Red', 'Blue'], ['Blue'], []]):
+                self.register(user, colours)
+            Attendee.objects.filter(user=self.users[1]).delete()
+        incremental = self.rollups()
+        EventStats.objects.update(attendee_count=0)
+        QuestionChoiceStats.objects.all().delete()
+        rebuild_stats()
+        self.assertEqual(self.rollups(), incremental)
+
+
+def png(width, height):
+    from PIL import Image
+
+    buffer = ContentFile(b'', name='photo.png')
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, 'PNG')
+    return buffer
+
+
+@override_settings(IMAGE_DERIVATIVE_SIZES={'avatar': 96, 'card': 480, 'large': 1600})
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_event(self, image):
+        event = Event(name='Summit', start_datetime=timezone.now())
+        event.featured_image.save('photo.png', image)
+        return event
+
+    def stored(self, name):
+        return {derivative: default_storage.exists(derivative) for derivative in derivative_names(name)}
+
+    def test_uploads_get_derivatives_and_a_srcset_of_their_real_widths(self):
+        event = self.create_event(png(600, 300))
+        self.assertTrue(all(self.stored(event.featured_image.name).values()))
+        self.assertEqual((event.featured_image_width, event.featured_image_height), (600, 300))
+        widths = [entry.rsplit(' ', 1)[1] for entry in event.featured_image_srcset('webp').split(', ')]
+        # The 1600px size comes out at the original's 600px.
+        self.assertEqual(widths, ['96w', '480w', '600w'])
+
+    def test_tall_images_are_listed_at_their_narrower_width(self):
+        from PIL import Image
+
+        event = self.create_event(png(1000, 8000))
+        event.refresh_from_db()
+        entries = [entry.rsplit(' ', 1) for entry in event.featured_image_srcset().split(', ')]
+        # Derivatives are at most four times as tall as they are wide.
+        self.assertEqual([width for _, width in entries], ['48w', '240w', '800w'])
+        with default_storage.open(entries[-1][0][len(settings.MEDIA_URL):]) as f:
+            self.assertEqual(Image.open(f).width, 800)
+
+    def test_replaced_images_lose_their_derivatives(self):
+        event = self.create_event(png(600, 300))
+        old_name = event.featured_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            event.featured_image.save('other.png', png(300, 300))
+        self.assertFalse(any(self.stored(old_name).values()))
+        self.assertTrue(all(self.stored(event.featured_image.name).values()))
+
+        # Saving without a new image leaves the derivatives alone.
+        with self.captureOnCommitCallbacks(execute=True):
+            event.name = 'Renamed'
+            event.save()
+        self.assertTrue(all(self.stored(event.featured_image.name).values()))
+
+    def test_deleted_events_lose_their_derivatives(self):
+        event = self.create_event(png(600, 300))
+        name = event.featured_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            event.delete()
+        self.assertFalse(any(self.stored(name).values()))
+
+    def test_images_sharing_a_stem_keep_their_own_derivatives(self):
+        from PIL import Image
+
+        wide = Event(name='Wide', start_datetime=timezone.now())
+        wide.featured_image.save('talk.png', png(600, 300))
+        square = Event(name='Square', start_datetime=timezone.now())
+        square.featured_image.save('talk.jpg', png(300, 300))
+        self.assertEqual(posixpath.dirname(wide.featured_image.name), posixpath.dirname(square.featured_image.name))
+        self.assertTrue(set(self.stored(wide.featured_image.name)).isdisjoint(self.stored(square.featured_image.name)))
+        for event, size in ((wide, (480, 240)), (square, (300, 300))):
+            with default_storage.open(derivative_name(event.featured_image.name, 'card')) as f:
+                self.assertEqual(Image.open(f).size, size)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            wide.delete()
+        self.assertFalse(any(self.stored(wide.featured_image.name).values()))
+        self.assertTrue(all(self.stored(square.featured_image.name).values()))
+
+    def test_recording_the_size_marks_the_event_changed(self):
+        event = self.create_event(png(600, 300))
+        Event.objects.filter(pk=event.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        event.refresh_from_db()
+        updated_at, version = event.updated_at, get_event_version(event.pk)
+
+        save_original_size(event.featured_image, (300, 150))
+        event.refresh_from_db()
+        self.assertEqual((event.featured_image_width, event.featured_image_height), (300, 150))
+        self.assertGreater(event.updated_at, updated_at)
+        self.assertNotEqual(get_event_version(event.pk), version)
+
+
+class RangeParsingTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+        self.assertEqual(parse_range('bytes=990-5000', 1000), (990, 999))
+
+    def test_whole_file_for_missing_or_unsupported_ranges(self):
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-1'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=5-2', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, 1000)
+
+
+@override_settings(RESOURCE_X_ACCEL_PREFIX='', RESOURCE_X_SENDFILE=False)
+class ResourceDownloadTests(TestCase):
+    CONTENT = b'0123456789abcdefghij'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        cls.speaker = Speaker.objects.create(name='Ada', bio='')
+        cls.attendee = User.objects.create_user('attendee', 'attendee@example.com', 'pw')
+        Attendee.objects.create(user=cls.attendee, event=cls.event)
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pw')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.resource = EventResource(event=self.event, speaker=self.speaker, title='Slides', is_visible=True)
+        self.resource.file.save('slides.txt', ContentFile(self.CONTENT))
+        self.url = reverse('download_resource', args=[self.event.pk, self.resource.pk])
+        self.client.force_login(self.attendee)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+
+    def test_byte_ranges(self):
+        for header, content_range, body in [
+            ('bytes=2-5', 'bytes 2-5/20', b'2345'),
+            ('bytes=15-', 'bytes 15-19/20', b'fghij'),
+            ('bytes=-3', 'bytes 17-19/20', b'hij'),
+        ]:
+            response, received = self.get(range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response['Content-Range'], content_range)
+            self.assertEqual(response['Content-Length'], str(len(body)))
+            self.assertEqual(received, body)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=20-', 'bytes=25-30', 'bytes=-0'):
+            response, body = self.get(range=header)
+            self.assertEqual((response.status_code, body), (416, b''), header)
+            self.assertEqual(response['Content-Range'], 'bytes */20')
+
+    def test_head_ignores_ranges(self):
+        for headers in ({}, {'range': 'bytes=2-5'}, {'range': 'bytes=20-'}):
+            response = self.client.head(self.url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Length'], '20')
+            self.assertEqual(response['Accept-Ranges'], 'bytes')
+            self.assertEqual(response.content, b'')
+
+    def test_missing_file_is_not_found(self):
+        self.resource.file.storage.delete(self.resource.file.name)
+        self.assertEqual(self.get()[0].status_code, 404)
+        self.assertEqual(self.get(range='bytes=0-1')[0].status_code, 404)
+        self.assertEqual(self.client.head(self.url).status_code, 404)
+
+    def test_conditional_requests(self):
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get(if_none_match=etag)[0].status_code, 304)
+        # If-Range: the range only applies while the file is unchanged.
+        self.assertEqual(self.get(range='bytes=0-1', if_range=etag)[0].status_code, 206)
+        response, body = self.get(range='bytes=0-1', if_range='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+
+    def test_only_attendees_and_staff_can_download(self):
+        self.client.logout()
+        self.assertEqual(self.get()[0].status_code, 302)
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.get()[0].status_code, 403)
+
+        EventResource.objects.filter(pk=self.resource.pk).update(is_visible=False)
+        self.client.force_login(self.attendee)
+        self.assertEqual(self.get()[0].status_code, 404)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.get()[0].status_code, 200)
+
+        other_event = Event.objects.create(name='Other', start_datetime=timezone.now())
+        response = self.client.get(reverse('download_resource', args=[other_event.pk, self.resource.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(RESOURCE_X_ACCEL_PREFIX='/protected/')
+    def test_offloaded_names_are_quoted(self):
+        # Storage cleans up uploaded names, but older files may have any name.
+        EventResource.objects.filter(pk=self.resource.pk).update(file='event_resources/notes #1 ?été.txt')
+        response, body = self.get()
+        self.assertEqual(body, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/event_resources/notes%20%231%20%3F%C3%A9t%C3%A9.txt')
+
+
+class ChunkedUploadTests(TestCase):
+    DATA = b'0123456789'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        cls.speaker = Speaker.objects.create(name='Ada', bio='')
+
+    def setUp(self):
+        self.media_root, self.temp_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        for directory in (self.media_root, self.temp_dir):
+            self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, RESOURCE_UPLOAD_TEMP_DIR=self.temp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.upload = ResourceUpload.objects.create(
+            filename='talk.mp4', total_size=len(self.DATA), chunk_size=4,
+            event=self.event, speaker=self.speaker, title='Talk',
+        )
+
+    def send(self, index, data=None, length=None, sha256=None):
+        data = self.DATA[index * 4:index * 4 + 4] if data is None else data
+        return write_chunk(self.upload.pk, index, BytesIO(data), len(data) if length is None else length, sha256)
+
+    def assertRefused(self, status, *args, **kwargs):
+        with self.assertRaises(UploadError) as refused:
+            self.send(*args, **kwargs)
+        self.assertEqual(refused.exception.status, status)
+
+    def test_chunks_are_taken_in_order_and_assembled(self):
+        self.assertRefused(409, 1)
+        self.assertEqual(self.send(0).received, 4)
+        self.assertEqual(self.send(1).received, 8)
+        # Resending an earlier chunk is allowed and does not move `received`.
+        self.assertEqual(self.send(0).received, 8)
+        self.assertRefused(400, 3)
+        self.send(2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upload = complete_upload(self.upload.pk)
+        self.assertEqual(upload.status, ResourceUpload.Status.COMPLETE)
+        with upload.resource.file.open('rb') as f:
+            self.assertEqual(f.read(), self.DATA)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+        self.assertRefused(409, 0)
+
+    def test_bad_chunks_are_refused_and_an_upload_resumes_after_them(self):
+        self.send(0)
+        self.assertRefused(400, 1, data=b'45')
+        self.assertRefused(400, 1, data=b'45', length=4)
+        self.assertRefused(400, 1, sha256='0' * 64)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.received, 4)
+        # Refused chunks leave nothing behind but the partial file.
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(temp_path(self.upload))])
+
+        self.assertEqual(self.send(1).received, 8)
+
+    def test_corrupt_chunks_rewind_the_upload(self):
+        for index in range(3):
+            self.send(index)
+        with open(temp_path(self.upload), 'r+b') as f:
+            f.seek(5)
+            f.write(b'X')
+        with self.assertRaises(UploadError):
+            complete_upload(self.upload.pk)
+        self.upload.refresh_from_db()
+        self.assertEqual((self.upload.received, len(self.upload.chunk_hashes)), (4, 1))
+
+    def test_a_completion_that_rolls_back_can_be_retried(self):
+        for index in range(3):
+            self.send(index)
+        with mock.patch.object(EventResource.objects, 'create', side_effect=IntegrityError):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError):
+                complete_upload(self.upload.pk)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.status, ResourceUpload.Status.UPLOADING)
+        self.assertTrue(os.path.exists(temp_path(self.upload)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upload = complete_upload(self.upload.pk)
+        with upload.resource.file.open('rb') as f:
+            self.assertEqual(f.read(), self.DATA)
+
+
+class CacheInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event, cls.other = [
+            Event.objects.create(name=name, start_datetime=now + timedelta(days=1), end_datetime=now + timedelta(days=2))
+            for name in ('Event', 'Other')
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def versions(self, scope='page'):
+        return get_event_version(self.event.pk, scope), get_event_version(self.other.pk, scope)
+
+    def test_question_changes_invalidate_only_their_events_schema(self):
+        question = EventQuestion.objects.create(event=self.event, label='Company', field_type='text')
+        self.assertEqual([field['label'] for field in get_question_schema(self.event)], ['Company'])
+        schema, other_schema = self.versions('questions')
+
+        question.label = 'Employer'
+        question.save()
+        self.assertNotEqual(get_event_version(self.event.pk, 'questions'), schema)
+        self.assertEqual(get_event_version(self.other.pk, 'questions'), other_schema)
+        self.assertEqual([field['label'] for field in get_question_schema(self.event)], ['Employer'])
+
+        question.delete()
+        self.assertEqual(get_question_schema(self.event), [])
+
+    def test_question_changes_leave_the_event_page_cached(self):
+        page = self.versions()
+        EventQuestion.objects.create(event=self.event, label='Company', field_type='text')
+        self.assertEqual(self.versions(), page)
+
+    def test_file_cache_falls_back_to_a_per_process_lock(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}
+        with override_settings(CACHES=file_cache):
+            release = _acquire('core:key:lock', 30)
+            self.assertIsNotNone(release)
+            # Nothing is written to the cache: add() could not be trusted there.
+            self.assertFalse(cache.has_key('core:key:lock'))
+            self.assertIsNone(_acquire('core:key:lock', 30))
+            # A waiter that gives up computes the value itself.
+            self.assertEqual(cached('core:key', lambda: 'value', 60, wait=0), 'value')
+            release()
+            self.assertIsNotNone(_acquire('core:key:lock', 30))
+
+
+class AttendeeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.event = Event.objects.create(name='Summit', start_datetime=timezone.now())
+        cls.jane = User.objects.create_user('jane', 'Jane@Example.com', 'pw')
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        patcher = mock.patch.object(ImportJob._meta.get_field('file'), 'storage', FileSystemStorage(location=location))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def csv_file(self, *rows):
+        return BytesIO('\r\n'.join(['email,first_name,last_name,password', *rows]).encode())
+
+    def test_import_registers_new_and_existing_people(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_attendees(self.csv_file(
+                'jane@example.com,Jane,Doe,',
+                'bob@example.com,Bob,Smith,',
+                'not-an-email,Bad,Row,',
+                'BOB@example.com,Bob,Again,',
+                'ann@example.com,Ann,Lee,secret-password',
+            ), self.event, chunk_size=2, processes=1)
+
+        self.assertEqual((result.registered, result.created_users, result.existing_users), (3, 2, 1))
+        self.assertEqual([line for line, _ in result.errors], [4, 5])
+        self.assertIn('more than once', result.errors[1][1])
+        self.assertEqual(
+            set(self.event.attendees.values_list('user__username', flat=True)), {'jane', 'bob', 'ann'},
+        )
+        self.assertEqual(EventStats.objects.get(event=self.event).attendee_count, 3)
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertTrue(User.objects.get(username='ann').check_password('secret-password'))
+
+    def test_people_already_registered_are_skipped(self):
+        Attendee.objects.create(user=self.jane, event=self.event)
+        result = import_attendees(self.csv_file('JANE@example.com,Jane,Doe,', 'bob@example.com,Bob,,'), self.event)
+        self.assertEqual((result.registered, result.existing_users), (1, 0))
+        self.assertEqual(result.errors, [(2, f'jane@example.com is already registered for {self.event.name}.')])
+        self.assertEqual(self.event.attendees.count(), 2)
+
+    def test_new_accounts_get_usernames_after_existing_ones(self):
+        import_attendees(self.csv_file('a@example.com,Jane,,', 'b@example.com,Jane,,'), self.event)
+        self.assertEqual(
+            sorted(User.objects.filter(email__endswith='@example.com', username__startswith='jane')
+                   .values_list('username', flat=True)),
+            ['jane', 'jane1', 'jane2'],
+        )
+
+    def test_admin_queues_the_import_for_the_worker(self):
+        self.client.force_login(self.admin_user)
+        upload = SimpleUploadedFile('people.csv', self.csv_file('bob@example.com,Bob,,', 'bad,Bad,,').getvalue())
+        response = self.client.post(reverse('admin:core_attendee_bulk_import'), {'event': self.event.pk, 'file': upload})
+
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, reverse('admin:core_importjob_change', args=[job.pk]))
+        self.assertEqual((job.status, job.filename), (ImportJob.Status.PENDING, 'people.csv'))
+        self.assertFalse(self.event.attendees.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('run_import_jobs', '--once', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.row_errors, [[3, "'bad' is not a valid email address."]])
+        self.assertFalse(job.file)
+        self.assertEqual(list(self.event.attendees.values_list('user__email', flat=True)), ['bob@example.com'])
+
+        response = self.client.get(reverse('admin:core_importjob_change', args=[job.pk]))
+        self.assertContains(response, 'Line 3:')
+
+    def test_admin_refuses_a_file_without_an_email_column(self):
+        self.client.force_login(self.admin_user)
+        upload = SimpleUploadedFile('people.csv', b'name\r\nBob\r\n')
+        response = self.client.post(reverse('admin:core_attendee_bulk_import'), {'event': self.event.pk, 'file': upload})
+        self.assertContains(response, "needs an &#x27;email&#x27; column")
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_abandoned_imports_are_claimed_again(self):
+        job = queue_import(self.event, SimpleUploadedFile('people.csv', b'email\r\n'))
+        self.assertEqual(claim_import_job(), job)
+        self.assertIsNone(claim_import_job())
+
+        ImportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=3601))
+        self.assertEqual(claim_import_job(), job)
+        ImportJob.objects.filter(pk=job.pk).update(attempts=3, started_at=timezone.now() - timedelta(seconds=3601))
+        self.assertIsNone(claim_import_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertFalse(job.file)
+
+
+class AsyncViewTests(TestCase):
+    """
+    The async variants of the read views, which are only routed under ASGI
+    (settings.ASYNC_VIEWS), so they are called directly here.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'jane@example.com', 'pw')
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            name='Summit', start_datetime=now + timedelta(days=1), end_datetime=now + timedelta(days=2),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, path, user=None, **headers):
+        request = AsyncRequestFactory().get(path, headers=headers)
+        request.user = user or AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        return request
+
+    def test_sync_views_are_routed_by_default(self):
+        self.assertFalse(settings.ASYNC_VIEWS)
+        self.assertIs(resolve(reverse('efs_dashboard')).func, views.efs_dashboard)
+        self.assertIs(resolve(reverse('event_detail', args=[self.event.pk])).func, views.event_detail)
+        self.assertFalse(iscoroutinefunction(resolve(reverse('api-event-list')).func))
+
+    async def test_dashboard_needs_a_login(self):
+        response = await views.aefs_dashboard(self.request(reverse('efs_dashboard')))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(settings.LOGIN_URL, response['Location'])
+
+    async def test_dashboard_shows_the_users_registrations(self):
+        await Attendee.objects.acreate(user=self.user, event=self.event)
+        response = await views.aefs_dashboard(self.request(reverse('efs_dashboard'), self.user))
+        self.assertContains(response, 'Summit')
+        self.assertContains(response, "You're registered", count=1)
+
+    async def test_event_detail_shows_the_registration_state(self):
+        url = reverse('event_detail', args=[self.event.pk])
+        self.assertContains(await views.aevent_detail(self.request(url), self.event.pk), 'Register Now')
+
+        await Attendee.objects.acreate(user=self.user, event=self.event)
+        response = await views.aevent_detail(self.request(url, self.user), self.event.pk)
+        self.assertContains(response, 'You are registered')
+
+    async def test_event_detail_of_a_missing_event_is_404(self):
+        with self.assertRaises(Http404):
+            await views.aevent_detail(self.request('/'), self.event.pk + 100)
+
+    async def test_events_api_answers_unchanged_polls_without_drf(self):
+        url = reverse('api-event-list')
+        response = await api_views.aevent_list(self.request(url))
+        self.assertEqual(response.status_code, 200)
+
+        # Answered from the marker query alone, without DRF.
+        with mock.patch('core.api_views._event_list_view') as view:
+            not_modified = await api_views.aevent_list(self.request(url, if_none_match=response['ETag']))
+        self.assertEqual(not_modified.status_code, 304)
+        view.assert_not_called()
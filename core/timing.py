@@ -0,0 +1,187 @@
+# core/timing.py
+#
+# Per-request instrumentation, switched on with REQUEST_TIMING_ENABLED (it
+# does not depend on DEBUG). For each request RequestTimingMiddleware records
+#   - the number of SQL queries and the time spent in them,
+#   - the time spent rendering templates (including any queries a template
+#     triggers, so it overlaps with the database time),
+#   - the total time through the middleware stack,
+# sends them back in a Server-Timing header (shown in the browser's network
+# panel) and logs requests over REQUEST_TIMING_SLOW_MS or
+# REQUEST_TIMING_SLOW_QUERIES together with their slowest SQL.
+#
+# The measurements live in a context variable, so they follow a request into
+# the threads that async views hand their ORM and rendering work to.
+
+import heapq
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('core_request_timer', default=None)
+
+
+class RequestTimer:
+    def __init__(self, slow_sql_count):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.slowest = []  # min-heap of (ms, sql), at most slow_sql_count long
+        self.slow_sql_count = slow_sql_count
+        self._template_depth = 0
+
+    def add_query(self, sql, ms):
+        self.queries += 1
+        self.db_ms += ms
+        if self.slow_sql_count:
+            entry = (ms, sql)
+            if len(self.slowest) < self.slow_sql_count:
+                heapq.heappush(self.slowest, entry)
+            elif ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template_ms:.1f}, total;dur={self.total_ms:.1f}'
+        )
+
+    def is_slow(self):
+        return (
+            self.total_ms > settings.REQUEST_TIMING_SLOW_MS
+            or self.queries > settings.REQUEST_TIMING_SLOW_QUERIES
+        )
+
+
+# ==============================================================================
+# DATABASE
+# ==============================================================================
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper: times every query run while a request is being timed."""
+    timer = _current.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.add_query(sql, (time.perf_counter() - start) * 1000)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# ==============================================================================
+# TEMPLATES
+# ==============================================================================
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        timer = _current.get()
+        if timer is None:
+            return super().render(context, request)
+        # Only the outermost render counts; templates rendered from inside
+        # another (render_to_string in a tag, say) are part of its time.
+        timer._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timer._template_depth -= 1
+            if not timer._template_depth:
+                timer.template_ms += (time.perf_counter() - start) * 1000
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, with render times recorded for RequestTimingMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ==============================================================================
+# MIDDLEWARE
+# ==============================================================================
+
+class RequestTimingMiddleware:
+    """
+    Put first in MIDDLEWARE so the total covers the whole stack. Removes
+    itself when REQUEST_TIMING_ENABLED is off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened later get the wrapper from the signal.
+        connection_created.connect(install_query_recorder)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = RequestTimer(settings.REQUEST_TIMING_LOG_SQL)
+        token = _current.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        user = getattr(request, 'user', None) if settings.REQUEST_TIMING_HEADER == 'staff' else None
+        return self.finish(request, response, timer, user)
+
+    async def __acall__(self, request):
+        timer = RequestTimer(settings.REQUEST_TIMING_LOG_SQL)
+        token = _current.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        user = None
+        if settings.REQUEST_TIMING_HEADER == 'staff' and hasattr(request, 'auser'):
+            user = await request.auser()
+        return self.finish(request, response, timer, user)
+
+    def finish(self, request, response, timer, user):
+        """`user` is the request's user when REQUEST_TIMING_HEADER is 'staff'."""
+        timer.finish()
+        mode = settings.REQUEST_TIMING_HEADER
+        if mode == 'all' or (mode == 'staff' and user is not None and user.is_staff):
+            response['Server-Timing'] = timer.server_timing()
+        if timer.is_slow():
+            self.log_slow(request, response, timer)
+        return response
+
+    def log_slow(self, request, response, timer):
+        lines = [
+            f"Slow request: {request.method} {request.path} -> {response.status_code} "
+            f"in {timer.total_ms:.0f} ms ({timer.queries} queries, {timer.db_ms:.0f} ms in SQL, "
+            f"{timer.template_ms:.0f} ms rendering templates)"
+        ]
+        for ms, sql in sorted(timer.slowest, reverse=True):
+            lines.append(f"  {ms:8.1f} ms  {sql[:settings.REQUEST_TIMING_SQL_MAX_LENGTH]}")
+        logger.warning('\n'.join(lines))
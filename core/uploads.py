@@ -0,0 +1,211 @@
+# core/uploads.py
+#
+# Chunked, resumable uploads of large EventResource files. A client creates a
+# ResourceUpload, PUTs the file in fixed-size chunks (in order, resending any
+# chunk it is unsure about) and then completes it. Chunks are streamed
+# straight into a temporary file, so no request holds more than a small
+# buffer in memory, and an interrupted upload resumes from `received`.
+# Completing re-reads the file against the recorded chunk hashes (and the
+# whole-file SHA-256 when the client sent one) before moving it into storage.
+#
+# A chunk is received into a file of its own, and the upload's row is only
+# locked to copy it into place, so a slow client holds no lock or transaction
+# while it sends. The temporary file is only deleted after a completion
+# commits, so a completion that rolls back can be retried.
+
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventResource, ResourceUpload
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or completion request that cannot be accepted. `status` is the HTTP status to answer with."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def temp_path(upload):
+    return os.path.join(settings.RESOURCE_UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+
+def _check_chunk(upload, index, length):
+    if upload.status != ResourceUpload.Status.UPLOADING:
+        raise UploadError("This upload has already been completed.", status=409)
+    offset = index * upload.chunk_size
+    if index < 0 or offset >= upload.total_size:
+        raise UploadError(f"Chunk {index} is out of range.")
+    if offset > upload.received:
+        raise UploadError(f"Expected chunk {upload.received // upload.chunk_size} next.", status=409)
+    expected_length = min(upload.chunk_size, upload.total_size - offset)
+    if length != expected_length:
+        raise UploadError(f"Chunk {index} must be {expected_length} bytes, got {length}.")
+    return offset
+
+
+def write_chunk(upload_id, index, stream, length, sha256=None):
+    """
+    Writes chunk number `index` of an upload from `stream`. Chunks must arrive
+    in order; earlier chunks may be sent again and overwrite what was there.
+    Returns the updated upload.
+
+    The chunk is received into a file of its own first. Only then is the
+    upload's row locked, to copy the chunk into place and record it.
+    """
+    upload = ResourceUpload.objects.get(pk=upload_id)
+    offset = _check_chunk(upload, index, length)
+
+    os.makedirs(settings.RESOURCE_UPLOAD_TEMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+    with tempfile.NamedTemporaryFile(dir=settings.RESOURCE_UPLOAD_TEMP_DIR, prefix=f'{upload.pk}.', suffix='.chunk') as chunk:
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            chunk.write(data)
+            digest.update(data)
+            written += len(data)
+
+        if written != length:
+            raise UploadError(f"Chunk {index} was cut short after {written} bytes.")
+        if sha256 and sha256.lower() != digest.hexdigest():
+            raise UploadError(f"Chunk {index} does not match its checksum.")
+
+        with transaction.atomic():
+            upload = ResourceUpload.objects.select_for_update().get(pk=upload_id)
+            # Check again: the upload may have been completed or rewound meanwhile.
+            _check_chunk(upload, index, length)
+            chunk.seek(0)
+            fd = os.open(temp_path(upload), os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'r+b') as f:
+                f.seek(offset)
+                shutil.copyfileobj(chunk, f, READ_SIZE)
+
+            hashes = upload.chunk_hashes[:index] + [digest.hexdigest()] + upload.chunk_hashes[index + 1:]
+            upload.chunk_hashes = hashes
+            upload.received = max(upload.received, offset + length)
+            upload.save(update_fields=['chunk_hashes', 'received', 'updated_at'])
+    return upload
+
+
+def _verify(upload):
+    """
+    Re-reads the temporary file chunk by chunk. Returns the index of the first
+    chunk that does not match its recorded hash, or None, and the file's SHA-256.
+    """
+    whole = hashlib.sha256()
+    with open(temp_path(upload), 'rb') as f:
+        for index, expected in enumerate(upload.chunk_hashes):
+            chunk = hashlib.sha256()
+            remaining = min(upload.chunk_size, upload.total_size - index * upload.chunk_size)
+            while remaining > 0:
+                data = f.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                chunk.update(data)
+                whole.update(data)
+                remaining -= len(data)
+            if remaining or chunk.hexdigest() != expected:
+                return index, None
+    return None, whole.hexdigest()
+
+
+def _store(upload):
+    """
+    Puts the assembled file into media storage and returns its stored name.
+    The temporary file is kept: it is hard-linked into place when storage is
+    on the same disk, and copied otherwise. Chunks are only written to it
+    under the upload's lock, which refuses them once the upload is complete,
+    so the linked file never changes afterwards.
+    """
+    name = default_storage.get_available_name(
+        EventResource._meta.get_field('file').generate_filename(None, upload.filename)
+    )
+    try:
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.link(temp_path(upload), path)
+    except (NotImplementedError, OSError):
+        # Remote storage, another disk, or the name was taken meanwhile.
+        with open(temp_path(upload), 'rb') as f:
+            return default_storage.save(name, File(f, name=upload.filename))
+    if default_storage.file_permissions_mode is not None:
+        os.chmod(path, default_storage.file_permissions_mode)
+    return name
+
+
+def _remove_temp_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def complete_upload(upload_id):
+    """
+    Verifies a fully received upload, moves it into media storage and, when
+    the upload names its event, speaker and title, creates the EventResource.
+    A chunk that fails verification rewinds the upload to that chunk.
+    """
+    with transaction.atomic():
+        upload = ResourceUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status == ResourceUpload.Status.COMPLETE:
+            return upload
+        if upload.received < upload.total_size:
+            raise UploadError(f"Only {upload.received} of {upload.total_size} bytes have been received.", status=409)
+
+        bad_chunk, sha256 = _verify(upload)
+        if bad_chunk is not None:
+            upload.received = bad_chunk * upload.chunk_size
+            upload.chunk_hashes = upload.chunk_hashes[:bad_chunk]
+            upload.save(update_fields=['received', 'chunk_hashes', 'updated_at'])
+        elif upload.sha256 and upload.sha256.lower() != sha256:
+            raise UploadError("The assembled file does not match its checksum.")
+        else:
+            upload.stored_name = _store(upload)
+            upload.sha256 = sha256
+            upload.status = ResourceUpload.Status.COMPLETE
+            if upload.event_id and upload.speaker_id and upload.title:
+                upload.resource = EventResource.objects.create(
+                    event_id=upload.event_id,
+                    speaker_id=upload.speaker_id,
+                    title=upload.title,
+                    file=upload.stored_name,
+                    is_visible=upload.is_visible,
+                    uploaded_by_id=upload.uploaded_by_id,
+                )
+            upload.save()
+            # If anything rolls back, the upload is still UPLOADING and needs its file.
+            path = temp_path(upload)
+            transaction.on_commit(lambda: _remove_temp_file(path))
+            return upload
+
+    # Raised after the transaction commits, so the rewind is kept.
+    raise UploadError(f"Chunk {bad_chunk} is corrupt; resend from there.", status=409)
+
+
+def discard_upload(upload):
+    _remove_temp_file(temp_path(upload))
+    upload.delete()
+
+
+def purge_stale_uploads(now=None):
+    """Deletes unfinished uploads untouched for RESOURCE_UPLOAD_EXPIRY_HOURS. Returns how many."""
+    cutoff = (now or timezone.now()) - timedelta(hours=settings.RESOURCE_UPLOAD_EXPIRY_HOURS)
+    stale = ResourceUpload.objects.filter(status=ResourceUpload.Status.UPLOADING, updated_at__lt=cutoff)
+    count = 0
+    for upload in stale:
+        discard_upload(upload)
+        count += 1
+    return count
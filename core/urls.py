@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The async variants only pay off under ASGI (see settings.ASYNC_VIEWS).
+efs_dashboard = views.aefs_dashboard if settings.ASYNC_VIEWS else views.efs_dashboard
+event_detail = views.aevent_detail if settings.ASYNC_VIEWS else views.event_detail
+
 urlpatterns = [
     path('login/', views.efs_login, name='efs_login'),
     path('signup/email_verification/', views.efs_verification_email_sent, name='efs_verification_email_sent'),
@@ -20,7 +25,8 @@ urlpatterns = [
     #For answering questions
     path('event_question/<int:event_id>/', views.answer_event_questions, name='answer_event_questions'),
     # For the Custom Dashboard
-    path('dashboard/', views.efs_dashboard, name='efs_dashboard'),
+    path('dashboard/', efs_dashboard, name='efs_dashboard'),
     # For Event details
-    path('event/<int:event_id>/', views.event_detail, name='event_detail'),
+    path('event/<int:event_id>/', event_detail, name='event_detail'),
+    path('event/<int:event_id>/resources/<int:resource_id>/', views.download_resource, name='download_resource'),
 ]
\ No newline at end of file
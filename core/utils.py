@@ -1,32 +1,179 @@
-import threading
+import re
+from collections import Counter
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils.text import slugify
 
+from .models import UsernameCounter
+
 # To get the user - even if it's a custom model with any name.
 User = get_user_model()
 
-class EmailThread(threading.Thread):
-    def __init__(self, email_message):
-        super().__init__()
-        self.email_message = email_message
-    def run(self):
-        self.email_message.send()
+# Leaves room for a numeric suffix within User.username's 150 characters.
+USERNAME_BASE_MAX_LENGTH = 140
+# How many usernames create_user_with_unique_username tries before giving up.
+USERNAME_MAX_ATTEMPTS = 5
+
+
+def _first_free_suffix(base_username):
+    """
+    Finds the suffix after the highest one already taken for `base_username`
+    with a single prefix scan. Only used the first time a base is seen.
+    """
+    pattern = rf'^{re.escape(base_username)}[0-9]*$'
+    taken = User.objects.filter(username__regex=pattern).values_list('username', flat=True)
+    suffixes = [int(username[len(base_username):] or 0) for username in taken]
+    return max(suffixes) + 1 if suffixes else 0
+
+
+# Bases looked up per query in _first_free_suffixes; SQLite refuses much longer
+# OR chains ("Expression tree is too large").
+USERNAME_SCAN_BATCH_SIZE = 100
+
+
+def _first_free_suffixes(bases):
+    """
+    Bulk version of _first_free_suffix: maps each base to the suffix after
+    the highest one already taken, looking at exact `base` and `base<digits>`
+    names only. startswith narrows each base to an index range first, so a
+    short base like "a" does not make the database test every username.
+    """
+    first_free = dict.fromkeys(bases, 0)
+    for start in range(0, len(bases), USERNAME_SCAN_BATCH_SIZE):
+        names = Q()
+        for base in bases[start:start + USERNAME_SCAN_BATCH_SIZE]:
+            names |= Q(username__startswith=base, username__regex=rf'^{re.escape(base)}[0-9]*$')
+        for username in User.objects.filter(names).values_list('username', flat=True):
+            # "jane12" is suffix 12 of "jane", 2 of "jane1" and 0 of "jane12".
+            root = username.rstrip('0123456789')
+            digits = username[len(root):]
+            for i in range(len(digits) + 1):
+                base = root + digits[:i]
+                if base in first_free:
+                    first_free[base] = max(first_free[base], int(digits[i:] or 0) + 1)
+    return first_free
+
+
+def username_base(first_name):
+    # slugify is great for creating clean usernames from names.
+    # Use 'user' as a fallback if the name is empty or has no usable characters.
+    base_username = (slugify(first_name) if first_name else '') or "user"
+    return base_username[:USERNAME_BASE_MAX_LENGTH]
 
 
 # To create unique username from the first name of a user
 def generate_unique_username(first_name):
-    # Use 'user' as a fallback if first_name is empty
-    if not first_name:
-        base_username = "user"
-    else:
-        # slugify is great for creating clean usernames from names
-        base_username = slugify(first_name)
-
-    username = base_username
-    counter = 1
-    # Loop until we find a username that does not exist
-    while User.objects.filter(username=username).exists():
-        username = f"{base_username}{counter}"
-        counter += 1
-    
-    return username
\ No newline at end of file
+    """
+    Returns the next free username for `first_name` (jane, jane1, jane2 ...).
+
+    The next suffix for each base lives in a UsernameCounter row that is
+    locked while it is advanced, so concurrent signups never get the same
+    name and the cost does not grow with the number of existing "janes".
+    """
+    base_username = username_base(first_name)
+
+    with transaction.atomic():
+        counter = UsernameCounter.objects.select_for_update().filter(base=base_username).first()
+        if counter is None:
+            counter, _ = UsernameCounter.objects.select_for_update().get_or_create(
+                base=base_username,
+                defaults={'next_suffix': _first_free_suffix(base_username)},
+            )
+
+        # The check only loops if a name was taken outside the allocator (e.g. in the admin).
+        while True:
+            suffix = counter.next_suffix
+            counter.next_suffix += 1
+            username = base_username if suffix == 0 else f"{base_username}{suffix}"
+            if not User.objects.filter(username=username).exists():
+                break
+        counter.save(update_fields=['next_suffix'])
+
+    return username
+
+
+def create_user_with_unique_username(first_name, **fields):
+    """
+    Creates a user (with User.objects.create_user) under the next free
+    username for `first_name`.
+
+    Different bases can produce the same name: "jane" at suffix 21 and
+    "jane2" at suffix 1 are both "jane21". Their counters are locked
+    separately, so the check in generate_unique_username cannot see a user
+    another transaction is still creating. The unique constraint on username
+    catches that case, and the insert is retried with the next suffix.
+    """
+    for attempt in range(USERNAME_MAX_ATTEMPTS):
+        username = generate_unique_username(first_name)
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(username=username, **fields)
+        except IntegrityError:
+            # Only a username clash is retried; a duplicate email is the caller's problem.
+            if attempt == USERNAME_MAX_ATTEMPTS - 1 or not User.objects.filter(username=username).exists():
+                raise
+
+
+def generate_unique_usernames(first_names):
+    """
+    Bulk version of generate_unique_username: returns one free username per
+    name in `first_names`, in order. The number of queries depends on how many
+    different bases are new, not on how many names there are. Must be called
+    inside a transaction; the counters stay locked until it ends, and the
+    users should be created before then.
+    """
+    bases = [username_base(first_name) for first_name in first_names]
+    wanted = Counter(bases)
+
+    with transaction.atomic():
+        counters = {
+            counter.base: counter
+            for counter in UsernameCounter.objects.select_for_update().filter(base__in=wanted)
+        }
+        missing = [base for base in wanted if base not in counters]
+        if missing:
+            first_free = _first_free_suffixes(missing)
+            UsernameCounter.objects.bulk_create(
+                [UsernameCounter(base=base, next_suffix=first_free[base]) for base in missing],
+                ignore_conflicts=True,
+            )
+            counters.update({
+                counter.base: counter
+                for counter in UsernameCounter.objects.select_for_update().filter(base__in=missing)
+            })
+
+        # Different bases can produce the same name ("al" at 13, "al1" at 3), so
+        # a name handed to one base in this batch is skipped for the others.
+        handed_out = set()
+
+        def candidates(base, count):
+            counter = counters[base]
+            names = []
+            while len(names) < count:
+                suffix = counter.next_suffix
+                counter.next_suffix += 1
+                name = base if suffix == 0 else f"{base}{suffix}"
+                if name not in handed_out:
+                    handed_out.add(name)
+                    names.append(name)
+            return names
+
+        allocated = {base: candidates(base, count) for base, count in wanted.items()}
+        # Names taken outside the allocator (e.g. in the admin) are skipped,
+        # checked with one query per round rather than one per name.
+        while True:
+            everything = [name for names in allocated.values() for name in names]
+            clashes = set(User.objects.filter(username__in=everything).values_list('username', flat=True))
+            if not clashes:
+                break
+            for base, names in allocated.items():
+                kept = [name for name in names if name not in clashes]
+                allocated[base] = kept + candidates(base, len(names) - len(kept))
+
+        UsernameCounter.objects.bulk_update(counters.values(), ['next_suffix'])
+
+    iterators = {base: iter(names) for base, names in allocated.items()}
+    return [next(iterators[base]) for base in bases]
+
@@ -1,5 +1,8 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.http import Http404, HttpResponse
+from django.core.exceptions import PermissionDenied
+from django.views.decorators.http import require_safe
 from django.contrib.auth.models import User
 from django.views.generic import View
 from django.contrib.auth import authenticate, login, logout, get_user_model
@@ -12,8 +15,12 @@ from .tokens import account_activation_token
 from django.template.loader import render_to_string
 from django.core.mail import EmailMessage
 from django.urls import NoReverseMatch, reverse
-from .utils import EmailThread
-from .utils import generate_unique_username
+from .mail_queue import enqueue_email
+from .backends import users_with_email
+from .cache import aget_event_version, get_event_version
+from .downloads import serve_file
+from .utils import create_user_with_unique_username
+from .services import abuild_dashboard, build_dashboard, register_attendee
 # reset password generators
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.db import transaction
@@ -27,7 +34,7 @@ from .models import Event, UserProfile, Attendee
 
 # Import the new combined form and your models
 from .forms import CombinedSignupForm, DynamicQuestionsForm 
-from .models import Event, UserProfile, Attendee, EventQuestion, AttendeeAnswer
+from .models import Event, UserProfile, Attendee, EventQuestion, AttendeeAnswer, EventResource
 
 
 #______________________________________________________________________________
@@ -62,9 +69,8 @@ def efs_signup(request, event_id):
             try:
                 with transaction.atomic():
                     # --- Process STATIC fields to create the user ---
-                    username = generate_unique_username(cleaned_data['first_name'])
-                    ep_user = User.objects.create_user(
-                        username=username,
+                    ep_user = create_user_with_unique_username(
+                        cleaned_data['first_name'],
                         email=cleaned_data['email'],
                         password=cleaned_data['password']
                     )
@@ -76,21 +82,9 @@ def efs_signup(request, event_id):
                     # Create the associated UserProfile and Attendee
                     # (Assuming other static fields like company are on the form)
                     UserProfile.objects.create(user=ep_user) # Add other fields here if needed
-                    attendee = Attendee.objects.create(user=ep_user, event=event)
-
-                    # --- Process DYNAMIC fields and save answers ---
-                    for key, value in cleaned_data.items():
-                        if key.startswith('custom_question_'):
-                            question_id = int(key.replace('custom_question_', ''))
-                            question = EventQuestion.objects.get(id=question_id)
-                            
-                            answer_value = ", ".join(value) if isinstance(value, list) else str(value)
-
-                            AttendeeAnswer.objects.create(
-                                attendee=attendee,
-                                question=question,
-                                answer=answer_value
-                            )
+
+                    # --- Register the attendee and save DYNAMIC answers in bulk ---
+                    register_attendee(ep_user, event, form)
 
             except Exception as e:
                 messages.error(request, f"An error occurred during registration: {e}")
@@ -107,16 +101,8 @@ def efs_signup(request, event_id):
             email_message = EmailMessage(
                 mail_subject, message, from_email=settings.DEFAULT_FROM_EMAIL, to=[ep_user.email]
             )
-            #EmailThread(email_message).start()
-                        
-            # EmailThread(email_message).start() # <--- COMMENT THIS OUT
-            try:
-                email_message.send() # <--- USE THIS INSTEAD FOR DEBUGGING
-                messages.info(request, "DEBUG: Email send attempt was successful.")
-            except Exception as e:
-                # This will now show you the exact error from the email server!
-                messages.error(request, f"EMAIL FAILED: {e}")
-                return redirect('efs_signup', event_id=event.id) # Stop here if email fails
+            # Queue the email; the send_queued_emails worker delivers (and retries) it.
+            enqueue_email(email_message)
             
             return redirect('efs_verification_email_sent') # Or your success page
 
@@ -154,21 +140,8 @@ def answer_event_questions(request, event_id):
         if form.is_valid():
             try:
                 with transaction.atomic():
-                    # 1. Register the user as an attendee
-                    attendee = Attendee.objects.create(user=user, event=event)
-
-                    # 2. Save all their answers
-                    for key, value in form.cleaned_data.items():
-                        if key.startswith('custom_question_'):
-                            question_id = int(key.replace('custom_question_', ''))
-                            question = EventQuestion.objects.get(id=question_id)
-                            answer_value = ", ".join(value) if isinstance(value, list) else str(value)
-
-                            AttendeeAnswer.objects.create(
-                                attendee=attendee,
-                                question=question,
-                                answer=answer_value
-                            )
+                    # Register the user as an attendee and save all their answers
+                    register_attendee(user, event, form)
                 
                 messages.success(request, f"Thank you! Your answers for '{event.name}' have been saved.")
                 return redirect('efs_dashboard') # Redirect to a success page
@@ -251,7 +224,7 @@ def efs_resend_activation(request, user_id):
     email_message = EmailMessage(
         mail_subject, message, from_email=settings.DEFAULT_FROM_EMAIL, to=[user.email]
     )
-    EmailThread(email_message).start()
+    enqueue_email(email_message)
 
     messages.success(request, f"A new activation email has been sent to {user.email}. Please check your inbox.")
     # Redirect to the same "email sent" confirmation page
@@ -277,15 +250,8 @@ def efs_login(request):
         # --- CHANGE 2: CAPTURE THE 'next' PARAMETER ---
         next_url = request.POST.get('next')
 
-        # Check if a user with that email exists
-        try:
-            user_obj = User.objects.get(email=email)
-        except User.DoesNotExist:
-            messages.error(request, 'Invalid login credentials.')
-            return redirect('efs_login')
-
-        # Use the corresponding username to authenticate
-        user = authenticate(request, username=user_obj.username, password=password)
+        # Authenticate by email in one query (see core.backends.EmailBackend)
+        user = authenticate(request, email=email, password=password)
 
         if user is not None and user.is_active:
             login(request, user)
@@ -329,10 +295,9 @@ class efs_request_reset_email(View):
         # This prevents attackers from figuring out which emails are registered.
         
         if reset_email:
-            user_queryset = User.objects.filter(email=reset_email)
+            user = users_with_email(reset_email).first()
 
-            if user_queryset.exists():
-                user = user_queryset.first() # Get the actual user object
+            if user is not None:
                 current_site = get_current_site(request)
                 email_subject = 'Reset Your Password'
                 
@@ -351,7 +316,7 @@ class efs_request_reset_email(View):
                     from_email=settings.DEFAULT_FROM_EMAIL, 
                     to=[reset_email]
                 )
-                EmailThread(email_message).start()
+                enqueue_email(email_message)
 
         # Redirect to the "sent" page to complete the process
         return redirect('efs_reset_email_sent')
@@ -435,26 +400,11 @@ def efs_logout(request):
 
 @login_required
 def efs_dashboard(request):
-    now = timezone.now()
-
-    # --- 1. Get ONGOING events ---
-    # An event is ongoing if it has started but has not yet ended.
-    ongoing_events = Event.objects.filter(
-        is_active=True,
-        start_datetime__lte=now,  # The event has started (or started now)
-        end_datetime__gte=now     # The event has not yet ended
-    ).order_by('start_datetime')
-
-
-    # --- 2. Get UPCOMING events ---
-    # An event is upcoming if it starts in the future.
-    upcoming_events = Event.objects.filter(
-        is_active=True,
-        start_datetime__gt=now    # The event starts after now
-    ).order_by('start_datetime')
-
+    # Ongoing and upcoming events come from a single query, each annotated
+    # with its attendee count and whether this user is already registered.
+    ongoing_events, upcoming_events = build_dashboard(request.user)
 
-    # --- 3. Pass BOTH lists to the template ---
+    # --- Pass BOTH lists to the template ---
     context = {
         'ongoing_events': ongoing_events,
         'upcoming_events': upcoming_events,
@@ -463,23 +413,84 @@ def efs_dashboard(request):
     return render(request, 'efs_dashboard.html', context)
 
 
+def event_detail_context(event, sessions, resources, is_registered, fragment_version):
+    return {
+        'event': event,
+        'sessions': sessions,
+        'resources': resources,
+        'is_registered': is_registered,
+        # Bumped by core/signals.py whenever anything shown on the page changes.
+        'fragment_version': fragment_version,
+        'fragment_timeout': settings.EVENT_DETAIL_CACHE_TIMEOUT,
+    }
+
+
 def event_detail(request, event_id):
     # Fetch the main event object
-    event = get_object_or_404(Event, pk=event_id)
+    event = get_object_or_404(Event.objects.with_status(), pk=event_id)
 
-    # Fetch related data efficiently
+    # Fetch related data efficiently. These querysets are lazy: they only run
+    # when the cached page fragments in event_detail.html need re-rendering.
     sessions = event.sessions.prefetch_related('speakers').all()
     resources = event.resources.filter(is_visible=True)
-    
+
     # Check if the current user is registered for this event
     is_registered = False
     if request.user.is_authenticated:
         is_registered = Attendee.objects.filter(user=request.user, event=event).exists()
 
+    context = event_detail_context(event, sessions, resources, is_registered, get_event_version(event.pk))
+    return render(request, 'event_detail.html', context)
+
+
+# Async variants of the two views above, routed instead of them when
+# settings.ASYNC_VIEWS is on (the default under efs_portal/asgi.py): their
+# queries then run without holding a thread. Under WSGI each async view
+# would get an event loop of its own per request, so the sync ones stay the
+# default. Templates are rendered with sync_to_async because the event
+# page's cached fragments evaluate their querysets lazily.
+@login_required
+async def aefs_dashboard(request):
+    user = await request.auser()
+    ongoing_events, upcoming_events = await abuild_dashboard(user)
     context = {
-        'event': event,
-        'sessions': sessions,
-        'resources': resources,
-        'is_registered': is_registered,
+        'ongoing_events': ongoing_events,
+        'upcoming_events': upcoming_events,
+        'user': user,
     }
-    return render(request, 'event_detail.html', context)
\ No newline at end of file
+    return await sync_to_async(render)(request, 'efs_dashboard.html', context)
+
+
+async def aevent_detail(request, event_id):
+    event = await aget_object_or_404(Event.objects.with_status(), pk=event_id)
+    sessions = event.sessions.prefetch_related('speakers').all()
+    resources = event.resources.filter(is_visible=True)
+
+    is_registered = False
+    user = await request.auser()
+    if user.is_authenticated:
+        is_registered = await Attendee.objects.filter(user=user, event=event).aexists()
+
+    context = event_detail_context(event, sessions, resources, is_registered, await aget_event_version(event.pk))
+    return await sync_to_async(render)(request, 'event_detail.html', context)
+
+
+@login_required
+@require_safe
+def download_resource(request, event_id, resource_id):
+    """
+    Serves a visible resource to attendees of its event, with byte-range
+    support so video and large files can be resumed and seeked. Staff can
+    download hidden resources too.
+    """
+    resource = get_object_or_404(
+        EventResource.objects.select_related('event'),
+        pk=resource_id, event_id=event_id,
+    )
+    if not request.user.is_staff:
+        if not (resource.is_visible and resource.event.is_active):
+            raise Http404
+        if not Attendee.objects.filter(user=request.user, event_id=event_id).exists():
+            raise PermissionDenied("Only registered attendees can download this event's resources.")
+    return serve_file(request, resource.file)
+
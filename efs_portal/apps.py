@@ -0,0 +1,24 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.utils.module_loading import module_has_submodule
+
+# Apps whose admin module registers nothing and is expensive to import.
+# import_export.admin only defines mixins, but loads tablib and every format
+# library it supports; core.admin loads it on first use (LazyImportMixin).
+SKIP_ADMIN_MODULES = {'import_export'}
+
+
+class AdminConfig(SimpleAdminConfig):
+    """
+    The admin with autodiscovery, like django.contrib.admin, except that the
+    apps in SKIP_ADMIN_MODULES are not imported at startup.
+    """
+
+    def ready(self):
+        super().ready()
+        for app_config in apps.get_app_configs():
+            if app_config.name in SKIP_ADMIN_MODULES or not module_has_submodule(app_config.module, 'admin'):
+                continue
+            import_module(f'{app_config.name}.admin')
@@ -3,6 +3,13 @@ ASGI config for efs_portal project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served by the opt-in `web-asgi` process in the Procfile; `web` runs the WSGI
+app under gunicorn. In local benchmarks (`manage.py benchmark_servers`) ASGI
+was slower for these mostly ORM-bound pages, and it buffers the synchronous
+iterators of StreamingHttpResponse and FileResponse (the CSV exports and
+resource downloads) in memory, so measure before switching. It routes the
+async variants of the dashboard, event page and events API (ASYNC_VIEWS).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +19,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'efs_portal.settings')
+# Route the async variants of the read views (see ASYNC_VIEWS in settings).
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -14,6 +14,10 @@ from pathlib import Path
 from decouple import config
 import dj_database_url
 import os # Add this import
+import sys
+from importlib.util import find_spec
+
+from django.core.exceptions import ImproperlyConfigured
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -37,7 +41,7 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='127.0.0.1,localhost').split(','
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    'efs_portal.apps.AdminConfig',  # django.contrib.admin, with lazier autodiscovery
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -49,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.RequestTimingMiddleware',  # first, so its total covers the whole stack
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -63,7 +68,8 @@ ROOT_URLCONF = 'efs_portal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend, with render times recorded for core.timing.
+        'BACKEND': 'core.timing.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,12 +90,60 @@ WSGI_APPLICATION = 'efs_portal.wsgi.application'
 
 # In settings.py
 
+# --- CONNECTION REUSE ---
+# DB_CONN_MAX_AGE: seconds a connection is kept open and reused across requests
+#   (0 opens a new connection for every request).
+# DB_CONN_HEALTH_CHECKS: check a reused connection still works before the
+#   request uses it, so a database restart doesn't surface as errors.
+# DB_POOL_MODE:
+#   'none'      - persistent connections as above.
+#   'pgbouncer' - connect through PgBouncer in transaction pooling mode. Server-side
+#                 cursors are turned off, since a cursor can't outlive its transaction there.
+#   'django'    - Django's built-in PostgreSQL pool. Sized by DB_POOL_MIN_SIZE/
+#                 DB_POOL_MAX_SIZE per process; DB_CONN_MAX_AGE is ignored as the
+#                 pool owns the connections. Needs psycopg 3 with its pool
+#                 (psycopg, psycopg-binary and psycopg-pool in requirements.txt).
+# The defaults (DB_CONN_MAX_AGE=60, DB_POOL_MODE='none') suit the `web` process in
+# the Procfile, gunicorn under WSGI. The opt-in `web-asgi` process (uvicorn) keeps
+# connections per thread, where they don't outlive a request well: run it with
+# DB_CONN_MAX_AGE=0 and DB_POOL_MODE='django' or 'pgbouncer'.
+# `python manage.py benchmark_db_connections` compares the options; pass it
+# --pgbouncer <url> to include connections through PgBouncer.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL_MODE = config('DB_POOL_MODE', default='none')
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+
 DATABASES = {
     'default': dj_database_url.config(
         # This is the fallback if DATABASE_URL isn't set.
-        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}'
+        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
+        conn_max_age=0 if DB_POOL_MODE == 'django' else DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        disable_server_side_cursors=DB_POOL_MODE == 'pgbouncer',
     )
 }
+if DB_POOL_MODE not in ('none', 'pgbouncer', 'django'):
+    raise ImproperlyConfigured(f"DB_POOL_MODE must be 'none', 'pgbouncer' or 'django', not {DB_POOL_MODE!r}.")
+if DB_POOL_MODE == 'django' and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    if not (find_spec('psycopg') and find_spec('psycopg_pool')):
+        raise ImproperlyConfigured(
+            "DB_POOL_MODE='django' needs psycopg 3 and its pool: pip install -r requirements.txt. "
+            "psycopg2 cannot pool; use DB_POOL_MODE='pgbouncer' or 'none' with it."
+        )
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+    }
+
+
+# Authentication
+# Attendees log in with their email address; the admin login still uses usernames.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 
 
 # Password validation
@@ -129,6 +183,37 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 # Default "from" address for emails sent from the site
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# --- OUTBOUND EMAIL QUEUE ---
+# Views queue emails in the database; `python manage.py send_queued_emails` sends them.
+EMAIL_QUEUE_WORKERS = config('EMAIL_QUEUE_WORKERS', default=2, cast=int)
+EMAIL_QUEUE_BATCH_SIZE = config('EMAIL_QUEUE_BATCH_SIZE', default=50, cast=int)
+EMAIL_QUEUE_MAX_ATTEMPTS = config('EMAIL_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_QUEUE_RETRY_BASE_SECONDS = config('EMAIL_QUEUE_RETRY_BASE_SECONDS', default=60, cast=int)
+EMAIL_QUEUE_RETRY_MAX_SECONDS = config('EMAIL_QUEUE_RETRY_MAX_SECONDS', default=3600, cast=int)
+# A message claimed by a worker for longer than this is assumed abandoned and retried.
+EMAIL_QUEUE_LOCK_TIMEOUT = config('EMAIL_QUEUE_LOCK_TIMEOUT', default=600, cast=int)
+
+# --- BULK ATTENDEE IMPORT ---
+# CSV imports (admin "Bulk import" page, `python manage.py import_attendees`)
+# are written this many rows at a time; passwords are hashed in this many processes.
+ATTENDEE_IMPORT_CHUNK_SIZE = config('ATTENDEE_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+ATTENDEE_IMPORT_PROCESSES = config('ATTENDEE_IMPORT_PROCESSES', default=2, cast=int)
+# Imports queued from the admin are run by `python manage.py run_import_jobs`. A job
+# running for longer than this is assumed abandoned (its worker died) and is picked
+# up again, up to ATTENDEE_IMPORT_JOB_MAX_ATTEMPTS times in all.
+ATTENDEE_IMPORT_JOB_TIMEOUT = config('ATTENDEE_IMPORT_JOB_TIMEOUT', default=3600, cast=int)
+ATTENDEE_IMPORT_JOB_MAX_ATTEMPTS = config('ATTENDEE_IMPORT_JOB_MAX_ATTEMPTS', default=3, cast=int)
+# How many skipped rows (line and problem) an import job keeps to show in the admin.
+ATTENDEE_IMPORT_JOB_ERRORS_KEPT = config('ATTENDEE_IMPORT_JOB_ERRORS_KEPT', default=500, cast=int)
+
+# --- PDF REPORT JOBS ---
+# `python manage.py run_report_jobs` renders queued PDF reports in this many processes.
+REPORT_JOB_PROCESSES = config('REPORT_JOB_PROCESSES', default=2, cast=int)
+# A job running for longer than this is assumed abandoned (its worker died) and is
+# picked up again, up to REPORT_JOB_MAX_ATTEMPTS times in all.
+REPORT_JOB_TIMEOUT = config('REPORT_JOB_TIMEOUT', default=900, cast=int)
+REPORT_JOB_MAX_ATTEMPTS = config('REPORT_JOB_MAX_ATTEMPTS', default=3, cast=int)
+
 
 
 
@@ -170,6 +255,115 @@ MEDIA_URL = '/media/'
 # This is where your uploaded files are stored on the server.
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Files that may only be downloaded through a view that checks permissions,
+# such as the PDF reports of attendees' answers. Never serve this directory
+# directly from the web server.
+PRIVATE_MEDIA_ROOT = config('PRIVATE_MEDIA_ROOT', default=str(BASE_DIR / 'private_media'))
+
+# --- EVENT RESOURCE DOWNLOADS ---
+# Resources are served by core.views.download_resource after the access checks.
+# Set RESOURCE_X_ACCEL_PREFIX to an nginx `internal` location aliased to
+# MEDIA_ROOT (e.g. /protected-media/) to let nginx send the file, or
+# RESOURCE_X_SENDFILE=True behind Apache mod_xsendfile. Otherwise Django
+# streams the file itself, with Range support.
+RESOURCE_X_ACCEL_PREFIX = config('RESOURCE_X_ACCEL_PREFIX', default='')
+RESOURCE_X_SENDFILE = config('RESOURCE_X_SENDFILE', default=False, cast=bool)
+
+# --- CHUNKED RESOURCE UPLOADS ---
+# Large resources are uploaded through /api/v1/resource-uploads/ in chunks of
+# this many bytes. Partial files wait in RESOURCE_UPLOAD_TEMP_DIR (ideally on
+# the same disk as MEDIA_ROOT, so finishing an upload is a rename) and are
+# purged by `python manage.py purge_resource_uploads` once they go stale.
+RESOURCE_UPLOAD_CHUNK_SIZE = config('RESOURCE_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)
+RESOURCE_UPLOAD_MAX_SIZE = config('RESOURCE_UPLOAD_MAX_SIZE', default=4 * 1024 ** 3, cast=int)
+RESOURCE_UPLOAD_TEMP_DIR = config('RESOURCE_UPLOAD_TEMP_DIR', default=str(BASE_DIR / 'upload_tmp'))
+RESOURCE_UPLOAD_EXPIRY_HOURS = config('RESOURCE_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# --- IMAGE DERIVATIVES ---
+# Uploaded event images and speaker pictures are resized to these widths (in
+# pixels) and stored as WebP and JPEG next to the original, under derivatives/.
+IMAGE_DERIVATIVE_SIZES = {
+    'avatar': 96,
+    'card': 480,
+    'medium': 960,
+    'large': 1600,
+}
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=80, cast=int)
+
+# --- CACHING ---
+# CACHE_BACKEND picks where cached data lives:
+#   'file'   - a directory (CACHE_LOCATION, default BASE_DIR/cache) shared by all
+#              processes on one machine. Its add() is not atomic across
+#              processes, so core.cache.cached() only stops a stampede within
+#              each worker; use Redis or Memcached to share that lock.
+#   'redis'  - a Redis-compatible server at CACHE_LOCATION (redis://host:6379/0).
+#              Needs the `redis` package. Use this with more than one machine.
+#   'locmem' - per-process memory. This is the default under `manage.py test`.
+# Every process must see the same cache, or invalidation in one worker will not
+# reach the others.
+TESTING = sys.argv[1:2] == ['test']
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if TESTING else 'file')
+CACHE_BACKENDS = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'efs'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='efs'),
+        'TIMEOUT': config('CACHE_DEFAULT_TIMEOUT', default=300, cast=int),
+    }
+}
+# core.cache.cached(): how long one process may hold the recompute lock of an
+# expired entry, and how long others wait for its result before computing too.
+CACHE_LOCK_TIMEOUT = config('CACHE_LOCK_TIMEOUT', default=30, cast=int)
+CACHE_LOCK_WAIT = config('CACHE_LOCK_WAIT', default=2.0, cast=float)
+
+# How long (in seconds) a compiled registration form schema stays cached.
+# Saving or deleting an EventQuestion clears it immediately.
+QUESTION_SCHEMA_CACHE_TIMEOUT = config('QUESTION_SCHEMA_CACHE_TIMEOUT', default=300, cast=int)
+# How long a rendered page of /api/v1/events/ is kept. Entries are keyed on the
+# events' change fingerprint, so edits never serve stale data; this only bounds memory.
+EVENT_LIST_CACHE_TIMEOUT = config('EVENT_LIST_CACHE_TIMEOUT', default=600, cast=int)
+# How long the rendered, user-independent parts of an event page are kept.
+# They are also invalidated whenever the event, its sessions, speakers or resources change.
+EVENT_DETAIL_CACHE_TIMEOUT = config('EVENT_DETAIL_CACHE_TIMEOUT', default=3600, cast=int)
+
+# --- REQUEST TIMING ---
+# core.timing.RequestTimingMiddleware records query count, SQL time, template
+# render time and total time per request. It works without DEBUG and costs a
+# few timer calls per query, so it can stay on in production.
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=False, cast=bool)
+# Who gets the Server-Timing header: 'staff', 'all' or 'none'. It reveals how
+# much work a page does, so only give it to everyone outside production.
+REQUEST_TIMING_HEADER = config('REQUEST_TIMING_HEADER', default='staff')
+# Requests slower than this, or running more queries, are logged (logger
+# 'core.timing') with their REQUEST_TIMING_LOG_SQL slowest statements.
+REQUEST_TIMING_SLOW_MS = config('REQUEST_TIMING_SLOW_MS', default=500, cast=int)
+REQUEST_TIMING_SLOW_QUERIES = config('REQUEST_TIMING_SLOW_QUERIES', default=50, cast=int)
+REQUEST_TIMING_LOG_SQL = config('REQUEST_TIMING_LOG_SQL', default=5, cast=int)
+REQUEST_TIMING_SQL_MAX_LENGTH = config('REQUEST_TIMING_SQL_MAX_LENGTH', default=1000, cast=int)
+
+# --- ASYNC VIEWS ---
+# The dashboard, the event page and the events API have async variants. They
+# only pay off when the app is served over ASGI: under WSGI each async view
+# runs in an event loop of its own, per request. efs_portal/asgi.py turns them
+# on for the `web-asgi` process; the `web` process (gunicorn) keeps the sync views.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': config('CORE_LOG_LEVEL', default='INFO')},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
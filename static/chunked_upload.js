@@ -0,0 +1,140 @@
+// static/chunked_upload.js
+//
+// Used by EventResourceInline in the admin. When a file bigger than one chunk
+// is picked, it is sent to /api/v1/resource-uploads/ in fixed-size chunks
+// straight away. Failed chunks are retried, and an interrupted upload of the
+// same file resumes where it stopped, even after a page reload. When it is
+// done the file input is cleared and the row's hidden `chunked_upload` field
+// carries the upload id, so the form submission itself stays small.
+(function () {
+  'use strict';
+
+  var MAX_RETRIES = 5;
+  var pending = 0;
+
+  function csrfToken(form) {
+    var input = form.querySelector('[name=csrfmiddlewaretoken]');
+    return input ? input.value : '';
+  }
+
+  function request(method, url, token, body, headers) {
+    var options = {method: method, credentials: 'same-origin', headers: Object.assign({'X-CSRFToken': token}, headers || {})};
+    if (body !== undefined) { options.body = body; }
+    return fetch(url, options).then(function (response) {
+      return response.json().catch(function () { return {}; }).then(function (data) {
+        if (!response.ok) {
+          var error = new Error(data.detail || response.statusText);
+          error.status = response.status;
+          error.data = data;
+          throw error;
+        }
+        return data;
+      });
+    });
+  }
+
+  function sha256Hex(buffer) {
+    if (!window.crypto || !window.crypto.subtle) { return Promise.resolve(null); }
+    return window.crypto.subtle.digest('SHA-256', buffer).then(function (digest) {
+      return Array.from(new Uint8Array(digest)).map(function (b) { return b.toString(16).padStart(2, '0'); }).join('');
+    });
+  }
+
+  function wait(ms) { return new Promise(function (resolve) { setTimeout(resolve, ms); }); }
+
+  function resumeKey(file) {
+    return 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+  }
+
+  function startOrResume(baseUrl, token, file) {
+    var saved = window.localStorage.getItem(resumeKey(file));
+    var create = function () {
+      return request('POST', baseUrl, token, JSON.stringify({filename: file.name, total_size: file.size}), {'Content-Type': 'application/json'});
+    };
+    if (!saved) { return create(); }
+    return request('GET', baseUrl + saved + '/', token).then(function (upload) {
+      return upload.status === 'uploading' ? upload : create();
+    }, create);
+  }
+
+  function sendChunk(baseUrl, token, upload, file, index, attempt) {
+    var start = index * upload.chunk_size;
+    var blob = file.slice(start, Math.min(start + upload.chunk_size, file.size));
+    return blob.arrayBuffer().then(function (buffer) {
+      return sha256Hex(buffer).then(function (hash) {
+        var headers = {'Content-Type': 'application/octet-stream'};
+        if (hash) { headers['X-Chunk-SHA256'] = hash; }
+        return request('PUT', baseUrl + upload.id + '/chunks/' + index + '/', token, buffer, headers);
+      });
+    }).catch(function (error) {
+      if (attempt >= MAX_RETRIES || (error.status && error.status < 500 && error.status !== 409)) { throw error; }
+      // Ask the server where it got to, then carry on from there.
+      return wait(1000 * Math.pow(2, attempt)).then(function () {
+        return request('GET', baseUrl + upload.id + '/', token);
+      }).then(function (current) {
+        return sendChunk(baseUrl, token, current, file, Math.floor(current.received / current.chunk_size), attempt + 1);
+      });
+    });
+  }
+
+  function upload(input, hidden, status) {
+    var file = input.files[0];
+    var form = input.form;
+    var token = csrfToken(form);
+    var baseUrl = hidden.dataset.uploadUrl;
+
+    pending += 1;
+    status.textContent = 'Uploading…';
+    return startOrResume(baseUrl, token, file).then(function (created) {
+      window.localStorage.setItem(resumeKey(file), created.id);
+      var loop = function (current) {
+        status.textContent = 'Uploading… ' + Math.floor(100 * current.received / current.total_size) + '%';
+        if (current.received >= current.total_size) {
+          return request('POST', baseUrl + current.id + '/complete/', token).catch(function (error) {
+            // A chunk failed verification: the server rewound to it.
+            if (error.status === 409 && error.data.received !== undefined) {
+              current.received = error.data.received;
+              return loop(current);
+            }
+            throw error;
+          });
+        }
+        var index = Math.floor(current.received / current.chunk_size);
+        return sendChunk(baseUrl, token, current, file, index, 0).then(loop);
+      };
+      return loop(created);
+    }).then(function (done) {
+      window.localStorage.removeItem(resumeKey(file));
+      hidden.value = done.id;
+      input.value = '';
+      status.textContent = 'Uploaded ' + file.name + '. Save to attach it.';
+    }).catch(function (error) {
+      status.textContent = 'Upload failed: ' + error.message + '. Pick the file again to resume.';
+    }).finally(function () {
+      pending -= 1;
+    });
+  }
+
+  document.addEventListener('change', function (event) {
+    var input = event.target;
+    if (input.type !== 'file' || !/^resources-\d+-file$/.test(input.name) || !input.files.length) { return; }
+    var hidden = input.form.querySelector('[name="' + input.name.replace(/-file$/, '-chunked_upload') + '"]');
+    if (!hidden || input.files[0].size <= Number(hidden.dataset.chunkSize)) { return; }
+
+    var status = input.parentNode.querySelector('.chunked-upload-status');
+    if (!status) {
+      status = document.createElement('div');
+      status.className = 'help chunked-upload-status';
+      input.parentNode.appendChild(status);
+    }
+    hidden.value = '';
+    upload(input, hidden, status);
+  });
+
+  document.addEventListener('submit', function (event) {
+    if (pending > 0) {
+      event.preventDefault();
+      window.alert('Please wait for the resource uploads to finish before saving.');
+    }
+  });
+})();